@@ -0,0 +1,45 @@
+# Gunicorn settings for the LearnBuddy API (used by the Dockerfile).
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src import model_store
+from src.migrations import migrate
+
+bind = "0.0.0.0:7860"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork the workers from it, so the
+# similarity model weights are shared copy-on-write instead of copied 4 times.
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+
+def on_starting(server):
+    # Every worker has its own sync and async pool; together they must fit in
+    # postgres' max_connections (see the budget in docker-compose.yml)
+    per_worker = int(os.getenv("DB_POOL_MAX_SIZE", "4")) + int(os.getenv("ASYNC_DB_POOL_MAX", "16"))
+    server.log.info(f"Database connections: up to {workers} workers x {per_worker} = {workers * per_worker}")
+    # Upgrade the schema once, in the master, before any worker serves a request
+    if os.getenv("MIGRATE_ON_STARTUP", "1") != "0":
+        import psycopg2
+        from src.db_pool import connection_kwargs_from_env
+
+        conn = psycopg2.connect(**connection_kwargs_from_env())
+        try:
+            for migration in migrate(conn):
+                server.log.info(f"Applied migration {migration.version:04d}_{migration.name}")
+        finally:
+            conn.close()
+
+
+def when_ready(server):
+    if preload_app:
+        server.log.info(f"Master memory before model load: {model_store.memory_usage()}")
+        model_store.preload_for_fork()
+        server.log.info(f"Master memory after model load: {model_store.memory_usage()}")
+
+
+def post_fork(server, worker):
+    logging.info(f"Worker {worker.pid} forked, memory: {model_store.memory_usage()}")
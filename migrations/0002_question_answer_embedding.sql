@@ -0,0 +1,3 @@
+-- 0002: precomputed float32 embedding of correct_answer_text
+-- (filled by scripts/backfill_embeddings.py and the admin question endpoints).
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS answer_embedding BYTEA;
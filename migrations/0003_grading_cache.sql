@@ -0,0 +1,12 @@
+-- 0003: embedding-graded results shared by all workers (used when GRADING_CACHE_DB=1).
+-- reference_answer is the correct answer the result was graded against.
+CREATE TABLE IF NOT EXISTS grading_cache (
+    question_id INT REFERENCES questions(id) ON DELETE CASCADE,
+    answer_key TEXT NOT NULL,
+    reference_answer VARCHAR(255) NOT NULL,
+    is_correct BOOLEAN NOT NULL,
+    similarity_score REAL NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (question_id, answer_key)
+);
+CREATE INDEX IF NOT EXISTS idx_grading_cache_created_at ON grading_cache (created_at);
@@ -0,0 +1,20 @@
+-- migrate: no-transaction
+-- 0004: indexes for the per-request queries. Built CONCURRENTLY so upgrading
+-- a live database does not block writes to user_progress. Each index is
+-- dropped first: a CONCURRENTLY build that failed halfway leaves an INVALID
+-- index behind, which IF NOT EXISTS would silently keep.
+
+-- get_enhanced_performance_metrics (a user's answers by answered_at) and the
+-- per-user answer counts in check_and_award_achievements. INCLUDE makes the
+-- counts index-only scans.
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_progress_user_answered_at;
+CREATE INDEX CONCURRENTLY idx_user_progress_user_answered_at
+    ON user_progress (user_id, answered_at DESC) INCLUDE (question_id, is_correct);
+
+-- ON DELETE CASCADE from questions (admin delete) would scan user_progress without it
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_progress_question_id;
+CREATE INDEX CONCURRENTLY idx_user_progress_question_id ON user_progress (question_id);
+
+-- select_question and the question index load per lesson/difficulty
+DROP INDEX CONCURRENTLY IF EXISTS idx_questions_lesson_difficulty;
+CREATE INDEX CONCURRENTLY idx_questions_lesson_difficulty ON questions (lesson_id, difficulty_level);
@@ -0,0 +1,10 @@
+-- 0005: adaptive-difficulty state per learner and lesson, shared by all workers
+-- (used when LEARNER_STATE_BACKEND=postgres).
+CREATE TABLE IF NOT EXISTS learner_state (
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    lesson_id INT NOT NULL,
+    state JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, lesson_id)
+);
+CREATE INDEX IF NOT EXISTS idx_learner_state_updated_at ON learner_state (updated_at);
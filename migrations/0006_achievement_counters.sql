@@ -0,0 +1,12 @@
+-- 0006: running answer counters on users, maintained by /submit_answer, so
+-- achievement checks compare counters instead of counting user_progress.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS total_answers INT NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS total_correct INT NOT NULL DEFAULT 0;
+
+UPDATE users u
+SET total_answers = c.total_answers, total_correct = c.total_correct
+FROM (
+    SELECT user_id, COUNT(*) AS total_answers, COUNT(*) FILTER (WHERE is_correct) AS total_correct
+    FROM user_progress GROUP BY user_id
+) c
+WHERE c.user_id = u.id;
@@ -0,0 +1,90 @@
+-- 0007: row counts for /admin/stats, kept by statement-level triggers so the
+-- dashboard reads a few dozen rows instead of counting user_progress.
+-- Each counter is split over 16 shards (by backend pid) so concurrent
+-- writers rarely wait on the same counter row; readers SUM the shards.
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    name TEXT NOT NULL,
+    shard INT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, shard)
+);
+
+-- users and user_progress: one counter named by the trigger argument
+CREATE OR REPLACE FUNCTION dashboard_count_rows() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO dashboard_counters (name, shard, value)
+        SELECT TG_ARGV[0], pg_backend_pid() % 16, count(*) FROM new_rows HAVING count(*) > 0
+        ON CONFLICT (name, shard) DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    ELSE
+        INSERT INTO dashboard_counters (name, shard, value)
+        SELECT TG_ARGV[0], pg_backend_pid() % 16, -count(*) FROM old_rows HAVING count(*) > 0
+        ON CONFLICT (name, shard) DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- questions: the total plus one counter per difficulty level. A trigger
+-- only sees the transition tables it declares, hence one query per event.
+CREATE OR REPLACE FUNCTION dashboard_count_questions() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO dashboard_counters (name, shard, value)
+        SELECT name, pg_backend_pid() % 16, count(*) FROM (
+            SELECT 'questions' AS name FROM new_rows
+            UNION ALL SELECT 'questions_difficulty_' || difficulty_level FROM new_rows
+        ) d GROUP BY name
+        ON CONFLICT (name, shard) DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO dashboard_counters (name, shard, value)
+        SELECT name, pg_backend_pid() % 16, -count(*) FROM (
+            SELECT 'questions' AS name FROM old_rows
+            UNION ALL SELECT 'questions_difficulty_' || difficulty_level FROM old_rows
+        ) d GROUP BY name
+        ON CONFLICT (name, shard) DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    ELSE
+        INSERT INTO dashboard_counters (name, shard, value)
+        SELECT name, pg_backend_pid() % 16, sum(delta) FROM (
+            SELECT 'questions_difficulty_' || difficulty_level AS name, 1 AS delta FROM new_rows
+            UNION ALL SELECT 'questions_difficulty_' || difficulty_level, -1 FROM old_rows
+        ) d GROUP BY name HAVING sum(delta) <> 0
+        ON CONFLICT (name, shard) DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS dashboard_users_insert ON users;
+CREATE TRIGGER dashboard_users_insert AFTER INSERT ON users
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows('users');
+DROP TRIGGER IF EXISTS dashboard_users_delete ON users;
+CREATE TRIGGER dashboard_users_delete AFTER DELETE ON users
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows('users');
+
+DROP TRIGGER IF EXISTS dashboard_user_progress_insert ON user_progress;
+CREATE TRIGGER dashboard_user_progress_insert AFTER INSERT ON user_progress
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows('answers');
+DROP TRIGGER IF EXISTS dashboard_user_progress_delete ON user_progress;
+CREATE TRIGGER dashboard_user_progress_delete AFTER DELETE ON user_progress
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_rows('answers');
+
+DROP TRIGGER IF EXISTS dashboard_questions_insert ON questions;
+CREATE TRIGGER dashboard_questions_insert AFTER INSERT ON questions
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_questions();
+DROP TRIGGER IF EXISTS dashboard_questions_delete ON questions;
+CREATE TRIGGER dashboard_questions_delete AFTER DELETE ON questions
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_questions();
+DROP TRIGGER IF EXISTS dashboard_questions_update ON questions;
+CREATE TRIGGER dashboard_questions_update AFTER UPDATE ON questions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION dashboard_count_questions();
+
+-- Starting values. The triggers above already hold their tables' write
+-- locks, so nothing can change between them and these counts.
+DELETE FROM dashboard_counters;
+INSERT INTO dashboard_counters (name, shard, value)
+SELECT 'users', 0, count(*) FROM users
+UNION ALL SELECT 'answers', 0, count(*) FROM user_progress
+UNION ALL SELECT 'questions', 0, count(*) FROM questions
+UNION ALL SELECT 'questions_difficulty_' || difficulty_level, 0, count(*) FROM questions GROUP BY difficulty_level;
@@ -0,0 +1,5 @@
+-- migrate: no-transaction
+-- 0008: /admin/users?username_prefix= filters with LIKE 'prefix%', which the
+-- unique index on username cannot serve outside the C collation.
+DROP INDEX CONCURRENTLY IF EXISTS idx_users_username_pattern;
+CREATE INDEX CONCURRENTLY idx_users_username_pattern ON users (username text_pattern_ops);
@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- 0009: Time-range analytics exports look up the first user_progress row
+-- answered at or after `since`. Rows are appended roughly in answered_at
+-- order, so a BRIN index serves that in a few pages, at next to no cost to
+-- the inserts on the hottest table (a B-tree here would be another one to
+-- maintain on every answer).
+DROP INDEX CONCURRENTLY IF EXISTS idx_user_progress_answered_at_brin;
+CREATE INDEX CONCURRENTLY idx_user_progress_answered_at_brin ON user_progress USING brin (answered_at);
@@ -0,0 +1,24 @@
+-- 0010: Achievements are awarded when a counter crosses their threshold, so
+-- users whose counters 0006 backfilled past a threshold they do not hold
+-- would never get it. Award those (and their XP) once; this is
+-- achievements.BACKFILL_AWARDS_SQL.
+WITH reached AS (
+    SELECT u.id AS user_id, a.id AS achievement_id
+    FROM users u JOIN achievements a ON a.criteria_value <= CASE a.criteria_type
+        WHEN 'STREAK' THEN u.streak_count
+        WHEN 'ANSWERS_TOTAL' THEN u.total_answers
+        WHEN 'CORRECT_ANSWERS_TOTAL' THEN u.total_correct
+    END
+), awarded AS (
+    INSERT INTO user_achievements (user_id, achievement_id)
+    SELECT user_id, achievement_id FROM reached
+    ON CONFLICT (user_id, achievement_id) DO NOTHING
+    RETURNING user_id, achievement_id
+)
+UPDATE users u SET xp = u.xp + credited.xp
+FROM (
+    SELECT awarded.user_id, SUM(a.xp_reward) AS xp
+    FROM awarded JOIN achievements a ON a.id = awarded.achievement_id
+    GROUP BY awarded.user_id
+) credited
+WHERE u.id = credited.user_id;
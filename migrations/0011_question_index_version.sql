@@ -0,0 +1,21 @@
+-- 0011: a version number for the questions table, bumped by statement-level
+-- triggers on every write. Each worker's in-memory question index
+-- (src/question_index.py) polls this one row and reloads only when it
+-- changed, so an admin edit on one worker reaches the others within one
+-- poll instead of the next 30s full reload.
+CREATE TABLE IF NOT EXISTS question_index_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO question_index_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_question_index_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE question_index_version SET version = version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS question_index_version_bump ON questions;
+CREATE TRIGGER question_index_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON questions
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_question_index_version();
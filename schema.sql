@@ -1,3 +1,7 @@
+-- Snapshot of the full schema with every migration applied, for reference.
+-- Schema changes go in a new migrations/NNNN_name.sql file (applied by
+-- scripts/migrate.py); update this file to match.
+
 -- This table stores user login info and their experience points (XP).
 -- MODIFIED to include an admin flag AND streak-tracking columns.
 CREATE TABLE users (
@@ -10,7 +14,10 @@ CREATE TABLE users (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     -- NEW: Columns for tracking daily streaks
     last_login_date DATE,
-    streak_count INT DEFAULT 0
+    streak_count INT DEFAULT 0,
+    -- Running counters for achievement checks (migrations/0006_achievement_counters.sql)
+    total_answers INT NOT NULL DEFAULT 0,
+    total_correct INT NOT NULL DEFAULT 0
 );
 
 -- This table stores questions for the lessons.
@@ -20,8 +27,33 @@ CREATE TABLE questions (
     lesson_id INT NOT NULL,
     content TEXT NOT NULL,
     difficulty_level INT NOT NULL CHECK (difficulty_level BETWEEN 1 AND 5),
-    correct_answer_text VARCHAR(255) NOT NULL
+    correct_answer_text VARCHAR(255) NOT NULL,
+    -- Precomputed float32 embedding of correct_answer_text (see scripts/backfill_embeddings.py)
+    answer_embedding BYTEA
+);
+
+-- Embedding-graded results shared by all workers (used when GRADING_CACHE_DB=1).
+-- reference_answer is the correct answer the result was graded against.
+CREATE TABLE grading_cache (
+    question_id INT REFERENCES questions(id) ON DELETE CASCADE,
+    answer_key TEXT NOT NULL,
+    reference_answer VARCHAR(255) NOT NULL,
+    is_correct BOOLEAN NOT NULL,
+    similarity_score REAL NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (question_id, answer_key)
+);
+CREATE INDEX idx_grading_cache_created_at ON grading_cache (created_at);
+
+-- Adaptive-difficulty state per learner and lesson (LEARNER_STATE_BACKEND=postgres)
+CREATE TABLE learner_state (
+    user_id INT REFERENCES users(id) ON DELETE CASCADE,
+    lesson_id INT NOT NULL,
+    state JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, lesson_id)
 );
+CREATE INDEX idx_learner_state_updated_at ON learner_state (updated_at);
 
 -- This table tracks every answer a user gives.
 -- (No changes here)
@@ -84,4 +116,34 @@ CREATE TABLE user_achievements (
     achievement_id INT REFERENCES achievements(id) ON DELETE CASCADE,
     unlocked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(user_id, achievement_id) -- A user can only earn each achievement once
-);
\ No newline at end of file
+);
+
+-- Hot-path indexes (migrations/0004_hot_path_indexes.sql)
+CREATE INDEX idx_user_progress_user_answered_at ON user_progress (user_id, answered_at DESC) INCLUDE (question_id, is_correct);
+CREATE INDEX idx_user_progress_question_id ON user_progress (question_id);
+CREATE INDEX idx_questions_lesson_difficulty ON questions (lesson_id, difficulty_level);
+
+-- Admin listing filters (migrations/0008_admin_listing_indexes.sql)
+CREATE INDEX idx_users_username_pattern ON users (username text_pattern_ops);
+
+-- Analytics export time ranges (migrations/0009_export_indexes.sql)
+CREATE INDEX idx_user_progress_answered_at_brin ON user_progress USING brin (answered_at);
+
+-- Row counts for /admin/stats, sharded by backend pid and kept by statement-level
+-- triggers on users, questions and user_progress (functions and triggers are in
+-- migrations/0007_dashboard_counters.sql).
+CREATE TABLE dashboard_counters (
+    name TEXT NOT NULL,
+    shard INT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, shard)
+);
+
+-- Bumped by a statement-level trigger on every write to questions; workers
+-- poll it to keep their question index current (the function and trigger are
+-- in migrations/0011_question_index_version.sql).
+CREATE TABLE question_index_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO question_index_version (id, version) VALUES (TRUE, 0);
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import psycopg2.extras
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.grading import encode_answers, embedding_to_bytes
+from src.model_store import get_grading_model
+from src.migrations import migrate
+from seed_db import get_db_connection_from_url
+
+
+def backfill_embeddings(recompute_all: bool = False, batch_size: int = 256):
+    """
+    Precomputes questions.answer_embedding for every question that does not
+    have one yet (or for every question with --all, e.g. after a model or GRADER_BACKEND change).
+    Rows are walked in id order and encoded in batches; each batch is committed.
+    """
+    model = get_grading_model()
+    conn = get_db_connection_from_url()
+    cur = conn.cursor()
+    try:
+        # Databases created before the column existed (migration 0002)
+        migrate(conn, target=2)
+
+        where_missing = "" if recompute_all else "AND answer_embedding IS NULL"
+        last_id = 0
+        total = 0
+        started = time.perf_counter()
+        while True:
+            cur.execute(
+                f"SELECT id, correct_answer_text FROM questions WHERE id > %s {where_missing} ORDER BY id LIMIT %s;",
+                (last_id, batch_size)
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            embeddings = encode_answers(model, [row[1] for row in rows], batch_size=batch_size)
+            psycopg2.extras.execute_values(
+                cur,
+                "UPDATE questions AS q SET answer_embedding = v.embedding FROM (VALUES %s) AS v(id, embedding) WHERE q.id = v.id",
+                [(row[0], embedding_to_bytes(emb)) for row, emb in zip(rows, embeddings)],
+                template="(%s, %s::bytea)"
+            )
+            conn.commit()
+            last_id = rows[-1][0]
+            total += len(rows)
+            print(f"Encoded {total} answers...")
+
+        elapsed = time.perf_counter() - started
+        print(f"--- Backfilled {total} answer embeddings in {elapsed:.1f}s ---")
+    except Exception as e:
+        print(f"An error occurred during backfill: {e}")
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute reference answer embeddings for all questions.")
+    parser.add_argument("--all", action="store_true", help="Recompute embeddings that already exist.")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+    backfill_embeddings(recompute_all=args.all, batch_size=args.batch_size)
@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.learning_models import EnhancedAdaptiveDifficultySelector, PerformanceWindow
+
+
+def synthetic_attempts(learners: int, window: int, seed: int):
+    """Recent attempts per learner (newest first) with a per-learner skill level."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(0, window + 1, learners)
+    skill = rng.random(learners)[:, None]
+    outcomes = (rng.random((learners, window)) < skill) & (np.arange(window) < sizes[:, None])
+    difficulties = np.where(np.arange(window) < sizes[:, None], rng.integers(1, 6, (learners, window)), 0)
+    return outcomes, difficulties, sizes
+
+
+def fresh_selector() -> EnhancedAdaptiveDifficultySelector:
+    selector = EnhancedAdaptiveDifficultySelector()
+    selector.user_states = {}
+    return selector
+
+
+def timed_rounds(scalar, batch, keys, seed: int):
+    """
+    Two rounds per path: "cold" creates every learner's state (and, with the
+    database, its performance window), "warm" reuses them. Returns the warm
+    decisions and the (scalar, batch) seconds of each round.
+    """
+    user_ids, lesson_ids = [key[0] for key in keys], [key[1] for key in keys]
+    timings = []
+    for round_seed in (seed, seed + 1):
+        random.seed(round_seed)
+        started = time.perf_counter()
+        expected = [scalar.select_difficulty_ultra_responsive(*key) for key in keys]
+        scalar_seconds = time.perf_counter() - started
+
+        random.seed(round_seed)
+        started = time.perf_counter()
+        actual = batch.select_difficulties_batch(user_ids, lesson_ids)
+        batch_seconds = time.perf_counter() - started
+        timings.append((scalar_seconds, batch_seconds))
+    return expected, actual, timings
+
+
+def run_in_process(learners: int, seed: int):
+    """
+    Decision throughput without a database: the scalar path gets each
+    learner's metrics from a PerformanceWindow rebuilt from its attempts
+    (what a cold call does after its query), the batch path gets the same
+    attempts as arrays. The scalar path would also make one query per
+    learner; the batch path makes one in total.
+    """
+    outcomes, difficulties, sizes = synthetic_attempts(learners, 12, seed)
+    keys = [(user_id, 1) for user_id in range(1, learners + 1)]
+    rows = {
+        key: [{'is_correct': bool(outcomes[i, j]), 'difficulty_level': int(difficulties[i, j]), 'response_time': None}
+              for j in range(sizes[i])]
+        for i, key in enumerate(keys)
+    }
+
+    scalar = fresh_selector()
+    scalar.get_enhanced_performance_metrics = (
+        lambda user_id, lesson_id, uow=None, user_state=None:
+        PerformanceWindow.from_attempts(rows[(user_id, lesson_id)]).metrics()
+    )
+    batch = fresh_selector()
+    batch._batch_attempts = lambda user_ids, lesson_ids, uow=None: (outcomes, difficulties, sizes)
+    return timed_rounds(scalar, batch, keys, seed)
+
+
+def run_database(learners: int, seed: int):
+    """End to end against DATABASE_URL, for (user, lesson) pairs that have answers."""
+    from src.adaptive_engine import get_db_connection
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT up.user_id, q.lesson_id FROM user_progress up
+                JOIN questions q ON up.question_id = q.id LIMIT %s;
+            """, (learners,))
+            keys = cur.fetchall()
+    finally:
+        conn.close()
+    if not keys:
+        raise SystemExit("No answered questions in the database; seed it first")
+
+    return timed_rounds(fresh_selector(), fresh_selector(), keys, seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare scalar and batch difficulty selection throughput.")
+    parser.add_argument("--learners", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database", action="store_true",
+                        help="Query DATABASE_URL instead of using synthetic in-memory attempts.")
+    args = parser.parse_args()
+
+    runner = run_database if args.database else run_in_process
+    expected, actual, timings = runner(args.learners, args.seed)
+    count = len(expected)
+    mismatches = int((np.asarray(expected) != actual).sum())
+    print(f"--- {count} learners ({'database' if args.database else 'in-process'}) ---")
+    for name, (scalar_seconds, batch_seconds) in zip(("cold", "warm"), timings):
+        print(f"{name}  scalar: {count / scalar_seconds:9.0f} decisions/s   batch: {count / batch_seconds:9.0f} decisions/s"
+              f"  ({scalar_seconds / batch_seconds:.1f}x)")
+    print(f"parity: {count - mismatches}/{count} identical decisions")
+    if mismatches:
+        raise SystemExit(1)
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.grading import SIMILARITY_THRESHOLD, encode_answers, normalize_answer
+from src.model_store import GRADER_BACKENDS, get_grading_model
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(__file__), 'data', 'labelled_answers.jsonl')
+
+
+def load_labelled_answers(path: str):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def similarity_scores(model, rows) -> np.ndarray:
+    """Cosine similarity of every (user_answer, correct_answer) pair, as graded in /submit_answer."""
+    users = encode_answers(model, [normalize_answer(r["user_answer"]) for r in rows])
+    refs = encode_answers(model, [normalize_answer(r["correct_answer"]) for r in rows])
+    return (users * refs).sum(axis=1)
+
+
+def measure_latency(model, texts, repeats: int):
+    """p50/p95 of single-answer encodes, the shape of one unbatched submit."""
+    timings = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        encode_answers(model, [texts[i % len(texts)]])
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def measure_throughput(model, texts, batch_size: int, seconds: float) -> float:
+    """Answers encoded per second in full micro-batches."""
+    batch = [texts[i % len(texts)] for i in range(batch_size)]
+    encoded = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        encode_answers(model, batch, batch_size=batch_size)
+        encoded += batch_size
+    return encoded / (time.perf_counter() - started)
+
+
+def benchmark(backends, labels_path: str, repeats: int, batch_size: int, seconds: float):
+    """
+    Grades the labelled answer set with every backend and compares the
+    `> SIMILARITY_THRESHOLD` decision with the human label and with the
+    first backend (the reference, normally torch). A backend is only safe to
+    switch to when its decisions match the reference on every row.
+    """
+    rows = load_labelled_answers(labels_path)
+    labels = np.array([r["is_correct"] for r in rows])
+    texts = [normalize_answer(r["user_answer"]) for r in rows]
+    reference_scores = None
+    results = []
+
+    for backend in backends:
+        model = get_grading_model(backend)
+        encode_answers(model, texts[:4])  # warm-up, not timed
+        scores = similarity_scores(model, rows)
+        decisions = scores > SIMILARITY_THRESHOLD
+        if reference_scores is None:
+            reference_scores = scores
+        reference_decisions = reference_scores > SIMILARITY_THRESHOLD
+        mismatches = [rows[i] for i in np.flatnonzero(decisions != reference_decisions)]
+        p50, p95 = measure_latency(model, texts, repeats)
+        results.append({
+            "backend": backend,
+            "accuracy": float((decisions == labels).mean()),
+            "parity": float((decisions == reference_decisions).mean()),
+            "max_score_diff": float(np.abs(scores - reference_scores).max()),
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "answers_per_sec": measure_throughput(model, texts, batch_size, seconds),
+            "mismatches": mismatches,
+        })
+
+    print(f"{len(rows)} labelled answers, threshold {SIMILARITY_THRESHOLD}, reference backend '{backends[0]}'")
+    print(f"{'backend':<11}{'accuracy':>9}{'parity':>8}{'max diff':>10}{'p50 ms':>8}{'p95 ms':>8}{f'ans/s @{batch_size}':>12}")
+    for r in results:
+        print(f"{r['backend']:<11}{r['accuracy']:>9.3f}{r['parity']:>8.3f}{r['max_score_diff']:>10.4f}"
+              f"{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}{r['answers_per_sec']:>12.0f}")
+    for r in results:
+        for row in r["mismatches"]:
+            print(f"  {r['backend']}: decision differs from '{backends[0]}' for "
+                  f"{row['user_answer']!r} vs {row['correct_answer']!r}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare grading backends for accuracy parity, latency and throughput.")
+    parser.add_argument("--backends", nargs="+", default=list(GRADER_BACKENDS), choices=GRADER_BACKENDS,
+                        help="The first backend is the parity reference.")
+    parser.add_argument("--labels", default=DEFAULT_LABELS, help="JSONL with correct_answer, user_answer, is_correct.")
+    parser.add_argument("--repeats", type=int, default=200, help="Single-answer encodes for the latency percentiles.")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duration of the throughput run per backend.")
+    args = parser.parse_args()
+    failed = [r["backend"] for r in benchmark(args.backends, args.labels, args.repeats, args.batch_size, args.seconds)
+              if r["parity"] < 1.0]
+    if failed:
+        raise SystemExit(f"Decision parity below 100% for: {', '.join(failed)}")
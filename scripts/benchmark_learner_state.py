@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.learning_models import LearnerState, PerformanceWindow
+
+REASONS = ("crisis_intervention", "hot_streak", "fast_track", "exploration", "momentum", "stability")
+RECENT_SIZE = 12
+
+
+def answers(rng: random.Random, count: int):
+    """A learner's answer stream: (is_correct, difficulty, answered_at, response_time)."""
+    now = 1.7e9 + rng.random() * 1e6
+    for _ in range(count):
+        gap = rng.uniform(2, 60)
+        now += gap
+        yield rng.random() < 0.7, rng.randint(1, 5), now, gap
+
+
+def dict_layout_state(rng: random.Random) -> dict:
+    """
+    A warmed-up learner in the dict layout the selector used before
+    LearnerState: deques of dicts/tuples, a list of floats, and the
+    performance window as a list of tuples with list-of-list counters.
+    Like the old code, every next/submit cycle appended a success-rate
+    float and an answer dict to recent_performance.
+    """
+    state = {
+        'current_difficulty': rng.randint(1, 5),
+        'confidence_scores': [rng.random() for _ in range(5)],
+        'recent_performance': deque(maxlen=RECENT_SIZE),
+        'difficulty_history': deque(maxlen=LearnerState.HISTORY_SIZE),
+        'learning_momentum': rng.uniform(-1, 1),
+        'last_update': time.time(),
+        'streak_counter': rng.randint(0, 5),
+        'struggle_counter': rng.randint(0, 5),
+        'exploration_debt': rng.randint(0, 3),
+    }
+    window_slots, per_difficulty = [], [[0, 0] for _ in range(6)]
+    for is_correct, difficulty, answered_at, response_time in answers(rng, 40):
+        state['recent_performance'].append(rng.random())
+        state['recent_performance'].append({'correct': is_correct, 'difficulty': difficulty,
+                                            'timestamp': answered_at, 'response_time': response_time})
+        state['difficulty_history'].append((difficulty, answered_at, rng.choice(REASONS)))
+        window_slots = (window_slots + [(is_correct, difficulty, response_time)])[-RECENT_SIZE:]
+        per_difficulty[difficulty][0] += 1
+        per_difficulty[difficulty][1] += is_correct
+    state['performance_window'] = {'slots': window_slots, 'per_difficulty': per_difficulty,
+                                   'response_time_sum': rng.random() * 100, 'last_answered_at': time.time()}
+    return state
+
+
+def slotted_state(rng: random.Random) -> LearnerState:
+    """The same warmed-up learner as a LearnerState."""
+    state = LearnerState(RECENT_SIZE)
+    state.current_difficulty = rng.randint(1, 5)
+    for level in range(5):
+        state.confidence_scores[level] = rng.random()
+    state.learning_momentum = rng.uniform(-1, 1)
+    state.streak_counter, state.struggle_counter = rng.randint(0, 5), rng.randint(0, 5)
+    state.exploration_debt = rng.randint(0, 3)
+    state.performance_window = PerformanceWindow(RECENT_SIZE)
+    for is_correct, difficulty, answered_at, response_time in answers(rng, 40):
+        state.recent_performance.append((is_correct, difficulty, answered_at, response_time))
+        state.difficulty_history.append((difficulty, answered_at, rng.choice(REASONS)))
+        state.performance_window.record(is_correct, difficulty, answered_at)
+    return state
+
+
+def bytes_per_learner(build, count: int, seed: int) -> float:
+    rng = random.Random(seed)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = {(user_id, 1): build(rng) for user_id in range(count)}
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del states
+    return (after - before) / count
+
+
+def run(pairs: int, sample: int, seed: int):
+    """
+    Measures the memory one warmed-up (user, lesson) state takes in each
+    layout, including its entry in the key map, over `sample` learners with
+    tracemalloc, and projects it to `pairs` active learners (1M by default).
+    Pass --sample equal to --pairs to build them all instead of projecting.
+    """
+    print(f"--- Learner state memory, {sample} learners measured, projected to {pairs:,} ---")
+    results = {}
+    for name, build in (("dict layout", dict_layout_state), ("LearnerState", slotted_state)):
+        per_learner = bytes_per_learner(build, sample, seed)
+        results[name] = per_learner
+        print(f"{name:>14}: {per_learner:8.0f} bytes/learner  {per_learner * pairs / 2**30:7.2f} GiB at {pairs:,} pairs")
+    saving = 1 - results["LearnerState"] / results["dict layout"]
+    print(f"LearnerState uses {saving:.0%} less memory per learner")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the memory footprint of the learner state layouts.")
+    parser.add_argument("--pairs", type=int, default=1000000, help="Active (user, lesson) pairs to project to.")
+    parser.add_argument("--sample", type=int, default=20000, help="Learners actually built and measured per layout.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    run(args.pairs, min(args.sample, args.pairs), args.seed)
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.migrations import migrate
+from seed_db import get_db_connection_from_url
+
+# Seq scans on these are what the hot-path indexes exist to avoid;
+# quests and achievements are a handful of rows and may be scanned.
+LARGE_TABLES = {"user_progress", "users", "questions", "user_quests", "user_achievements", "grading_cache"}
+
+# Indexes from migrations/0004_hot_path_indexes.sql (dropped with --without-indexes)
+HOT_PATH_INDEXES = ("idx_user_progress_user_answered_at", "idx_user_progress_question_id",
+                    "idx_questions_lesson_difficulty")
+
+# The per-request queries, as written in the source files named in each entry
+HOT_QUERIES = [
+    ("performance history (learning_models.get_enhanced_performance_metrics)", """
+        SELECT up.is_correct, up.answered_at, q.difficulty_level,
+               EXTRACT(EPOCH FROM (up.answered_at - LAG(up.answered_at) OVER (ORDER BY up.answered_at))) as response_time
+        FROM user_progress up JOIN questions q ON up.question_id = q.id
+        WHERE up.user_id = %(user_id)s AND q.lesson_id = %(lesson_id)s
+        ORDER BY up.answered_at DESC LIMIT 12
+    """),
+    ("question pick (adaptive_engine.select_question)", """
+        SELECT id, content, difficulty_level FROM questions
+        WHERE lesson_id = %(lesson_id)s AND difficulty_level <= 3
+        ORDER BY difficulty_level DESC, RANDOM() LIMIT 1
+    """),
+    ("active quest (main.get_today_quest)", """
+        SELECT q.title, q.description, uq.current_progress, q.completion_target, q.xp_reward, uq.is_completed
+        FROM user_quests uq JOIN quests q ON uq.quest_id = q.id
+        WHERE uq.user_id = %(user_id)s AND uq.assigned_date = CURRENT_DATE
+    """),
+    ("answer bookkeeping (main.RECORD_ANSWER_SQL)", """
+        WITH quest AS (
+            UPDATE user_quests uq SET current_progress = uq.current_progress + 1
+            FROM quests q
+            WHERE uq.quest_id = q.id AND uq.user_id = %(user_id)s AND uq.assigned_date = CURRENT_DATE
+              AND uq.is_completed = FALSE
+            RETURNING q.xp_reward
+        ), counters AS (
+            UPDATE users u SET total_answers = u.total_answers + 1, xp = u.xp + (
+                SELECT COALESCE(SUM(a.xp_reward), 0) FROM achievements a
+                WHERE a.criteria_type = 'ANSWERS_TOTAL' AND a.criteria_value = u.total_answers + 1
+                  AND NOT EXISTS (SELECT 1 FROM user_achievements ua WHERE ua.user_id = u.id AND ua.achievement_id = a.id)
+            )
+            WHERE u.id = %(user_id)s
+            RETURNING u.id, u.total_answers
+        )
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT c.id, a.id FROM counters c JOIN achievements a
+          ON a.criteria_type = 'ANSWERS_TOTAL' AND a.criteria_value = c.total_answers
+        ON CONFLICT (user_id, achievement_id) DO NOTHING
+    """),
+    ("achievement award (achievements.AWARD_SQL)", """
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT %(user_id)s, unnest(ARRAY[1, 2]) ON CONFLICT (user_id, achievement_id) DO NOTHING
+        RETURNING achievement_id
+    """),
+    ("grading cache lookup (grading_cache.QUESTION_WITH_CACHED_RESULT_SQL)", """
+        SELECT q.correct_answer_text, q.difficulty_level, gc.is_correct, gc.similarity_score
+        FROM questions q LEFT JOIN grading_cache gc
+          ON gc.question_id = q.id AND gc.answer_key = '4' AND gc.reference_answer = q.correct_answer_text
+        WHERE q.id = %(question_id)s
+    """),
+    ("question delete cascade (ON DELETE CASCADE on user_progress)", """
+        SELECT 1 FROM user_progress WHERE question_id = %(question_id)s
+    """),
+]
+
+
+def generate_data(cur, users: int, answers: int, lessons: int, questions_per_lesson: int):
+    """Synthetic population, inserted inside the caller's transaction."""
+    cur.execute("""
+        INSERT INTO users (username, email, password_hash, streak_count)
+        SELECT 'plan_user_' || g, 'plan_user_' || g || '@example.com', 'x', g %% 7 FROM generate_series(1, %s) g;
+    """, (users,))
+    cur.execute("""
+        INSERT INTO questions (lesson_id, content, difficulty_level, correct_answer_text)
+        SELECT 1000 + l, 'Question ' || l || '-' || n, 1 + n %% 5, (n * l)::text
+        FROM generate_series(1, %s) l, generate_series(1, %s) n;
+    """, (lessons, questions_per_lesson))
+    cur.execute("SELECT min(id), max(id) FROM users WHERE username LIKE 'plan_user_%%';")
+    first_user, last_user = cur.fetchone()
+    cur.execute("SELECT min(id), max(id) FROM questions WHERE lesson_id > 1000;")
+    first_question, last_question = cur.fetchone()
+    cur.execute("""
+        INSERT INTO user_progress (user_id, question_id, is_correct, answered_at)
+        SELECT %s + (random() * (%s - %s))::int, %s + (random() * (%s - %s))::int, random() < 0.7,
+               now() - random() * interval '365 days'
+        FROM generate_series(1, %s);
+    """, (first_user, last_user, first_user, first_question, last_question, first_question, answers))
+    cur.execute("INSERT INTO quests (title, quest_type, completion_target, xp_reward) VALUES ('plan', 'TOTAL_ANSWERS', 5, 10) RETURNING id;")
+    quest_id = cur.fetchone()[0]
+    cur.execute("""
+        INSERT INTO user_quests (user_id, quest_id, assigned_date)
+        SELECT id, %s, CURRENT_DATE - d FROM users, generate_series(0, 6) d WHERE id BETWEEN %s AND %s;
+    """, (quest_id, first_user, last_user))
+    cur.execute("""
+        INSERT INTO achievements (name, description, icon_class, criteria_type, criteria_value, xp_reward)
+        SELECT 'plan ' || n, 'plan', 'fas fa-star', 'ANSWERS_TOTAL', n * 10, 10 FROM generate_series(1, 20) n
+        RETURNING id;
+    """)
+    achievement_ids = [row[0] for row in cur.fetchall()]
+    cur.execute("""
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT u.id, a.id FROM users u, unnest(%s::int[]) a(id)
+        WHERE u.id BETWEEN %s AND %s AND random() < 0.3;
+    """, (achievement_ids, first_user, last_user))
+    cur.execute("""
+        INSERT INTO grading_cache (question_id, answer_key, reference_answer, is_correct, similarity_score)
+        SELECT q.id, 'answer ' || n, q.correct_answer_text, n = 1, random()
+        FROM questions q, generate_series(1, 20) n WHERE q.id BETWEEN %s AND %s;
+    """, (first_question, last_question))
+    cur.execute("ANALYZE;")
+    return {"user_id": (first_user + last_user) // 2, "lesson_id": 1001, "question_id": first_question}
+
+
+def scanned_relations(plan: dict):
+    """Yields (node_type, relation, index) for every scan node in an EXPLAIN (FORMAT JSON) plan."""
+    if "Relation Name" in plan:
+        yield plan["Node Type"], plan["Relation Name"], plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from scanned_relations(child)
+
+
+def check_plans(cur, params: dict) -> list:
+    failures = []
+    for name, sql in HOT_QUERIES:
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0]
+        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+        scans = list(scanned_relations(plan))
+        seq_scans = [rel for node, rel, _ in scans if node == "Seq Scan" and rel in LARGE_TABLES]
+        status = "FAIL" if seq_scans else "ok"
+        print(f"[{status:>4}] {name}  (est. cost {plan['Total Cost']:.0f})")
+        for node, rel, index in scans:
+            print(f"         {node} on {rel}" + (f" using {index}" if index else ""))
+        if seq_scans:
+            failures.append((name, seq_scans))
+    return failures
+
+
+def run(users: int, answers: int, lessons: int, questions_per_lesson: int, without_indexes: bool, keep: bool):
+    """
+    Fills the database with a synthetic population (10M user_progress rows by
+    default), ANALYZEs it and checks that no hot query plans a sequential scan
+    over a large table. Everything happens in one transaction that is rolled
+    back unless --keep is given, but it holds locks while it runs: point
+    DATABASE_URL at a scratch database, not production.
+    """
+    conn = get_db_connection_from_url()
+    migrate(conn)
+    cur = conn.cursor()
+    try:
+        started = time.perf_counter()
+        params = generate_data(cur, users, answers, lessons, questions_per_lesson)
+        print(f"Generated {users} users and {answers} answers in {time.perf_counter() - started:.0f}s")
+        if without_indexes:
+            for index in HOT_PATH_INDEXES:
+                cur.execute(f"DROP INDEX IF EXISTS {index};")
+            print(f"Dropped {', '.join(HOT_PATH_INDEXES)} for comparison")
+        failures = check_plans(cur, params)
+        if keep:
+            conn.commit()
+        else:
+            conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot-path queries against a large synthetic dataset.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--answers", type=int, default=10000000, help="user_progress rows to generate.")
+    parser.add_argument("--lessons", type=int, default=50)
+    parser.add_argument("--questions-per-lesson", type=int, default=200)
+    parser.add_argument("--without-indexes", action="store_true", help="Drop the hot-path indexes first (rolled back).")
+    parser.add_argument("--keep", action="store_true", help="Commit the synthetic data instead of rolling it back.")
+    args = parser.parse_args()
+    failed = run(args.users, args.answers, args.lessons, args.questions_per_lesson, args.without_indexes, args.keep)
+    if failed:
+        raise SystemExit(f"{len(failed)} hot queries plan a sequential scan on a large table")
+    print("--- Every hot query uses an index ---")
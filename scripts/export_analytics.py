@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import analytics_export
+from src.migrations import migrate
+from seed_db import get_db_connection_from_url
+
+
+def export(dataset: str, output: str = None, fmt: str = "ndjson", since: datetime = None, until: datetime = None,
+           lesson_id: int = None, batch_size: int = analytics_export.EXPORT_BATCH_SIZE):
+    """
+    Writes an analytics export (the same batches as GET /admin/export/{dataset})
+    to `output`, gzipped when it ends in .gz, or to stdout. Progress goes to
+    stderr so the export itself can be piped.
+    """
+    query = analytics_export.export_query(dataset, since, until, lesson_id)
+    conn = get_db_connection_from_url()
+    rows = 0
+    started = time.perf_counter()
+
+    def counted(batches):
+        nonlocal rows
+        for columns, batch in batches:
+            rows += len(batch)
+            yield columns, batch
+
+    try:
+        migrate(conn)
+        batches = counted(analytics_export.iter_batches(analytics_export.connection_query(conn), query, batch_size))
+        chunks = analytics_export.encode_batches(batches, fmt)
+        if output is None:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            sys.stdout.flush()
+        elif output.endswith(".gz"):
+            with open(output, "wb") as f:
+                for data in analytics_export.gzip_stream(chunks):
+                    f.write(data)
+        else:
+            with open(output, "w", newline="") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"--- Exported {rows} {dataset} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s) ---", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export learner progress, bandit state or quest history for offline analysis.")
+    parser.add_argument("dataset", choices=sorted(analytics_export.DATASETS))
+    parser.add_argument("-o", "--output", help="Output file (gzipped if it ends in .gz); stdout when omitted.")
+    parser.add_argument("--format", choices=analytics_export.FORMATS, default="ndjson")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO date/time, inclusive.")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO date/time, exclusive.")
+    parser.add_argument("--lesson-id", type=int)
+    parser.add_argument("--batch-size", type=int, default=analytics_export.EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    try:
+        export(args.dataset, args.output, args.format, args.since, args.until, args.lesson_id, args.batch_size)
+    except ValueError as e:
+        parser.error(str(e))
@@ -0,0 +1,68 @@
+import argparse
+import os
+import shutil
+import sys
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.model_store import MODEL_NAME, get_onnx_dir, resolve_local_snapshot
+from src.onnx_backend import ONNX_MODEL_FILES
+
+# Everything OnnxSentenceEncoder needs besides the graph itself
+SIDECAR_FILES = ("tokenizer.json", "sentence_bert_config.json", "config.json")
+
+
+def export_onnx(output_dir: str, opset: int = 14):
+    """
+    Exports the transformer of the cached all-MiniLM-L6-v2 snapshot to ONNX
+    (fp32), then writes a dynamically quantized int8 copy next to it. Pooling
+    and normalization are not part of the graph; src/onnx_backend.py applies
+    them in numpy. Works offline from model_cache.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    snapshot = resolve_local_snapshot()
+    if snapshot is None:
+        raise SystemExit(f"No local snapshot of {MODEL_NAME} found, nothing to export.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(snapshot)
+    model = AutoModel.from_pretrained(snapshot)
+    model.eval()
+
+    sample = tokenizer(["The capital of France is Paris.", "4"], padding=True, return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(output_dir, ONNX_MODEL_FILES["onnx"])
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    print(f"Wrote {fp32_path} ({os.path.getsize(fp32_path) / 1e6:.1f} MB)")
+
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILES["onnx-int8"])
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Wrote {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+
+    for name in SIDECAR_FILES:
+        shutil.copy(os.path.join(snapshot, name), os.path.join(output_dir, name))
+    print(f"Copied {', '.join(SIDECAR_FILES)} to {output_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the similarity model to ONNX (fp32 and int8).")
+    parser.add_argument("--output-dir", default=get_onnx_dir(), help="Where to write the ONNX files.")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export_onnx(args.output_dir, args.opset)
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import question_import
+from src.model_store import get_grading_model
+from src.migrations import migrate
+from seed_db import get_db_connection_from_url
+
+
+def import_file(path: str, fmt: str = None, strict: bool = False, embeddings: bool = True,
+                chunk_size: int = question_import.DEFAULT_CHUNK_SIZE, batch_size: int = 256):
+    """
+    Bulk-loads questions from a CSV (with a header) or JSONL file, the same
+    way as POST /admin/questions/import: validated and COPY'd in chunks, in
+    one transaction, with answer embeddings encoded a chunk at a time.
+    With --no-embeddings the questions are loaded without them (run
+    backfill_embeddings.py afterwards).
+    """
+    fmt = question_import.detect_format(path, fmt)
+    model = get_grading_model() if embeddings else None
+    conn = get_db_connection_from_url()
+    try:
+        migrate(conn)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            report = question_import.import_questions(
+                f, fmt, conn, encoder=model, chunk_size=chunk_size,
+                encode_batch_size=batch_size, strict=strict
+            )
+    finally:
+        conn.close()
+
+    for error in report["errors"]:
+        print(f"Line {error['line']}: {error['error']}")
+    if report["rows_failed"] > len(report["errors"]):
+        print(f"... and {report['rows_failed'] - len(report['errors'])} more invalid rows")
+    if not report["committed"]:
+        print(f"--- Nothing imported: {report['rows_failed']} of {report['rows_read']} rows are invalid (--strict) ---")
+        sys.exit(1)
+    print(f"--- Imported {report['rows_imported']} of {report['rows_read']} questions "
+          f"({report['embeddings_computed']} embeddings) in {report['seconds']:.1f}s, "
+          f"{report['rows_per_sec']:.0f} rows/s ---")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import questions from a CSV or JSONL file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=question_import.FORMATS, help="Taken from the file extension when omitted.")
+    parser.add_argument("--strict", action="store_true", help="Import nothing if any row is invalid.")
+    parser.add_argument("--no-embeddings", action="store_true", help="Leave answer_embedding empty.")
+    parser.add_argument("--chunk-size", type=int, default=question_import.DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--batch-size", type=int, default=256, help="Answers encoded per model call.")
+    args = parser.parse_args()
+    import_file(args.path, fmt=args.format, strict=args.strict, embeddings=not args.no_embeddings,
+                chunk_size=args.chunk_size, batch_size=args.batch_size)
@@ -0,0 +1,72 @@
+import argparse
+import os
+
+
+def read_memory(pid: int) -> dict:
+    """Rss/Pss/shared/private memory of one process in MB, from /proc/<pid>/smaps_rollup."""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                usage[key] = int(value.split()[0]) / 1024
+    return usage
+
+
+def child_pids(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def is_gunicorn_app(pid) -> bool:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv = f.read().decode(errors="ignore").split("\0")
+    except OSError:
+        return False
+    # argv[0] is either gunicorn itself or the python interpreter running it
+    return any(os.path.basename(arg).startswith("gunicorn") for arg in argv[:2]) and "src.main:app" in argv
+
+
+def find_gunicorn_master():
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or not is_gunicorn_app(entry):
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().split(") ")[1].split()[1])
+        except OSError:
+            continue
+        if not is_gunicorn_app(ppid):  # workers are children of the master
+            return int(entry)
+    return None
+
+
+def report(master_pid: int):
+    """
+    Prints per-process memory for the gunicorn master and its workers.
+    Run once with GUNICORN_PRELOAD=0 and once with the default to compare:
+    RSS counts shared pages in every worker, PSS splits them between the
+    processes sharing them, so the PSS total is the real footprint.
+    """
+    rows = [("master", master_pid)] + [("worker", pid) for pid in child_pids(master_pid)]
+    total_rss = total_pss = 0.0
+    print(f"{'role':<8}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'shared MB':>11}{'private MB':>12}")
+    for role, pid in rows:
+        m = read_memory(pid)
+        shared = m["Shared_Clean"] + m["Shared_Dirty"]
+        private = m["Private_Clean"] + m["Private_Dirty"]
+        total_rss += m["Rss"]
+        total_pss += m["Pss"]
+        print(f"{role:<8}{pid:>8}{m['Rss']:>10.1f}{m['Pss']:>10.1f}{shared:>11.1f}{private:>12.1f}")
+    print(f"{'total':<16}{total_rss:>10.1f}{total_pss:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report resident memory of the gunicorn master and workers.")
+    parser.add_argument("--pid", type=int, help="gunicorn master PID (found automatically if omitted)")
+    args = parser.parse_args()
+    master = args.pid or find_gunicorn_master()
+    if master is None:
+        raise SystemExit("No gunicorn master running src.main:app was found.")
+    report(master)
@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+
+# --- Path Correction ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.migrations import migrate, migration_status
+from seed_db import get_db_connection_from_url
+
+
+def print_status(conn):
+    for row in migration_status(conn):
+        state = "applied" if row["applied"] else "pending"
+        note = "  (file changed since it was applied)" if row["modified_since_applied"] else ""
+        print(f"{row['version']:04d}_{row['name']:<32}{state}{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema in place using migrations/.")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations, change nothing.")
+    parser.add_argument("--target", type=int, help="Stop after this migration version.")
+    args = parser.parse_args()
+
+    conn = get_db_connection_from_url()
+    try:
+        if args.status:
+            print_status(conn)
+        else:
+            applied = migrate(conn, target=args.target)
+            for migration in applied:
+                print(f"Applied {migration.version:04d}_{migration.name}")
+            print(f"--- Database is up to date ({len(applied)} migrations applied) ---")
+    finally:
+        conn.close()
@@ -1,11 +1,18 @@
-import psycopg2
+import argparse
+import io
 import os
 import sys
+import time
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
+import numpy as np
+import psycopg2
+
 # --- Path Correction ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.security import get_password_hash
+from src.migrations import migrate
 
 
 def get_db_connection_from_url():
@@ -26,10 +33,14 @@ def get_db_connection_from_url():
     return conn
 
 
-def seed_database():
+def seed_database(scale: dict = None):
     """
-    Wipes the database, runs the schema.sql file to create tables,
-    and then inserts fresh sample data.
+    Wipes the database, applies every migration in migrations/ to create
+    the tables, and then inserts fresh sample data.
+    With `scale` (the keyword arguments of seed_synthetic_population) a
+    synthetic population is generated on top of the sample data.
+    To upgrade an existing database without wiping it, run scripts/migrate.py.
+    Returns whether seeding succeeded.
     """
     conn = None
     cur = None
@@ -40,13 +51,13 @@ def seed_database():
 
         print("Dropping existing tables...")
         # MODIFIED: Add new tables to the drop list
-        cur.execute("DROP TABLE IF EXISTS user_achievements, achievements, user_quests, quests, bandit_state, user_progress, questions, users CASCADE;")
+        cur.execute("DROP TABLE IF EXISTS user_achievements, achievements, user_quests, quests, bandit_state, user_progress, grading_cache, learner_state, dashboard_counters, question_index_version, questions, users, schema_migrations CASCADE;")
+        conn.commit()
 
-        print("Creating tables from schema.sql...")
-        with open('schema.sql', 'r') as f:
-            cur.execute(f.read())
+        print("Creating tables from migrations/...")
+        applied = migrate(conn)
 
-        print("Tables created successfully.")
+        print(f"Tables created successfully ({len(applied)} migrations applied).")
 
         print("Inserting sample data...")
         # Insert users
@@ -101,12 +112,17 @@ def seed_database():
 
         conn.commit()
         print(f"Seeded users, {len(sample_questions)} questions, quests, and achievements.")
+
+        if scale:
+            seed_synthetic_population(conn, **scale)
         print("--- Database Seed Successful ---")
+        return True
 
     except Exception as e:
         print(f"An error occurred during seeding: {e}")
         if conn:
             conn.rollback()
+        return False
     finally:
         if cur:
             cur.close()
@@ -114,5 +130,327 @@ def seed_database():
             conn.close()
 
 
+# --- Synthetic population (scale mode) ---
+# Everything is drawn from numpy generators seeded with (seed, stream, ...),
+# so the same arguments always produce the same database.
+SYNTHETIC_PASSWORD = "password"
+ANSWER_XP = 10  # main.ANSWER_XP
+# Answers generated (and copied) per part of a day
+PART_ROWS = 1_000_000
+POSTGRES_EPOCH = np.datetime64("2000-01-01T00:00:00", "us")
+
+# Binary COPY rows for user_progress: a field count, then (length, value) per
+# field, big-endian; timestamptz is microseconds since 2000-01-01 UTC
+PROGRESS_ROW = np.dtype([
+    ("fields", ">i2"),
+    ("id_len", ">i4"), ("id", ">i4"),
+    ("user_len", ">i4"), ("user_id", ">i4"),
+    ("question_len", ">i4"), ("question_id", ">i4"),
+    ("correct_len", ">i4"), ("is_correct", "u1"),
+    ("time_len", ">i4"), ("answered_at", ">i8"),
+])
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+COPY_BINARY_TRAILER = b"\xff\xff"
+
+RECOUNT_DASHBOARD_SQL = """
+    DELETE FROM dashboard_counters;
+    INSERT INTO dashboard_counters (name, shard, value)
+    SELECT 'users', 0, count(*) FROM users
+    UNION ALL SELECT 'answers', 0, count(*) FROM user_progress
+    UNION ALL SELECT 'questions', 0, count(*) FROM questions
+    UNION ALL SELECT 'questions_difficulty_' || difficulty_level, 0, count(*) FROM questions GROUP BY difficulty_level;
+    -- The version trigger was disabled along with the counters; running workers reload on this
+    UPDATE question_index_version SET version = version + 1;
+"""
+
+# Histories derived from the generated answers, so every table agrees with user_progress
+DERIVE_SQL = [
+    ("per-user daily activity", """
+        CREATE TEMP TABLE seed_user_days ON COMMIT DROP AS
+        SELECT user_id, answered_at::date AS day, count(*) AS answers, count(*) FILTER (WHERE is_correct) AS correct
+        FROM user_progress GROUP BY user_id, answered_at::date;
+    """),
+    ("per-user totals and streaks", """
+        CREATE TEMP TABLE seed_user_stats ON COMMIT DROP AS
+        WITH islands AS (
+            -- Consecutive days share an island: day minus its rank is constant along a run
+            SELECT user_id, day, answers, correct, day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::int AS island
+            FROM seed_user_days
+        ), latest AS (
+            SELECT *, FIRST_VALUE(island) OVER (PARTITION BY user_id ORDER BY day DESC) AS last_island FROM islands
+        )
+        SELECT user_id, SUM(answers)::int AS total_answers, SUM(correct)::int AS total_correct, MAX(day) AS last_day,
+               COUNT(*) FILTER (WHERE island = last_island)::int AS streak
+        FROM latest GROUP BY user_id;
+    """),
+    ("bandit_state", """
+        INSERT INTO bandit_state (user_id, lesson_id, difficulty_level, times_selected, successful_outcomes)
+        SELECT p.user_id, q.lesson_id, q.difficulty_level, count(*), count(*) FILTER (WHERE p.is_correct)
+        FROM user_progress p JOIN questions q ON q.id = p.question_id
+        GROUP BY p.user_id, q.lesson_id, q.difficulty_level;
+    """),
+    ("user_quests", """
+        WITH catalog AS (
+            SELECT array_agg(id ORDER BY id) AS ids FROM quests
+        ), assigned AS (
+            SELECT d.*, catalog.ids[1 + (d.user_id + (d.day - DATE '2000-01-01')) %% cardinality(catalog.ids)] AS quest_id
+            FROM seed_user_days d CROSS JOIN catalog
+        )
+        INSERT INTO user_quests (user_id, quest_id, assigned_date, current_progress, is_completed)
+        SELECT a.user_id, q.id, a.day, LEAST(p.progress, q.completion_target), p.progress >= q.completion_target
+        FROM assigned a JOIN quests q ON q.id = a.quest_id
+        CROSS JOIN LATERAL (SELECT CASE q.quest_type WHEN 'CORRECT_ANSWERS' THEN a.correct ELSE a.answers END AS progress) p;
+    """),
+    ("user_achievements", """
+        INSERT INTO user_achievements (user_id, achievement_id, unlocked_at)
+        SELECT s.user_id, a.id, s.last_day::timestamptz
+        FROM seed_user_stats s JOIN achievements a ON a.criteria_value <= CASE a.criteria_type
+            WHEN 'ANSWERS_TOTAL' THEN s.total_answers
+            WHEN 'CORRECT_ANSWERS_TOTAL' THEN s.total_correct
+            WHEN 'STREAK' THEN s.streak
+        END;
+    """),
+    ("user counters and XP", """
+        UPDATE users u
+        SET total_answers = s.total_answers, total_correct = s.total_correct,
+            last_login_date = s.last_day, streak_count = s.streak,
+            xp = s.total_correct * %(answer_xp)s + COALESCE(qx.xp, 0) + COALESCE(ax.xp, 0)
+        FROM seed_user_stats s
+        LEFT JOIN (
+            SELECT uq.user_id, SUM(q.xp_reward) AS xp FROM user_quests uq JOIN quests q ON q.id = uq.quest_id
+            WHERE uq.is_completed GROUP BY uq.user_id
+        ) qx ON qx.user_id = s.user_id
+        LEFT JOIN (
+            SELECT ua.user_id, SUM(a.xp_reward) AS xp FROM user_achievements ua JOIN achievements a ON a.id = ua.achievement_id
+            GROUP BY ua.user_id
+        ) ax ON ax.user_id = s.user_id
+        WHERE s.user_id = u.id;
+    """),
+]
+
+
+@contextmanager
+def without_secondary_indexes(cur, tables):
+    """
+    Drops the foreign keys and non-constraint indexes of `tables` for a bulk
+    load and recreates them afterwards: one index build and one validating
+    join instead of a per-row index insert and foreign key check.
+    The loads commit as they go, so the drops may already be committed when
+    something fails: then the open transaction is rolled back and whatever
+    is missing is recreated and committed before the error propagates.
+    """
+    tables = list(tables)
+    cur.execute("""
+        SELECT format('ALTER TABLE %%s ADD CONSTRAINT %%I %%s', conrelid::regclass, conname, pg_get_constraintdef(oid)),
+               format('ALTER TABLE %%s DROP CONSTRAINT %%I', conrelid::regclass, conname), conname
+        FROM pg_constraint WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])
+        UNION ALL
+        SELECT indexdef, format('DROP INDEX %%I', indexname), indexname
+        FROM pg_indexes i WHERE tablename = ANY(%s) AND schemaname = current_schema()
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname);
+    """, (tables, tables))
+    definitions = cur.fetchall()
+    for _, drop, _ in definitions:
+        cur.execute(drop)
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        cur.connection.rollback()
+        raise
+    finally:
+        cur.execute("""
+            SELECT conname FROM pg_constraint WHERE conrelid = ANY(%s::regclass[])
+            UNION ALL SELECT indexname FROM pg_indexes WHERE tablename = ANY(%s) AND schemaname = current_schema();
+        """, (tables, tables))
+        present = {row[0] for row in cur.fetchall()}
+        missing = [create for create, _, name in definitions if name not in present]
+        print(f"Rebuilding {len(missing)} indexes and foreign keys...")
+        for create in missing:
+            cur.execute(create)
+        if failed:
+            cur.connection.commit()
+
+
+def _weekday_weights(days: int, end: np.datetime64) -> np.ndarray:
+    """Relative activity of each day: weekends are quieter."""
+    weekdays = (np.arange(days) + (end - np.timedelta64(days, "D")).astype("datetime64[D]").astype(int) + 3) % 7
+    weights = np.where(weekdays >= 5, 0.7, 1.0)
+    return weights / weights.sum()
+
+
+def _split(total: int, weights: np.ndarray) -> np.ndarray:
+    """Integer shares of `total` proportional to `weights` (largest remainders)."""
+    exact = total * weights
+    counts = np.floor(exact).astype(np.int64)
+    counts[np.argsort(counts - exact)[:total - counts.sum()]] += 1
+    return counts
+
+
+def _copy_users(cur, first_id: int, users: int, start: np.datetime64, rng, password_hash: str):
+    # Sign-ups spread over the 30 days before the period
+    created = start + (rng.random(users) * -30 * 86400e6).astype("timedelta64[us]")
+    for offset in range(0, users, PART_ROWS // 10):
+        buffer = io.StringIO()
+        part = np.datetime_as_string(created[offset:offset + PART_ROWS // 10], unit="s", timezone="UTC")
+        for i, created_at in enumerate(part, start=first_id + offset):
+            buffer.write(f"{i}\tlearner_{i}\tlearner_{i}@example.com\t{password_hash}\t{created_at}\n")
+        buffer.seek(0)
+        cur.copy_expert("COPY users (id, username, email, password_hash, created_at) FROM STDIN", buffer)
+    cur.execute("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users));")
+
+
+def _copy_questions(cur, first_id: int, lessons: int, per_difficulty: int, rng):
+    buffer = io.StringIO()
+    question_id = first_id
+    for lesson_id in range(1, lessons + 1):
+        for difficulty in range(1, 6):
+            for n in range(per_difficulty):
+                a, b = rng.integers(1, 10 ** difficulty, size=2)
+                buffer.write(f"{question_id}\t{lesson_id}\tLesson {lesson_id}, level {difficulty}, #{n + 1}: what is {a} plus {b}?\t{difficulty}\t{a + b}\n")
+                question_id += 1
+    buffer.seek(0)
+    cur.copy_expert("COPY questions (id, lesson_id, content, difficulty_level, correct_answer_text) FROM STDIN", buffer)
+    cur.execute("SELECT setval(pg_get_serial_sequence('questions', 'id'), (SELECT MAX(id) FROM questions));")
+
+
+def _copy_progress(cur, rows: dict):
+    n = len(rows["user_id"])
+    data = np.empty(n, dtype=PROGRESS_ROW)
+    data["fields"] = 5
+    data["id_len"] = data["user_len"] = data["question_len"] = 4
+    data["correct_len"] = 1
+    data["time_len"] = 8
+    for column in ("id", "user_id", "question_id", "is_correct", "answered_at"):
+        data[column] = rows[column]
+    buffer = io.BytesIO(COPY_BINARY_HEADER + data.tobytes() + COPY_BINARY_TRAILER)
+    cur.copy_expert("COPY user_progress (id, user_id, question_id, is_correct, answered_at) FROM STDIN WITH (FORMAT binary)", buffer)
+
+
+def seed_synthetic_population(conn, users: int, lessons: int, questions_per_difficulty: int, answers: int,
+                              days: int = 90, seed: int = 42):
+    """
+    Bulk-loads a synthetic population for benchmarking:
+    - `users` learners (password "password"), `lessons` x 5 difficulties x
+      `questions_per_difficulty` questions (without embeddings: run
+      backfill_embeddings.py if the benchmark grades with the model)
+    - `answers` user_progress rows over the `days` days up to today, in time order.
+      Activity is skewed: each learner has a lognormal activity level and an
+      active window within the period, lessons follow a Zipf-like popularity,
+      and difficulty and correctness follow a per-learner skill
+    - bandit_state, user_quests, user_achievements, the users' counters,
+      streaks and XP, and the dashboard counters, derived from those answers
+    Rows are sent with COPY (binary for user_progress) with the secondary
+    indexes and foreign keys dropped until the end.
+    """
+    started = time.perf_counter()
+    cur = conn.cursor()
+    rng = lambda *stream: np.random.default_rng([seed, *stream])
+
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM users;")
+    first_user = cur.fetchone()[0] + 1
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM questions;")
+    first_question = cur.fetchone()[0] + 1
+    end = np.datetime64("today", "D").astype("datetime64[us]")
+    start = end - np.timedelta64(days, "D")
+
+    # Triggers would count every row a second time; the counters are recomputed at the end
+    for table in ("users", "questions", "user_progress"):
+        cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER;")
+    completed = False
+    try:
+        _generate(conn, cur, rng, started, first_user, first_question, start, end,
+                  users, lessons, questions_per_difficulty, answers, days)
+        completed = True
+    finally:
+        # Also after a failure: the trigger changes may already be committed
+        if not completed:
+            conn.rollback()
+        for table in ("users", "questions", "user_progress"):
+            cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER;")
+        cur.execute(RECOUNT_DASHBOARD_SQL)
+        conn.commit()
+    cur.execute("ANALYZE;")
+    conn.commit()
+    cur.close()
+    print(f"--- Generated {users} users and {answers} answers in {time.perf_counter() - started:.1f}s "
+          f"(seed {seed}; synthetic users log in with '{SYNTHETIC_PASSWORD}') ---")
+
+
+def _generate(conn, cur, rng, started: float, first_user: int, first_question: int, start: np.datetime64,
+              end: np.datetime64, users: int, lessons: int, questions_per_difficulty: int, answers: int, days: int):
+
+    # Room for the aggregates and index builds below to stay in memory
+    cur.execute("SET work_mem = '256MB'; SET maintenance_work_mem = '1GB';")
+
+    print(f"Generating {users} users...")
+    with without_secondary_indexes(cur, ("users",)):
+        _copy_users(cur, first_user, users, start, rng(1), get_password_hash(SYNTHETIC_PASSWORD))
+    print(f"Generating {lessons * 5 * questions_per_difficulty} questions...")
+    _copy_questions(cur, first_question, lessons, questions_per_difficulty, rng(2))
+    conn.commit()
+
+    # Learner traits: activity level, active window and skill
+    traits = rng(3)
+    activity = traits.lognormal(0.0, 1.5, users)
+    window_start = traits.integers(0, days, users)
+    window_end = np.minimum(window_start + 1 + traits.exponential(days / 3, users).astype(np.int64), days)
+    skill = traits.normal(0.0, 1.0, users)
+    lesson_cdf = np.cumsum(1.0 / np.arange(1, lessons + 1) ** 1.1)
+    lesson_cdf /= lesson_cdf[-1]
+
+    print(f"Generating {answers} answers over {days} days...")
+    next_id = 1
+    with without_secondary_indexes(cur, ("user_progress",)):
+        for day, day_answers in enumerate(_split(answers, _weekday_weights(days, end))):
+            active = (window_start <= day) & (day < window_end)
+            if not day_answers or not active.any():
+                continue
+            user_cdf = np.cumsum(np.where(active, activity, 0.0))
+            user_cdf /= user_cdf[-1]
+            parts = -(-day_answers // PART_ROWS)
+            for part, n in enumerate(_split(day_answers, np.full(parts, 1.0 / parts))):
+                r = rng(4, day, part)
+                users_idx = np.minimum(np.searchsorted(user_cdf, r.random(n), side="right"), users - 1)
+                lesson = np.minimum(np.searchsorted(lesson_cdf, r.random(n), side="right"), lessons - 1)
+                difficulty = np.clip(np.rint(3 + skill[users_idx] + r.normal(0, 0.7, n)), 1, 5).astype(np.int64)
+                p_correct = 1 / (1 + np.exp(-(0.5 + 1.2 * skill[users_idx] - 0.8 * (difficulty - 3))))
+                # Times in order within the part, parts in order within the day
+                offsets = np.sort(r.random(n)) + part
+                answered_at = start + np.timedelta64(day, "D") + (offsets / parts * 86400e6).astype("timedelta64[us]")
+                _copy_progress(cur, {
+                    "id": np.arange(next_id, next_id + n),
+                    "user_id": first_user + users_idx,
+                    "question_id": first_question + (lesson * 5 + difficulty - 1) * questions_per_difficulty
+                                   + r.integers(0, questions_per_difficulty, n),
+                    "is_correct": r.random(n) < p_correct,
+                    "answered_at": (answered_at - POSTGRES_EPOCH).astype(np.int64),
+                })
+                next_id += n
+            conn.commit()
+            print(f"Copied {next_id - 1} answers (day {day + 1}/{days}, {time.perf_counter() - started:.0f}s)...")
+        cur.execute("SELECT setval(pg_get_serial_sequence('user_progress', 'id'), GREATEST((SELECT MAX(id) FROM user_progress), 1));")
+    conn.commit()
+
+    with without_secondary_indexes(cur, ("bandit_state", "user_quests", "user_achievements")):
+        for name, sql in DERIVE_SQL:
+            print(f"Deriving {name}...")
+            cur.execute(sql, {"answer_xp": ANSWER_XP})
+
+
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Wipe and seed the database with sample data.")
+    parser.add_argument("--scale", action="store_true", help="Also generate a synthetic population (the options below).")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--lessons", type=int, default=20)
+    parser.add_argument("--questions-per-difficulty", type=int, default=50)
+    parser.add_argument("--answers", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    scale = None
+    if args.scale:
+        scale = dict(users=args.users, lessons=args.lessons, questions_per_difficulty=args.questions_per_difficulty,
+                     answers=args.answers, days=args.days, seed=args.seed)
+    sys.exit(0 if seed_database(scale) else 1)
\ No newline at end of file
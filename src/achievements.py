@@ -0,0 +1,179 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+# Counter columns on users (migrations/0006_achievement_counters.sql) per criteria type
+COUNTERS = {
+    'STREAK': 'streak_count',
+    'ANSWERS_TOTAL': 'total_answers',
+    'CORRECT_ANSWERS_TOTAL': 'total_correct',
+}
+
+CATALOG_SQL = "SELECT id, name, criteria_type, criteria_value, xp_reward FROM achievements;"
+
+# Inserts the candidates the user does not hold yet and credits their XP, in one statement
+AWARD_SQL = """
+    WITH awarded AS (
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT %s, unnest(%s::int[])
+        ON CONFLICT (user_id, achievement_id) DO NOTHING
+        RETURNING achievement_id
+    ), credited AS (
+        UPDATE users SET xp = xp + (SELECT COALESCE(SUM(a.xp_reward), 0) FROM achievements a JOIN awarded ON a.id = awarded.achievement_id)
+        WHERE id = %s AND EXISTS (SELECT 1 FROM awarded)
+    )
+    SELECT achievement_id FROM awarded;
+"""
+
+# Awards every achievement a user's counters already reach and credits its XP,
+# for all users at once: what the crossing checks cannot see, i.e. users
+# already past a threshold when it was added (migrations/0010_backfill_achievements.sql)
+BACKFILL_AWARDS_SQL = """
+    WITH reached AS (
+        SELECT u.id AS user_id, a.id AS achievement_id
+        FROM users u JOIN achievements a ON a.criteria_value <= CASE a.criteria_type
+            WHEN 'STREAK' THEN u.streak_count
+            WHEN 'ANSWERS_TOTAL' THEN u.total_answers
+            WHEN 'CORRECT_ANSWERS_TOTAL' THEN u.total_correct
+        END
+    ), awarded AS (
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT user_id, achievement_id FROM reached
+        ON CONFLICT (user_id, achievement_id) DO NOTHING
+        RETURNING user_id, achievement_id
+    )
+    UPDATE users u SET xp = u.xp + credited.xp
+    FROM (
+        SELECT awarded.user_id, SUM(a.xp_reward) AS xp
+        FROM awarded JOIN achievements a ON a.id = awarded.achievement_id
+        GROUP BY awarded.user_id
+    ) credited
+    WHERE u.id = credited.user_id;
+"""
+
+
+class Achievement(NamedTuple):
+    id: int
+    name: str
+    criteria_value: int
+    xp_reward: int
+
+
+class AchievementCatalog:
+    """
+    Per-worker copy of the achievements table, indexed by criteria type with
+    thresholds sorted ascending.
+
+    Writers keep the counters on the users row (streak_count, total_answers,
+    total_correct) and pass their value before and after the event; an
+    achievement is a candidate only when the event moved its counter across
+    the threshold, found with a bisect per type. Most events cross nothing and
+    cost no query at all; the rest are awarded with one batched statement
+    (AWARD_SQL), where the unique constraint drops anything already held
+    (e.g. a streak that was lost and rebuilt).
+
+    Users already past a threshold when it is added never cross it: after
+    adding achievements, run BACKFILL_AWARDS_SQL (migration 0010 ran it for
+    the counters backfilled by 0006).
+
+    /token awards streaks through here. /submit_answer applies the same rule
+    to the answer counters inside its single bookkeeping statement
+    (main.RECORD_ANSWER_SQL).
+    """
+
+    def __init__(self, refresh_seconds: float = 300.0):
+        self.refresh_seconds = refresh_seconds
+        self._types: Dict[str, tuple] = {}  # criteria_type -> ([thresholds], [Achievement])
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self._events = 0
+        self._candidates = 0
+        self._awarded = 0
+        self._reloads = 0
+
+    def load(self, rows):
+        """Rebuilds the index from achievements rows (id, name, criteria_type, criteria_value, xp_reward)."""
+        grouped: Dict[str, List[Achievement]] = {}
+        for row in rows:
+            achievement = Achievement(row['id'], row['name'], row['criteria_value'], row['xp_reward'])
+            grouped.setdefault(row['criteria_type'], []).append(achievement)
+        types = {}
+        for criteria_type, achievements in grouped.items():
+            if criteria_type not in COUNTERS:
+                logging.warning(f"Ignoring achievements with unknown criteria type {criteria_type!r}")
+                continue
+            achievements.sort(key=lambda a: (a.criteria_value, a.id))
+            types[criteria_type] = ([a.criteria_value for a in achievements], achievements)
+        with self._lock:
+            self._types = types
+            self._loaded_at = time.monotonic()
+            self._reloads += 1
+
+    def _stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds
+
+    async def ensure_loaded_async(self, uow):
+        if self._stale():
+            self.load(await uow.fetch(CATALOG_SQL))
+
+    def crossed(self, criteria_type: str, before: int, after: int) -> List[Achievement]:
+        """Achievements of this type with before < threshold <= after."""
+        entry = self._types.get(criteria_type)
+        if entry is None or after <= before:
+            return []
+        thresholds, achievements = entry
+        return achievements[bisect.bisect_right(thresholds, before):bisect.bisect_right(thresholds, after)]
+
+    def candidates(self, changes: Dict[str, tuple]) -> List[Achievement]:
+        """changes: criteria_type -> (counter before, counter after)."""
+        found = []
+        for criteria_type, (before, after) in changes.items():
+            found.extend(self.crossed(criteria_type, before, after))
+        with self._lock:
+            self._events += 1
+            self._candidates += len(found)
+        return found
+
+    async def award_async(self, user_id: int, changes: Dict[str, tuple], uow) -> int:
+        """
+        Awards what the counter changes unlocked, on the caller's
+        AsyncUnitOfWork, and returns the XP credited to users.xp.
+        """
+        await self.ensure_loaded_async(uow)
+        found = self.candidates(changes)
+        if not found:
+            return 0
+        rows = await uow.fetch(AWARD_SQL, (user_id, [a.id for a in found], user_id))
+        awarded_ids = {row['achievement_id'] for row in rows}
+        xp = 0
+        for achievement in found:
+            if achievement.id in awarded_ids:
+                xp += achievement.xp_reward
+                logging.info(f"User {user_id} unlocked achievement '{achievement.name}'!")
+        with self._lock:
+            self._awarded += len(awarded_ids)
+        return xp
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded_at is not None,
+                "achievements": {t: len(entry[0]) for t, entry in self._types.items()},
+                "events": self._events,
+                "candidates": self._candidates,
+                "awarded": self._awarded,
+                "reloads": self._reloads,
+            }
+
+
+def create_achievement_catalog_from_env() -> AchievementCatalog:
+    """Builds the catalog using ACHIEVEMENT_CATALOG_REFRESH_SECONDS."""
+    return AchievementCatalog(refresh_seconds=float(os.getenv("ACHIEVEMENT_CATALOG_REFRESH_SECONDS", "300")))
+
+
+achievement_catalog = create_achievement_catalog_from_env()
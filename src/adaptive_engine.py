@@ -1,53 +1,56 @@
 import psycopg2
 import psycopg2.extras  # Needed for dictionary cursors
-import os
 import random
-from urllib.parse import urlparse # Import the URL parser
+from .db_pool import get_pool
+
+# The highest-difficulty question at or below the target, random within the level
+SELECT_QUESTION_SQL = """
+    SELECT id, content, difficulty_level 
+    FROM questions 
+    WHERE lesson_id = %s AND difficulty_level <= %s
+    ORDER BY difficulty_level DESC, RANDOM()
+    LIMIT 1;
+"""
 
 def get_db_connection():
     """
-    Creates and returns a new database connection.
-    UPDATED: It now intelligently reads the DATABASE_URL from the environment,
-    which is provided by docker-compose.
+    Checks out a connection from the process-wide pool.
+    UPDATED: Connections are no longer opened per call. The pool is built from
+    the DATABASE_URL environment variable (provided by docker-compose), and
+    calling close() on the returned connection hands it back to the pool.
     """
-    db_url_str = os.getenv("DATABASE_URL")
-    if not db_url_str:
-        raise ValueError("DATABASE_URL environment variable is not set!")
-
-    result = urlparse(db_url_str)
-    conn = psycopg2.connect(
-        host=result.hostname,
-        database=result.path[1:], # The path has a leading '/', we strip it
-        user=result.username,
-        password=result.password
-    )
-    return conn
+    return get_pool().getconn()
 
 
-def select_question(difficulty: int, lesson_id: int):
+def select_question(difficulty: int, lesson_id: int, uow=None):
     """
     Selects a random question from the database.
     FIXED: Uses a single query with a smart fallback and always returns three values.
+    When a UnitOfWork is given, its connection is reused instead of checking out a new one.
     """
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    if uow is not None:
+        conn, cur = None, uow.cursor
+    else:
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
     
-    cur.execute(
-        """
-        SELECT id, content, difficulty_level 
-        FROM questions 
-        WHERE lesson_id = %s AND difficulty_level <= %s
-        ORDER BY difficulty_level DESC, RANDOM()
-        LIMIT 1;
-        """,
-        (lesson_id, difficulty)
-    )
-    question = cur.fetchone()
-    cur.close()
-    conn.close()
+    try:
+        cur.execute(SELECT_QUESTION_SQL, (lesson_id, difficulty))
+        question = cur.fetchone()
+    finally:
+        if conn is not None:
+            cur.close()
+            conn.close()
     
     if question:
         return question['id'], question['content'], question['difficulty_level']
     else:
         # Always return three values, even on failure
-        return None, None, None
\ No newline at end of file
+        return None, None, None
+
+async def select_question_async(difficulty: int, lesson_id: int, uow):
+    """select_question on an AsyncUnitOfWork."""
+    question = await uow.fetchrow(SELECT_QUESTION_SQL, (lesson_id, difficulty))
+    if question:
+        return question['id'], question['content'], question['difficulty_level']
+    return None, None, None
@@ -0,0 +1,92 @@
+from typing import Iterator, Optional, Tuple
+
+import psycopg2.extras
+
+from .unit_of_work import UnitOfWork
+
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 1000
+# Rows fetched from the server-side cursor per round trip when streaming
+STREAM_BATCH_SIZE = 1000
+
+USER_COLUMNS = "id, username, email, xp, is_admin"
+QUESTION_COLUMNS = "id, lesson_id, content AS question_text, difficulty_level"
+
+
+def _like_prefix(prefix: str) -> str:
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def users_query(username_prefix: Optional[str] = None, cursor: Optional[int] = None,
+                limit: Optional[int] = None) -> Tuple[str, tuple]:
+    """Users by id ascending; `cursor` is the last id of the previous page."""
+    where, params = [], []
+    if username_prefix:
+        where.append("username LIKE %s")
+        params.append(_like_prefix(username_prefix))
+    if cursor is not None:
+        where.append("id > %s")
+        params.append(cursor)
+    return _select(f"SELECT {USER_COLUMNS} FROM users", where, "id ASC", limit, params)
+
+
+def questions_query(lesson_id: Optional[int] = None, difficulty: Optional[int] = None,
+                    cursor: Optional[int] = None, limit: Optional[int] = None) -> Tuple[str, tuple]:
+    """Questions newest first (id descending); `cursor` is the last id of the previous page."""
+    where, params = [], []
+    if lesson_id is not None:
+        where.append("lesson_id = %s")
+        params.append(lesson_id)
+    if difficulty is not None:
+        where.append("difficulty_level = %s")
+        params.append(difficulty)
+    if cursor is not None:
+        where.append("id < %s")
+        params.append(cursor)
+    return _select(f"SELECT {QUESTION_COLUMNS} FROM questions", where, "id DESC", limit, params)
+
+
+def _select(select: str, where: list, order: str, limit: Optional[int], params: list) -> Tuple[str, tuple]:
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order}"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql + ";", tuple(params)
+
+
+def fetch_page(cur, sql: str, params: tuple, limit: int):
+    """(rows, next_cursor): next_cursor is None on the last page."""
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    return rows, (rows[-1]['id'] if len(rows) == limit else None)
+
+
+def stream_json_array(sql: str, params: tuple, model, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[str]:
+    """
+    Yields a JSON array of `model` rows, read through a server-side cursor
+    `batch_size` rows at a time, so memory stays flat however large the table.
+    Runs on its own pooled connection: a StreamingResponse is still being
+    written after the request's unit of work has been closed. Rows are not
+    re-validated: the status line is already sent by then, so a row that
+    failed validation could only truncate the array.
+    """
+    with UnitOfWork() as uow:
+        cur = uow.conn.cursor(name="admin_listing", cursor_factory=psycopg2.extras.DictCursor)
+        cur.itersize = batch_size
+        try:
+            cur.execute(sql, params)
+            yield "["
+            first, chunk = True, []
+            for row in cur:
+                item = model.model_construct(**row).model_dump_json()
+                chunk.append(item if first else "," + item)
+                first = False
+                if len(chunk) >= batch_size:
+                    yield "".join(chunk)
+                    chunk = []
+            yield "".join(chunk) + "]"
+        finally:
+            cur.close()
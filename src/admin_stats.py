@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+# Counters kept by the triggers in migrations/0007_dashboard_counters.sql
+COUNTERS_SQL = "SELECT name, SUM(value)::bigint AS value FROM dashboard_counters GROUP BY name;"
+DIFFICULTY_PREFIX = "questions_difficulty_"
+
+
+def load_dashboard(cur) -> dict:
+    """/admin/stats figures from dashboard_counters: a few dozen rows whatever the table sizes."""
+    cur.execute(COUNTERS_SQL)
+    counters = {row['name']: row['value'] for row in cur.fetchall()}
+    return {
+        "total_users": counters.get("users", 0),
+        "total_questions": counters.get("questions", 0),
+        "total_answers_submitted": counters.get("answers", 0),
+        "questions_by_difficulty": {
+            name[len(DIFFICULTY_PREFIX):]: value
+            for name, value in sorted(counters.items())
+            if name.startswith(DIFFICULTY_PREFIX) and value > 0
+        },
+    }
+
+
+class DashboardStats:
+    """
+    Serves /admin/stats from a snapshot at most `max_age` seconds old.
+    Features:
+    - Concurrent requests for a stale snapshot are coalesced: one computes it,
+      the others wait for that result instead of running their own queries
+    - Every response carries `as_of` and `age_seconds`, so the dashboard can
+      show how fresh the figures are
+    - Counters for monitoring (see `stats()`)
+    With max_age=0 every request not coalesced with another one recomputes.
+    """
+
+    def __init__(self, max_age: float = 5.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._snapshot: Optional[dict] = None
+        self._computed_at = 0.0
+        self._in_flight: Optional[Future] = None
+
+        # Statistics
+        self._computations = 0
+        self._coalesced = 0
+        self._hits = 0
+
+    def get(self, compute: Callable[[], dict]) -> dict:
+        with self._lock:
+            if self._snapshot is not None and time.time() - self._computed_at <= self.max_age:
+                self._hits += 1
+                return self._response()
+            future = self._in_flight
+            leader = future is None
+            if leader:
+                future = self._in_flight = Future()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            snapshot, computed_at = future.result()
+            return self._response(snapshot, computed_at)
+
+        try:
+            snapshot = compute()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight = None
+            future.set_exception(e)
+            raise
+        computed_at = time.time()
+        with self._lock:
+            self._snapshot, self._computed_at = snapshot, computed_at
+            self._computations += 1
+            self._in_flight = None
+        future.set_result((snapshot, computed_at))
+        return self._response(snapshot, computed_at)
+
+    def _response(self, snapshot: dict = None, computed_at: float = None) -> dict:
+        if snapshot is None:
+            snapshot, computed_at = self._snapshot, self._computed_at
+        return {
+            **snapshot,
+            "as_of": datetime.fromtimestamp(computed_at, timezone.utc),
+            "age_seconds": round(max(time.time() - computed_at, 0.0), 3),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_age_seconds": self.max_age,
+                "computations": self._computations,
+                "coalesced": self._coalesced,
+                "hits": self._hits,
+            }
+
+
+def create_dashboard_stats_from_env() -> DashboardStats:
+    """Builds the snapshot holder using ADMIN_STATS_MAX_AGE_SECONDS."""
+    return DashboardStats(max_age=float(os.getenv("ADMIN_STATS_MAX_AGE_SECONDS", "5")))
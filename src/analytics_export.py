@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timezone
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .unit_of_work import UnitOfWork
+
+FORMATS = ("ndjson", "csv", "columnar")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "columnar": "application/x-ndjson"}
+# Rows per keyset batch: each batch is one short query on a pooled connection
+EXPORT_BATCH_SIZE = 5000
+
+# (sql, params) -> (column names, rows)
+RunQuery = Callable[[str, tuple], Tuple[List[str], list]]
+
+
+class Dataset(NamedTuple):
+    select: str
+    # Leading columns of the select list that order the export and resume it after each batch
+    key: Tuple[str, ...]
+    time_column: Optional[str] = None
+    lesson_column: Optional[str] = None
+    # Smallest key at or after `since`, so a recent time range does not walk the table from the start
+    seek_sql: Optional[str] = None
+
+
+DATASETS = {
+    "progress": Dataset(
+        select="SELECT p.id, p.user_id, p.question_id, q.lesson_id, q.difficulty_level, p.is_correct, p.answered_at "
+               "FROM user_progress p JOIN questions q ON q.id = p.question_id",
+        key=("p.id",),
+        time_column="p.answered_at",
+        lesson_column="q.lesson_id",
+        # Served by the BRIN index from migrations/0009_export_indexes.sql
+        seek_sql="SELECT MIN(id) - 1 FROM user_progress WHERE answered_at >= %s",
+    ),
+    "bandit": Dataset(
+        select="SELECT user_id, lesson_id, difficulty_level, times_selected, successful_outcomes FROM bandit_state",
+        key=("user_id", "lesson_id", "difficulty_level"),
+        lesson_column="lesson_id",
+    ),
+    "quests": Dataset(
+        select="SELECT uq.id, uq.user_id, uq.quest_id, qu.quest_type, uq.assigned_date, uq.current_progress, "
+               "qu.completion_target, uq.is_completed, qu.xp_reward "
+               "FROM user_quests uq JOIN quests qu ON qu.id = uq.quest_id",
+        key=("uq.id",),
+        time_column="uq.assigned_date",
+    ),
+}
+
+
+class ExportQuery(NamedTuple):
+    dataset: Dataset
+    where: Tuple[str, ...]
+    params: tuple
+    since: Optional[datetime]
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def export_query(name: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 lesson_id: Optional[int] = None) -> ExportQuery:
+    """
+    Validates the filters for dataset `name`; raises ValueError for anything
+    it cannot filter on. Times without a timezone are taken as UTC.
+    """
+    dataset = DATASETS.get(name)
+    if dataset is None:
+        raise ValueError(f"Unknown dataset {name!r}; expected one of {', '.join(DATASETS)}")
+    since, until = _utc(since), _utc(until)
+    where, params = [], []
+    if since is not None or until is not None:
+        if dataset.time_column is None:
+            raise ValueError(f"The {name} dataset has no time column to filter on")
+        if since is not None and until is not None and since >= until:
+            raise ValueError("since must be before until")
+        if since is not None:
+            where.append(f"{dataset.time_column} >= %s")
+            params.append(since)
+        if until is not None:
+            where.append(f"{dataset.time_column} < %s")
+            params.append(until)
+    if lesson_id is not None:
+        if dataset.lesson_column is None:
+            raise ValueError(f"The {name} dataset has no lesson to filter on")
+        where.append(f"{dataset.lesson_column} = %s")
+        params.append(lesson_id)
+    return ExportQuery(dataset, tuple(where), tuple(params), since)
+
+
+def _batch_sql(query: ExportQuery, after: Optional[tuple], batch_size: int) -> Tuple[str, tuple]:
+    where, params = list(query.where), list(query.params)
+    key = query.dataset.key
+    if after is not None:
+        if len(key) == 1:
+            where.append(f"{key[0]} > %s")
+        else:
+            where.append(f"({', '.join(key)}) > ({', '.join(['%s'] * len(key))})")
+        params.extend(after)
+    sql = query.dataset.select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {', '.join(key)} LIMIT %s;"
+    return sql, tuple(params) + (batch_size,)
+
+
+def iter_batches(run_query: RunQuery, query: ExportQuery,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Tuple[List[str], list]]:
+    """
+    Yields (column names, rows) batches of at most `batch_size` rows.
+    The export is walked by keyset, one short query per batch, instead of
+    holding one cursor (and one snapshot) open for the whole export: a slow
+    download neither pins a pooled connection nor holds back vacuum on
+    user_progress. The price is that rows written during the export may or
+    may not be included, which is fine for append-mostly analytics tables.
+    """
+    after = None
+    if query.since is not None and query.dataset.seek_sql is not None:
+        _, rows = run_query(query.dataset.seek_sql, (query.since,))
+        if not rows or rows[0][0] is None:
+            return
+        after = (rows[0][0],)
+    key_length = len(query.dataset.key)
+    while True:
+        columns, rows = run_query(*_batch_sql(query, after, batch_size))
+        if rows:
+            yield columns, rows
+        if len(rows) < batch_size:
+            return
+        after = tuple(rows[-1][:key_length])
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_batches(batches: Iterable[Tuple[List[str], list]], fmt: str) -> Iterator[str]:
+    """
+    Serializes batches as
+    - ndjson: one JSON object per row
+    - csv: a header row, then the rows
+    - columnar: one JSON object per batch, {"num_rows": n, "columns": {name: [values]}},
+      i.e. Arrow-style record batches that load column by column
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    header_written = False
+    for columns, rows in batches:
+        if fmt == "ndjson":
+            yield "".join(json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows)
+        elif fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerows(rows)
+            yield buffer.getvalue()
+        else:
+            data = {name: list(values) for name, values in zip(columns, zip(*rows))}
+            yield json.dumps({"num_rows": len(rows), "columns": data}, default=_json_default) + "\n"
+
+
+def gzip_stream(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Gzips a stream of text chunks incrementally (one compressor, constant memory)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def pooled_query(sql: str, params: tuple) -> Tuple[List[str], list]:
+    """RunQuery for the API: each batch checks a pooled connection out and back in."""
+    with UnitOfWork() as uow:
+        cur = uow.conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return [d[0] for d in cur.description], cur.fetchall()
+        finally:
+            cur.close()
+
+
+def connection_query(conn) -> RunQuery:
+    """RunQuery on a dedicated connection (the CLI), ending the transaction after every batch."""
+    def run_query(sql: str, params: tuple):
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return [d[0] for d in cur.description], cur.fetchall()
+        finally:
+            cur.close()
+            conn.rollback()
+    return run_query
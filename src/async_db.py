@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import logging
+import os
+import re
+import socket
+import time
+from typing import Optional, Sequence
+
+import asyncpg
+
+from .db_pool import PoolTimeoutError
+
+_PLACEHOLDER = re.compile(r"%%|%s")
+
+
+@functools.lru_cache(maxsize=512)
+def to_asyncpg_sql(sql: str) -> str:
+    """
+    Rewrites psycopg2-style SQL for asyncpg: each %s becomes $1, $2, ... in
+    order and %% becomes %. Lets the async path run the same statements as
+    the sync one.
+    """
+    counter = iter(range(1, sql.count("%s") + 1))
+    return _PLACEHOLDER.sub(lambda m: "%" if m.group() == "%%" else f"${next(counter)}", sql)
+
+
+def rowcount(status: str) -> int:
+    """Rows affected, from an asyncpg command status such as 'UPDATE 3'."""
+    last = status.rsplit(" ", 1)[-1] if status else ""
+    return int(last) if last.isdigit() else 0
+
+
+class AsyncPool:
+    """
+    Process-wide asyncpg pool for the async request path, separate from the
+    psycopg2 pool in src.db_pool.
+    Features:
+    - Created on first use, for the running event loop (each gunicorn/uvicorn
+      worker has its own loop and its own pool)
+    - Checkout timeout raising PoolTimeoutError, like the sync pool, so the
+      same 503 handler applies
+    - Counters for monitoring (see `stats()`)
+    """
+
+    def __init__(self, dsn: Optional[str] = None, min_size: int = 1, max_size: int = 20, timeout: float = 5.0):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._pool = None
+        self._loop = None
+        self._lock = None
+
+        # Statistics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._max_wait_time = 0.0
+
+    async def get_pool(self) -> asyncpg.Pool:
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and self._loop is loop:
+            return self._pool
+        if self._lock is None or self._loop is not loop:
+            stale, stale_loop = self._pool, self._loop
+            self._lock, self._loop, self._pool = asyncio.Lock(), loop, None
+            if stale is not None:
+                self._close_stale(stale, stale_loop)
+        async with self._lock:
+            if self._pool is None:
+                dsn = self.dsn or os.getenv("DATABASE_URL")
+                if not dsn:
+                    raise ValueError("DATABASE_URL environment variable is not set!")
+                self._pool = await asyncpg.create_pool(dsn, min_size=self.min_size, max_size=self.max_size)
+        return self._pool
+
+    @staticmethod
+    def _close_stale(pool: asyncpg.Pool, loop: Optional[asyncio.AbstractEventLoop]):
+        """
+        Closes a pool left behind on another event loop. Its connections belong
+        to that loop: a running loop closes them gracefully. A stopped or closed
+        one (e.g. after asyncio.run() returned) can no longer run
+        pool.terminate()'s callbacks, so the sockets are shut down directly and
+        the server ends those backends.
+        """
+        try:
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(pool.close(), loop)
+                return
+            for holder in pool._holders:
+                conn = holder._con
+                transport = conn._transport if conn is not None else None
+                sock = transport.get_extra_info("socket") if transport is not None else None
+                if sock is not None and sock.fileno() != -1:
+                    # A duplicate descriptor: the transport still owns (and later closes) the original
+                    with socket.socket(fileno=os.dup(sock.fileno())) as dup:
+                        dup.shutdown(socket.SHUT_RDWR)
+        except Exception as e:
+            logging.warning(f"Could not close the async pool of a previous event loop: {e}")
+
+    async def acquire(self) -> asyncpg.Connection:
+        pool = await self.get_pool()
+        started = time.monotonic()
+        try:
+            conn = await pool.acquire(timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise PoolTimeoutError(
+                f"Timed out after {self.timeout:.1f}s waiting for an async database connection "
+                f"({pool.get_size()}/{self.max_size} open)"
+            )
+        waited = time.monotonic() - started
+        self._checkouts += 1
+        self._wait_time_total += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
+        return conn
+
+    async def release(self, conn: asyncpg.Connection):
+        await self._pool.release(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def stats(self) -> dict:
+        pool = self._pool
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "open": pool.get_size() if pool is not None else 0,
+            "idle": pool.get_idle_size() if pool is not None else 0,
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+            "avg_wait_ms": round(self._wait_time_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+            "max_wait_ms": round(self._max_wait_time * 1000, 3),
+        }
+
+
+def create_async_pool_from_env() -> AsyncPool:
+    """Builds the pool using ASYNC_DB_POOL_MIN, ASYNC_DB_POOL_MAX and ASYNC_DB_POOL_TIMEOUT."""
+    return AsyncPool(
+        min_size=int(os.getenv("ASYNC_DB_POOL_MIN", "1")),
+        max_size=int(os.getenv("ASYNC_DB_POOL_MAX", "16")),
+        timeout=float(os.getenv("ASYNC_DB_POOL_TIMEOUT", "5")),
+    )
+
+
+async_pool = create_async_pool_from_env()
+
+
+class AsyncUnitOfWork:
+    """
+    The async counterpart of UnitOfWork: one asyncpg connection and one
+    transaction for everything a request does.
+    - The connection is checked out (and the transaction begun) lazily, on first use
+    - Statements use psycopg2-style SQL and a params tuple, e.g.
+      `await uow.fetchrow("SELECT ... WHERE id = %s", (user_id,))`
+    - Nothing is committed until the endpoint calls commit(); the next
+      statement starts a new transaction. Anything left uncommitted is
+      rolled back when the unit of work is closed
+    """
+
+    def __init__(self, pool: AsyncPool = None):
+        self.pool = pool or async_pool
+        self._conn = None
+        self._tx = None
+
+    async def connection(self) -> asyncpg.Connection:
+        if self._conn is None:
+            self._conn = await self.pool.acquire()
+        if self._tx is None:
+            self._tx = self._conn.transaction()
+            await self._tx.start()
+        return self._conn
+
+    async def execute(self, sql: str, params: Sequence = ()) -> str:
+        return await (await self.connection()).execute(to_asyncpg_sql(sql), *params)
+
+    async def executemany(self, sql: str, params: Sequence[Sequence]):
+        await (await self.connection()).executemany(to_asyncpg_sql(sql), params)
+
+    async def fetch(self, sql: str, params: Sequence = ()) -> list:
+        return await (await self.connection()).fetch(to_asyncpg_sql(sql), *params)
+
+    async def fetchrow(self, sql: str, params: Sequence = ()) -> Optional[asyncpg.Record]:
+        return await (await self.connection()).fetchrow(to_asyncpg_sql(sql), *params)
+
+    async def fetchval(self, sql: str, params: Sequence = ()):
+        return await (await self.connection()).fetchval(to_asyncpg_sql(sql), *params)
+
+    async def commit(self):
+        if self._tx is not None:
+            tx, self._tx = self._tx, None
+            await tx.commit()
+
+    async def rollback(self):
+        if self._tx is not None:
+            tx, self._tx = self._tx, None
+            await tx.rollback()
+
+    async def close(self):
+        """Rolls back anything uncommitted and hands the connection back to the pool."""
+        if self._conn is not None:
+            try:
+                await self.rollback()
+            finally:
+                conn, self._conn = self._conn, None
+                await self.pool.release(conn)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+
+async def get_async_unit_of_work():
+    """FastAPI dependency yielding the request's AsyncUnitOfWork (shared per request, like get_unit_of_work)."""
+    uow = AsyncUnitOfWork()
+    try:
+        yield uow
+    finally:
+        await uow.close()
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from jose import jwt
+
+from . import security
+from .cache import LRUCache
+
+USER_SQL = "SELECT id, username, email, xp, is_admin FROM users WHERE username = %s"
+
+
+class AuthCache:
+    """
+    Per-worker cache for get_current_user, so authenticating a hot request
+    needs neither a signature check nor a database round trip.
+
+    - claims: token -> decoded claims, kept until the token expires. Only
+      tokens that verified are stored, so a forged one is checked every time.
+    - users: token subject (username) -> user row, for user_ttl seconds.
+      Endpoints that change a user's row on this worker invalidate or patch
+      it; other workers see the change when their entry expires, so the TTL
+      bounds how long a deleted or demoted user keeps access.
+    """
+
+    def __init__(self, max_entries: int = 10000, user_ttl: Optional[float] = 30.0):
+        self.claims = LRUCache(max_entries)
+        self.users = LRUCache(max_entries, ttl=user_ttl) if user_ttl else None
+        self._stats_lock = threading.Lock()
+        self._db_lookups = 0
+
+    def decode(self, token: str) -> dict:
+        """The token's verified claims; raises JWTError like jwt.decode."""
+        claims = self.claims.get(token)
+        if claims is not None:
+            if claims.get("exp", 0) > time.time():
+                return claims
+            self.claims.pop(token)
+        claims = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+        if "exp" in claims:
+            self.claims.set(token, claims, ttl=max(claims["exp"] - time.time(), 0))
+        return claims
+
+    def get_user(self, username: str, cur) -> Optional[dict]:
+        """The user row for a token subject, from the cache or with one query on `cur`."""
+        user = self._cached_user(username)
+        if user is not None:
+            return user
+        cur.execute(USER_SQL, (username,))
+        return self._loaded_user(username, cur.fetchone())
+
+    async def get_user_async(self, username: str, uow) -> Optional[dict]:
+        """get_user on an AsyncUnitOfWork."""
+        user = self._cached_user(username)
+        if user is not None:
+            return user
+        return self._loaded_user(username, await uow.fetchrow(USER_SQL, (username,)))
+
+    def _cached_user(self, username: str) -> Optional[dict]:
+        return self.users.get(username) if self.users is not None else None
+
+    def _loaded_user(self, username: str, row) -> Optional[dict]:
+        with self._stats_lock:
+            self._db_lookups += 1
+        if row is None:
+            return None
+        user = dict(row)
+        if self.users is not None:
+            self.users.set(username, user)
+        return user
+
+    def add_xp(self, username: str, xp_gain: int):
+        """Keeps a cached row's XP current after a committed XP change, without resetting its TTL."""
+        if self.users is not None and xp_gain:
+            user = self.users.get(username)
+            if user is not None:
+                with self._stats_lock:
+                    user['xp'] = user['xp'] + xp_gain
+
+    def invalidate(self, *usernames: str):
+        if self.users is not None:
+            for username in usernames:
+                self.users.pop(username)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            db_lookups = self._db_lookups
+        return {
+            "claims": self.claims.stats(),
+            "users": self.users.stats() if self.users is not None else None,
+            "db_lookups": db_lookups,
+        }
+
+
+def create_auth_cache_from_env() -> AuthCache:
+    """Builds the cache using AUTH_CACHE_MAX_ENTRIES and AUTH_CACHE_TTL_SECONDS (0 disables the user cache)."""
+    ttl = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+    return AuthCache(
+        max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+        user_ttl=ttl if ttl > 0 else None,
+    )
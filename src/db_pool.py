@@ -0,0 +1,268 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """
+    A regular psycopg2 connection whose close() hands it back to the pool
+    it came from instead of tearing down the socket. This keeps every
+    existing `conn.close()` call site working unchanged.
+    """
+    _pool = None
+    _last_used = 0.0
+
+    def close(self):
+        if self._pool is not None and not self.closed:
+            self._pool.putconn(self)
+        else:
+            super().close()
+
+    def close_for_real(self):
+        super().close()
+
+
+def connection_kwargs_from_env() -> dict:
+    """Parses DATABASE_URL (provided by docker-compose) into psycopg2.connect() kwargs."""
+    db_url_str = os.getenv("DATABASE_URL")
+    if not db_url_str:
+        raise ValueError("DATABASE_URL environment variable is not set!")
+
+    result = urlparse(db_url_str)
+    return {
+        "host": result.hostname,
+        "port": result.port,
+        "database": result.path[1:],  # The path has a leading '/', we strip it
+        "user": result.username,
+        "password": result.password,
+    }
+
+
+class ConnectionPool:
+    """
+    Thread-safe, process-wide pool of PooledConnection objects.
+    Features:
+    - Lazily opens up to `max_size` connections, keeps at least `min_size` warm
+    - Health check on every checkout (cheap status check, plus a `SELECT 1`
+      ping when the connection has been idle longer than `ping_after` seconds)
+    - Checkout timeout so a saturated pool fails fast instead of hanging
+    - Counters for monitoring (see `stats()`)
+    """
+
+    def __init__(self, connect_kwargs: dict, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 5.0, ping_after: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.pid = os.getpid()
+
+        self._idle = deque()
+        self._size = 0  # Open connections, idle + checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Statistics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_time_total = 0.0
+        self._max_wait_time = 0.0
+
+    def _connect(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.connect_kwargs)
+        conn._pool = self
+        conn._last_used = time.monotonic()
+        return conn
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - conn._last_used >= self.ping_after:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT 1")
+                cur.close()
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _discard(self, conn):
+        try:
+            conn.close_for_real()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def fill(self):
+        """Opens connections until `min_size` are available."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._created += 1
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def getconn(self, timeout: float = None):
+        """Checks out a healthy connection, waiting at most `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn = None
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for a database connection "
+                            f"({self._size}/{self.max_size} in use)"
+                        )
+                    self._cond.wait(remaining)
+                    if self._closed:
+                        raise psycopg2.pool.PoolError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()  # LIFO keeps the warmest connections busy
+                else:
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif not self._is_healthy(conn):
+                logging.warning("Discarding unhealthy pooled database connection")
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._wait_time_total += waited
+                self._max_wait_time = max(self._max_wait_time, waited)
+            return conn
+
+    def putconn(self, conn):
+        """Returns a connection to the pool, rolling back any unfinished transaction."""
+        if conn.closed or self._closed:
+            self._discard(conn)
+            return
+        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+        conn._last_used = time.monotonic()
+        with self._cond:
+            if not self._closed:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    def closeall(self):
+        """
+        Closes the pool: every idle connection is closed now, checked-out
+        connections are closed when returned, and getconn() raises PoolError
+        (waiters included) from here on.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "closed": self._closed,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "avg_wait_ms": round(self._wait_time_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait_time * 1000, 3),
+            }
+
+
+# --- Process-wide pool ---
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide pool, creating it from the environment on first use.
+    A pool inherited across fork() (e.g. gunicorn --preload) is dropped and
+    rebuilt, since sockets must never be shared between worker processes.
+    """
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = ConnectionPool(
+                connection_kwargs_from_env(),
+                min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX_SIZE", "4")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                ping_after=float(os.getenv("DB_POOL_PING_AFTER", "30")),
+            )
+            logging.info(f"Created database pool (min={_pool.min_size}, max={_pool.max_size})")
+        return _pool
+
+
+def get_pool_stats() -> dict:
+    """Returns statistics for this worker's pool (an empty pool if none was created yet)."""
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        return {}
+    return pool.stats()
@@ -0,0 +1,66 @@
+import numpy as np
+from typing import List, Optional
+
+# Answers whose cosine similarity to the reference answer exceeds this are correct
+SIMILARITY_THRESHOLD = 0.8
+
+# Reference embeddings are stored as raw float32 bytes in questions.answer_embedding
+# (384 dims for all-MiniLM-L6-v2 -> 1.5 KB per question)
+EMBEDDING_DTYPE = np.float32
+
+
+def normalize_answer(text: str) -> str:
+    """The same normalization is applied to learner and reference answers before encoding."""
+    return text.lower().strip()
+
+
+def encode_answers(model, texts: List[str], batch_size: int = 64) -> np.ndarray:
+    """Encodes a batch of answers into unit-length float32 embeddings (one row per answer)."""
+    embeddings = model.encode(
+        [normalize_answer(t) for t in texts],
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    return np.asarray(embeddings, dtype=EMBEDDING_DTYPE).reshape(len(texts), -1)
+
+
+def embedding_to_bytes(embedding: np.ndarray) -> bytes:
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def embedding_from_bytes(blob) -> Optional[np.ndarray]:
+    if blob is None:
+        return None
+    return np.frombuffer(bytes(blob), dtype=EMBEDDING_DTYPE)
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    if denom == 0.0:
+        return 0.0
+    return float(np.dot(a, b) / denom)
+
+
+def grade_answer(model, user_answer: str, correct_answer: str, reference_blob=None):
+    """
+    Grades an answer against the reference answer.
+    Only the learner's answer is encoded when the precomputed reference embedding
+    is available. Otherwise both are encoded in one batch and the new reference
+    embedding is returned so the caller can persist it.
+
+    Returns (is_correct, similarity_score, new_reference_blob_or_None).
+    """
+    reference = embedding_from_bytes(reference_blob)
+    new_reference_blob = None
+    if reference is not None:
+        user_embedding = encode_answers(model, [user_answer])[0]
+        if user_embedding.shape != reference.shape:
+            # Stored with a different model; re-encode and replace it
+            reference = None
+    if reference is None:
+        user_embedding, reference = encode_answers(model, [user_answer, correct_answer])
+        new_reference_blob = embedding_to_bytes(reference)
+
+    similarity_score = cosine_similarity(user_embedding, reference)
+    return similarity_score > SIMILARITY_THRESHOLD, similarity_score, new_reference_blob
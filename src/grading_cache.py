@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+from typing import Optional, Tuple
+
+from .async_db import rowcount
+from .cache import LRUCache
+from .grading_cascade import normalize_for_match
+
+# Loads the question and, when the Postgres tier is on, its cached result for
+# this answer in the same round trip. The join on reference_answer drops rows
+# written for an older correct answer, even if they raced an admin update.
+QUESTION_WITH_CACHED_RESULT_SQL = """
+    SELECT q.correct_answer_text, q.answer_embedding, q.difficulty_level,
+           gc.is_correct AS cached_is_correct, gc.similarity_score AS cached_similarity_score
+    FROM questions q
+    LEFT JOIN grading_cache gc
+      ON gc.question_id = q.id AND gc.answer_key = %s AND gc.reference_answer = q.correct_answer_text
+    WHERE q.id = %s;
+"""
+# Longer answers are not written to the table (its primary key is a btree)
+MAX_DB_ANSWER_LENGTH = 255
+
+SAVE_SQL = """
+    INSERT INTO grading_cache (question_id, answer_key, reference_answer, is_correct, similarity_score)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (question_id, answer_key) DO UPDATE
+    SET reference_answer = EXCLUDED.reference_answer, is_correct = EXCLUDED.is_correct,
+        similarity_score = EXCLUDED.similarity_score, created_at = CURRENT_TIMESTAMP;
+"""
+TRIM_SQL = """
+    DELETE FROM grading_cache WHERE (question_id, answer_key) IN (
+        SELECT question_id, answer_key FROM grading_cache ORDER BY created_at DESC OFFSET %s
+    );
+"""
+
+QUESTION_SQL = """
+    SELECT correct_answer_text, answer_embedding, difficulty_level,
+           NULL AS cached_is_correct, NULL AS cached_similarity_score
+    FROM questions WHERE id = %s;
+"""
+
+
+class GradingResultCache:
+    """
+    Remembers embedding-graded results as
+    (question_id, normalized answer) -> (is_correct, similarity_score).
+
+    Two tiers: a per-worker LRU, and optionally the grading_cache table that
+    all workers share. Local keys include the normalized correct answer, so an
+    edited question can never be served a stale result, and invalidate() frees
+    the old entries. The table is capped at db_max_rows, oldest rows first.
+    """
+
+    def __init__(self, max_size: int = 10000, use_db: bool = False, db_max_rows: int = 100000,
+                 trim_every: int = 1000):
+        self.local = LRUCache(max_size)
+        self.use_db = use_db
+        self.db_max_rows = db_max_rows
+        self.trim_every = trim_every
+        self._stats_lock = threading.Lock()
+        self._db_hits = 0
+        self._misses = 0
+        self._saves_since_trim = 0
+        self._db_rows_trimmed = 0
+
+    @staticmethod
+    def answer_key(user_answer: str) -> str:
+        return normalize_for_match(user_answer)
+
+    def _local_key(self, question_id: int, correct_answer: str, user_answer: str):
+        return question_id, normalize_for_match(correct_answer), self.answer_key(user_answer)
+
+    def question_query(self, question_id: int, user_answer: str):
+        """SQL and parameters for submit_answer's question lookup."""
+        if self.use_db:
+            return QUESTION_WITH_CACHED_RESULT_SQL, (self.answer_key(user_answer), question_id)
+        return QUESTION_SQL, (question_id,)
+
+    def get(self, question_id: int, correct_answer: str, user_answer: str,
+            stored_result: Optional[Tuple[bool, float]] = None) -> Optional[Tuple[bool, float]]:
+        """
+        Returns (is_correct, similarity_score) from the local tier, else from
+        `stored_result` (the grading_cache columns of the question lookup), else None.
+        """
+        key = self._local_key(question_id, correct_answer, user_answer)
+        result = self.local.get(key)
+        if result is not None:
+            return result
+        if stored_result is not None and stored_result[0] is not None:
+            result = (bool(stored_result[0]), float(stored_result[1]))
+            self.local.set(key, result)
+            with self._stats_lock:
+                self._db_hits += 1
+            return result
+        with self._stats_lock:
+            self._misses += 1
+        return None
+
+    def put(self, question_id: int, correct_answer: str, user_answer: str, is_correct: bool, score: float):
+        self.local.set(self._local_key(question_id, correct_answer, user_answer), (is_correct, score))
+
+    def save(self, cur, question_id: int, correct_answer: str, user_answer: str, is_correct: bool, score: float):
+        """Writes a freshly graded result to the shared table (in the caller's transaction)."""
+        answer_key = self.answer_key(user_answer)
+        if not self.use_db or len(answer_key) > MAX_DB_ANSWER_LENGTH:
+            return
+        cur.execute(SAVE_SQL, (question_id, answer_key, correct_answer, is_correct, score))
+        if self._count_save():
+            self.trim(cur)
+
+    async def save_async(self, uow, question_id: int, correct_answer: str, user_answer: str, is_correct: bool, score: float):
+        """save() on an AsyncUnitOfWork."""
+        answer_key = self.answer_key(user_answer)
+        if not self.use_db or len(answer_key) > MAX_DB_ANSWER_LENGTH:
+            return
+        await uow.execute(SAVE_SQL, (question_id, answer_key, correct_answer, is_correct, score))
+        if self._count_save():
+            self._trimmed(rowcount(await uow.execute(TRIM_SQL, (self.db_max_rows,))))
+
+    def _count_save(self) -> bool:
+        """Counts a save; True when this one should also trim the table."""
+        with self._stats_lock:
+            self._saves_since_trim += 1
+            trim = self._saves_since_trim >= self.trim_every
+            if trim:
+                self._saves_since_trim = 0
+            return trim
+
+    def trim(self, cur):
+        """Deletes the oldest rows beyond db_max_rows."""
+        cur.execute(TRIM_SQL, (self.db_max_rows,))
+        self._trimmed(cur.rowcount)
+
+    def _trimmed(self, count: int):
+        with self._stats_lock:
+            self._db_rows_trimmed += count
+        if count:
+            logging.info(f"Trimmed {count} rows from grading_cache")
+
+    def invalidate(self, question_id: int, cur=None):
+        """Drops every cached result for a question whose correct answer changed (or was deleted)."""
+        removed = self.local.discard_where(lambda key: key[0] == question_id)
+        if self.use_db and cur is not None:
+            cur.execute("DELETE FROM grading_cache WHERE question_id = %s;", (question_id,))
+        return removed
+
+    def stats(self) -> dict:
+        local = self.local.stats()
+        with self._stats_lock:
+            lookups = local["hits"] + self._db_hits + self._misses
+            return {
+                "db_tier": self.use_db,
+                "local": local,
+                "local_hits": local["hits"],
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+                "hit_rate": round((local["hits"] + self._db_hits) / lookups, 4) if lookups else 0.0,
+                "db_max_rows": self.db_max_rows if self.use_db else None,
+                "db_rows_trimmed": self._db_rows_trimmed,
+            }
+
+
+def create_result_cache_from_env() -> GradingResultCache:
+    """Builds the cache using GRADING_CACHE_SIZE, GRADING_CACHE_DB and GRADING_CACHE_DB_MAX_ROWS."""
+    return GradingResultCache(
+        max_size=int(os.getenv("GRADING_CACHE_SIZE", "10000")),
+        use_db=os.getenv("GRADING_CACHE_DB", "0") == "1",
+        db_max_rows=int(os.getenv("GRADING_CACHE_DB_MAX_ROWS", "100000")),
+    )
@@ -0,0 +1,224 @@
+import os
+import re
+import threading
+import time
+from fractions import Fraction
+from typing import Optional, Tuple
+
+from .grading import SIMILARITY_THRESHOLD, grade_answer
+
+# Tiers in the order they are tried; "cache" replays earlier embedding decisions
+# (see grading_cache.py) and "embedding" is the MiniLM cosine, which always decides
+TIERS = ("exact", "numeric", "lexical", "cache", "embedding")
+
+# Lexical similarity at or above this accepts the answer without encoding it.
+# The lexical tier never rejects: low character overlap says nothing about
+# meaning ("two and a half hours" vs "2.5 hours").
+LEXICAL_ACCEPT_THRESHOLD = 0.9
+
+_NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_SCALE_WORDS = {"hundred": 100, "thousand": 1000, "million": 1000000}
+
+# Spellings of the same unit; anything else is compared as written (minus a plural "s")
+_UNIT_ALIASES = {
+    "m": "m", "meter": "m", "metre": "m",
+    "cm": "cm", "centimeter": "cm", "centimetre": "cm",
+    "km": "km", "kilometer": "km", "kilometre": "km",
+    "h": "h", "hr": "h", "hour": "h",
+    "min": "min", "minute": "min",
+    "s": "s", "sec": "s", "second": "s",
+    "kg": "kg", "kilogram": "kg", "g": "g", "gram": "g",
+    "km/h": "km/h", "kmh": "km/h", "kph": "km/h",
+    "%": "%", "percent": "%",
+}
+_KNOWN_UNITS = set(_UNIT_ALIASES.values())
+
+_NUMERIC_RE = re.compile(
+    r"^(?:[a-z]\s*=\s*)?"                                # "x = 7"
+    r"(?P<number>[-+]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|[-+]?\.\d+|\d+\s*/\s*\d+)"
+    r"\s*(?P<unit>[a-z%/²³^ .]{0,24})$"
+)
+
+
+def normalize_for_match(text: str) -> str:
+    """Lower-cased, whitespace collapsed, trailing sentence punctuation removed."""
+    return re.sub(r"\s+", " ", text.lower()).strip().rstrip(".!?;").strip()
+
+
+def _strip_punctuation(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def _canonical_unit(unit: str) -> str:
+    unit = unit.strip().rstrip(".")
+    if not unit:
+        return ""
+    if unit in _UNIT_ALIASES:
+        return _UNIT_ALIASES[unit]
+    singular = unit[:-1] if unit.endswith("s") else unit
+    return _UNIT_ALIASES.get(singular, singular)
+
+
+def _parse_number_words(text: str) -> Optional[int]:
+    words = [w for w in text.replace("-", " ").split() if w != "and"]
+    if not words:
+        return None
+    total = current = 0
+    for word in words:
+        if word in _NUMBER_WORDS:
+            current += _NUMBER_WORDS[word]
+        elif word in _SCALE_WORDS:
+            current = max(current, 1) * _SCALE_WORDS[word]
+            if _SCALE_WORDS[word] >= 1000:
+                total, current = total + current, 0
+        else:
+            return None
+    return total + current
+
+
+def parse_numeric(text: str) -> Optional[Tuple[Fraction, str]]:
+    """
+    Parses an answer such as "2.5 hours", "1,000", "3/4", "x = 7" or
+    "thirty six meters" into (value, canonical_unit).
+    Returns None when the answer is not a number (with an optional unit),
+    including fractions with a zero denominator such as "3/0".
+    """
+    text = normalize_for_match(text)
+    match = _NUMERIC_RE.match(text)
+    if match:
+        number = match.group("number").replace(",", "").replace(" ", "")
+        try:
+            return Fraction(number), _canonical_unit(match.group("unit"))
+        except ZeroDivisionError:
+            return None
+    words = text.split()
+    for split in range(len(words), 0, -1):  # longest run of number words, the rest is the unit
+        value = _parse_number_words(" ".join(words[:split]))
+        if value is not None:
+            # Only a known unit may follow number words: "two and a half" is not 2
+            unit = _canonical_unit(" ".join(words[split:]))
+            return (Fraction(value), unit) if unit in _KNOWN_UNITS or not unit else None
+    return None
+
+
+def numbers_match(user: Fraction, reference: Fraction, rel_tol: float) -> bool:
+    """Equal within `rel_tol` of the reference ("314" and "314.2" both match 314.16 at 0.1%)."""
+    return abs(user - reference) <= abs(reference) * Fraction(rel_tol)
+
+
+def character_trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def lexical_similarity(a: str, b: str) -> float:
+    """Dice coefficient over character trigrams; cheap and robust to small typos."""
+    grams_a, grams_b = character_trigrams(a), character_trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class GradingCascade:
+    """
+    Grades answers through increasingly expensive tiers and stops at the first
+    one that can decide:
+
+    1. exact   - normalized strings are equal
+    2. numeric - both sides are numbers (units stripped, number words parsed);
+                 decides either way unless the units disagree
+    3. lexical - near-identical text is accepted without encoding
+    4. cache   - this answer was embedding-graded before (needs question_id)
+    5. embedding - the MiniLM cosine > SIMILARITY_THRESHOLD (grading.grade_answer)
+
+    Keeps per-tier hit counts and latency so /admin/grading shows how many
+    transformer encodes the earlier tiers save.
+    """
+
+    def __init__(self, numeric_rel_tol: float = 1e-3, lexical_threshold: float = LEXICAL_ACCEPT_THRESHOLD,
+                 result_cache=None):
+        self.numeric_rel_tol = numeric_rel_tol
+        self.lexical_threshold = lexical_threshold
+        self.result_cache = result_cache
+        self._stats_lock = threading.Lock()
+        self._hits = {tier: 0 for tier in TIERS}
+        self._time_total = {tier: 0.0 for tier in TIERS}
+
+    def _cheap_tiers(self, user_answer: str, correct_answer: str):
+        """Returns (tier, is_correct, score) from the first deciding cheap tier, or None."""
+        user, reference = normalize_for_match(user_answer), normalize_for_match(correct_answer)
+        if user == reference:
+            return "exact", True, 1.0
+
+        user_number, reference_number = parse_numeric(user), parse_numeric(reference)
+        if user_number is not None and reference_number is not None:
+            (user_value, user_unit), (ref_value, ref_unit) = user_number, reference_number
+            if not (user_unit and ref_unit and user_unit != ref_unit):
+                is_correct = numbers_match(user_value, ref_value, self.numeric_rel_tol)
+                return "numeric", is_correct, 1.0 if is_correct else 0.0
+
+        score = lexical_similarity(_strip_punctuation(user), _strip_punctuation(reference))
+        if score >= self.lexical_threshold:
+            return "lexical", True, score
+        return None
+
+    def grade(self, model, user_answer: str, correct_answer: str, reference_blob=None,
+              question_id: int = None, stored_result=None):
+        """
+        Same contract as grading.grade_answer, plus the deciding tier:
+        returns (is_correct, similarity_score, new_reference_blob_or_None, tier).
+        `stored_result` is the (is_correct, score) pair the shared cache table
+        returned for this answer, if any.
+        """
+        started = time.perf_counter()
+        new_reference_blob = None
+        decided = self._cheap_tiers(user_answer, correct_answer)
+        use_cache = self.result_cache is not None and question_id is not None
+        if decided is None and use_cache:
+            cached = self.result_cache.get(question_id, correct_answer, user_answer, stored_result)
+            if cached is not None:
+                decided = ("cache",) + cached
+        if decided is not None:
+            tier, is_correct, score = decided
+        else:
+            tier = "embedding"
+            is_correct, score, new_reference_blob = grade_answer(model, user_answer, correct_answer, reference_blob)
+            if use_cache:
+                self.result_cache.put(question_id, correct_answer, user_answer, is_correct, score)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._hits[tier] += 1
+            self._time_total[tier] += elapsed
+        return is_correct, score, new_reference_blob, tier
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = sum(self._hits.values())
+            tiers = {
+                tier: {
+                    "hits": self._hits[tier],
+                    "hit_rate": round(self._hits[tier] / total, 4) if total else 0.0,
+                    "avg_ms": round(self._time_total[tier] / self._hits[tier] * 1000, 3) if self._hits[tier] else 0.0,
+                }
+                for tier in TIERS
+            }
+            return {
+                "graded": total,
+                "encodes_avoided": total - self._hits["embedding"],
+                "similarity_threshold": SIMILARITY_THRESHOLD,
+                "tiers": tiers,
+            }
+
+
+def create_cascade_from_env(result_cache=None) -> GradingCascade:
+    """Builds the cascade using GRADER_NUMERIC_REL_TOL and GRADER_LEXICAL_THRESHOLD."""
+    return GradingCascade(
+        numeric_rel_tol=float(os.getenv("GRADER_NUMERIC_REL_TOL", "0.001")),
+        lexical_threshold=float(os.getenv("GRADER_LEXICAL_THRESHOLD", str(LEXICAL_ACCEPT_THRESHOLD))),
+        result_cache=result_cache,
+    )
@@ -0,0 +1,150 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+import numpy as np
+
+
+class MicroBatchEncoder:
+    """
+    Collects encode requests from concurrent request threads and runs them
+    through the model as a single batch.
+    Features:
+    - A batch is flushed when `max_batch` texts are waiting or `window_ms`
+      has passed since the first text arrived, whichever comes first
+    - Drop-in for SentenceTransformer.encode() as used by src.grading
+      (always returns unit-length numpy embeddings)
+    - Queue depth and batch size metrics (see `stats()`)
+    """
+
+    def __init__(self, model, window_ms: float = 5.0, max_batch: int = 32):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+        # Statistics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._batch_sizes = {}  # size -> count
+        self._queue_wait_total = 0.0
+        self._encode_time_total = 0.0
+        self._max_queue_depth = 0
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so each gunicorn worker starts its own
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="grading-batcher", daemon=True)
+                self._worker.start()
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        """
+        Blocks until every text has been encoded as part of some batch.
+        Keyword arguments are accepted for compatibility with
+        SentenceTransformer.encode() and ignored.
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._ensure_worker()
+
+        futures = []
+        enqueued_at = time.perf_counter()
+        for text in texts:
+            future = Future()
+            futures.append(future)
+            self._queue.put((text, future, enqueued_at))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+
+        embeddings = np.stack([f.result() for f in futures])
+        return embeddings[0] if single else embeddings
+
+    def _collect_batch(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+            try:
+                embeddings = self.model.encode(
+                    texts,
+                    batch_size=len(texts),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+            except Exception as e:
+                logging.error(f"Batched encode of {len(texts)} answers failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            for (_, future, _), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._queue_wait_total += sum(started - enqueued_at for _, _, enqueued_at in batch)
+                self._encode_time_total += finished - started
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch": self.max_batch,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "avg_queue_wait_ms": round(self._queue_wait_total / self._items * 1000, 3) if self._items else 0.0,
+                "avg_encode_ms": round(self._encode_time_total / self._batches * 1000, 3) if self._batches else 0.0,
+            }
+
+
+def create_encoder_from_env(model) -> MicroBatchEncoder:
+    """Builds the grading encoder using GRADER_BATCH_WINDOW_MS and GRADER_MAX_BATCH."""
+    return MicroBatchEncoder(
+        model,
+        window_ms=float(os.getenv("GRADER_BATCH_WINDOW_MS", "5")),
+        max_batch=int(os.getenv("GRADER_MAX_BATCH", "32")),
+    )
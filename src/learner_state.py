@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import psycopg2.extras
+
+from .adaptive_engine import get_db_connection
+from .async_db import rowcount
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    # learning_models imports this module to build its store
+    from .learning_models import LearnerState
+
+LEARNER_STATE_BACKENDS = ("memory", "postgres")
+
+LOAD_SQL = "SELECT state FROM learner_state WHERE user_id = %s AND lesson_id = %s"
+UPSERT_SQL = """
+    INSERT INTO learner_state (user_id, lesson_id, state, updated_at)
+    VALUES (%s, %s, %s::jsonb, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id, lesson_id)
+    DO UPDATE SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at;
+"""
+PURGE_SQL = "DELETE FROM learner_state WHERE updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second';"
+
+
+class MemoryStateStore:
+    """
+    Per-worker LearnerState objects in a bounded LRU: at most max_entries
+    (user_id, lesson_id) states, each dropped after ttl seconds without use.
+    States are mutated in place, so save() only refreshes the entry.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int = 100000, ttl: Optional[float] = None):
+        self._states = LRUCache(max_entries, ttl=ttl)
+
+    def load(self, key: Tuple[int, int], cur=None) -> Optional['LearnerState']:
+        return self._states.get(key)
+
+    def save(self, key: Tuple[int, int], state: 'LearnerState', cur=None):
+        self._states.set(key, state)
+
+    async def load_async(self, key: Tuple[int, int], uow=None) -> Optional['LearnerState']:
+        return self._states.get(key)
+
+    async def save_async(self, key: Tuple[int, int], state: 'LearnerState', uow=None):
+        self._states.set(key, state)
+
+    def load_many(self, keys: List[Tuple[int, int]], cur=None) -> Dict[Tuple[int, int], 'LearnerState']:
+        states = {}
+        for key in keys:
+            state = self._states.get(key)
+            if state is not None:
+                states[key] = state
+        return states
+
+    def save_many(self, states: Dict[Tuple[int, int], 'LearnerState'], cur=None):
+        for key, state in states.items():
+            self._states.set(key, state)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._states
+
+    def __getitem__(self, key: Hashable) -> 'LearnerState':
+        state = self.load(key)
+        if state is None:
+            raise KeyError(key)
+        return state
+
+    def __setitem__(self, key: Hashable, state: 'LearnerState'):
+        self.save(key, state)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def clear(self):
+        self._states.clear()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self._states.stats()}
+
+
+class PostgresStateStore:
+    """
+    Learner states in the learner_state table, so every worker sees the same
+    difficulty, confidence scores and momentum for a learner.
+
+    load() reads the row with FOR UPDATE when given the request's cursor, so
+    two requests of the same learner on different workers take turns instead
+    of overwriting each other; save() upserts in the same transaction. Rows
+    unused for ttl seconds are purged every purge_every saves.
+
+    The store only moves JSON: encode/decode convert between a LearnerState
+    and a JSON-compatible dict.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, encode: Callable[['LearnerState'], dict], decode: Callable[[dict], 'LearnerState'],
+                 ttl: Optional[float] = None, purge_every: int = 1000):
+        self.encode = encode
+        self.decode = decode
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._stats_lock = threading.Lock()
+        self._loads = 0
+        self._misses = 0
+        self._saves = 0
+        self._saves_since_purge = 0
+        self._rows_purged = 0
+        self._total_ms = 0.0
+
+    def _run(self, cur, fn):
+        """Runs fn(cursor) on the caller's cursor, or on a pooled connection that commits on its own."""
+        if cur is not None:
+            return fn(cur)
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as own_cur:
+                result = fn(own_cur)
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+
+    def load(self, key: Tuple[int, int], cur=None) -> Optional['LearnerState']:
+        started = time.perf_counter()
+        lock = " FOR UPDATE" if cur is not None else ""
+
+        def fetch(c):
+            c.execute(f"{LOAD_SQL}{lock};", key)
+            return c.fetchone()
+
+        return self._loaded(self._run(cur, fetch), started)
+
+    def _loaded(self, row, started: float) -> Optional['LearnerState']:
+        with self._stats_lock:
+            self._loads += 1
+            self._misses += row is None
+            self._total_ms += (time.perf_counter() - started) * 1000
+        if row is None:
+            return None
+        state = row[0]
+        return self.decode(json.loads(state) if isinstance(state, str) else state)
+
+    def _count_save(self) -> bool:
+        """Counts a save; True when this one should also purge idle rows."""
+        with self._stats_lock:
+            self._saves += 1
+            self._saves_since_purge += 1
+            purge = self.ttl is not None and self._saves_since_purge >= self.purge_every
+            if purge:
+                self._saves_since_purge = 0
+            return purge
+
+    def save(self, key: Tuple[int, int], state: 'LearnerState', cur=None):
+        started = time.perf_counter()
+        payload = json.dumps(self.encode(state))
+        purge = self._count_save()
+
+        def upsert(c):
+            c.execute(UPSERT_SQL, (key[0], key[1], payload))
+            if purge:
+                self.purge(c)
+
+        self._run(cur, upsert)
+        with self._stats_lock:
+            self._total_ms += (time.perf_counter() - started) * 1000
+
+    async def load_async(self, key: Tuple[int, int], uow) -> Optional['LearnerState']:
+        """load() on an AsyncUnitOfWork; the row stays locked until the request's transaction ends."""
+        started = time.perf_counter()
+        return self._loaded(await uow.fetchrow(f"{LOAD_SQL} FOR UPDATE;", key), started)
+
+    async def save_async(self, key: Tuple[int, int], state: 'LearnerState', uow):
+        started = time.perf_counter()
+        payload = json.dumps(self.encode(state))
+        purge = self._count_save()
+        await uow.execute(UPSERT_SQL, (key[0], key[1], payload))
+        if purge:
+            self._purged(rowcount(await uow.execute(PURGE_SQL, (self.ttl,))))
+        with self._stats_lock:
+            self._total_ms += (time.perf_counter() - started) * 1000
+
+    def load_many(self, keys: List[Tuple[int, int]], cur=None) -> Dict[Tuple[int, int], 'LearnerState']:
+        """Loads (and, with the caller's cursor, locks) many states in one query."""
+        started = time.perf_counter()
+        lock = " FOR UPDATE" if cur is not None else ""
+
+        def fetch(c):
+            c.execute(
+                f"""
+                SELECT user_id, lesson_id, state FROM learner_state
+                WHERE (user_id, lesson_id) IN (SELECT * FROM unnest(%s::int[], %s::int[])){lock};
+                """,
+                ([key[0] for key in keys], [key[1] for key in keys])
+            )
+            return c.fetchall()
+
+        rows = self._run(cur, fetch)
+        with self._stats_lock:
+            self._loads += len(keys)
+            self._misses += len(keys) - len(rows)
+            self._total_ms += (time.perf_counter() - started) * 1000
+        return {
+            (user_id, lesson_id): self.decode(json.loads(state) if isinstance(state, str) else state)
+            for user_id, lesson_id, state in rows
+        }
+
+    def save_many(self, states: Dict[Tuple[int, int], 'LearnerState'], cur=None):
+        """Upserts many states in one statement."""
+        started = time.perf_counter()
+        values = [(key[0], key[1], json.dumps(self.encode(state))) for key, state in states.items()]
+
+        def upsert(c):
+            psycopg2.extras.execute_values(
+                c,
+                """
+                INSERT INTO learner_state (user_id, lesson_id, state, updated_at) VALUES %s
+                ON CONFLICT (user_id, lesson_id)
+                DO UPDATE SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at;
+                """,
+                values,
+                template="(%s, %s, %s::jsonb, CURRENT_TIMESTAMP)",
+                page_size=1000
+            )
+
+        if values:
+            self._run(cur, upsert)
+        with self._stats_lock:
+            self._saves += len(values)
+            self._total_ms += (time.perf_counter() - started) * 1000
+
+    def purge(self, cur):
+        """Deletes states not used for ttl seconds; those learners restart from the defaults."""
+        cur.execute(PURGE_SQL, (self.ttl,))
+        self._purged(cur.rowcount)
+
+    def _purged(self, count: int):
+        with self._stats_lock:
+            self._rows_purged += count
+        if count:
+            logging.info(f"Purged {count} idle learner states")
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.load(key) is not None
+
+    def __getitem__(self, key: Hashable) -> 'LearnerState':
+        state = self.load(key)
+        if state is None:
+            raise KeyError(key)
+        return state
+
+    def __setitem__(self, key: Hashable, state: 'LearnerState'):
+        self.save(key, state)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            operations = self._loads + self._saves
+            return {
+                "backend": self.backend,
+                "ttl_seconds": self.ttl,
+                "loads": self._loads,
+                "misses": self._misses,
+                "saves": self._saves,
+                "rows_purged": self._rows_purged,
+                "avg_ms": round(self._total_ms / operations, 3) if operations else 0.0,
+            }
+
+
+def get_state_backend() -> str:
+    backend = os.getenv("LEARNER_STATE_BACKEND", "memory").lower()
+    if backend not in LEARNER_STATE_BACKENDS:
+        raise ValueError(f"LEARNER_STATE_BACKEND must be one of {', '.join(LEARNER_STATE_BACKENDS)}, got {backend!r}")
+    return backend
+
+
+def create_state_store_from_env(encode: Callable[['LearnerState'], Any], decode: Callable[[Any], 'LearnerState']):
+    ttl = float(os.getenv("LEARNER_STATE_TTL_SECONDS", "86400"))
+    ttl = ttl if ttl > 0 else None
+    if get_state_backend() == "postgres":
+        return PostgresStateStore(encode, decode, ttl=ttl)
+    return MemoryStateStore(max_entries=int(os.getenv("LEARNER_STATE_MAX_ENTRIES", "100000")), ttl=ttl)
@@ -1,15 +1,47 @@
 import numpy as np
 import logging
+from array import array
+import os
 import random
 import math
-from typing import Dict, Any, List, Tuple
-from collections import deque
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 import time
 from dataclasses import dataclass
 # ADD THIS IMPORT AT THE TOP OF THE FILE
 from .adaptive_engine import get_db_connection
+from .learner_state import create_state_store_from_env
 import psycopg2.extras # Often needed with DictCursor
 
+# --- Queries shared by the sync (psycopg2) and async (asyncpg) paths ---
+BANDIT_UPSERT_SQL = """
+    INSERT INTO bandit_state (user_id, lesson_id, difficulty_level, times_selected, successful_outcomes)
+    VALUES (%s, %s, %s, 1, %s) 
+    ON CONFLICT (user_id, lesson_id, difficulty_level)
+    DO UPDATE SET
+        times_selected = bandit_state.times_selected + 1,
+        successful_outcomes = bandit_state.successful_outcomes + %s
+"""
+
+WINDOW_TOTAL_SQL = "SELECT COALESCE(SUM(times_selected), 0) FROM bandit_state WHERE user_id = %s AND lesson_id = %s"
+
+# Recent attempts with timing data; answers_total comes from the same
+# snapshot so later answers can be detected
+RECENT_ATTEMPTS_SQL = """
+    SELECT 
+        up.is_correct,
+        up.answered_at,
+        q.difficulty_level,
+        EXTRACT(EPOCH FROM (up.answered_at - LAG(up.answered_at) OVER (ORDER BY up.answered_at))) as response_time,
+        (SELECT COALESCE(SUM(times_selected), 0) FROM bandit_state
+         WHERE user_id = %s AND lesson_id = %s) as answers_total
+    FROM user_progress up
+    JOIN questions q ON up.question_id = q.id
+    WHERE up.user_id = %s AND q.lesson_id = %s
+    ORDER BY up.answered_at DESC
+    LIMIT %s
+"""
+
 @dataclass
 class PerformanceMetrics:
     """Lightweight performance tracking structure."""
@@ -21,6 +53,405 @@ class PerformanceMetrics:
     difficulty_stability: float = 0.0
     learning_velocity: float = 0.0
 
+
+class PerformanceWindow:
+    """
+    The last `capacity` attempts of one user in one lesson, kept in a ring
+    buffer with running counts so that recording an answer and reading the
+    metrics are both O(1). Produces the same PerformanceMetrics as the
+    user_progress window query in get_enhanced_performance_metrics.
+
+    Attempts live in two typed arrays (difficulty * 2 + is_correct, and the
+    response time with NaN for "unknown") instead of a list of tuples.
+
+    `synced_total` is the number of answers the window has seen according to
+    bandit_state, used to detect answers recorded by another worker.
+    """
+
+    MAX_DIFFICULTY = 5
+
+    __slots__ = ('capacity', '_flags', '_response_times', '_head', '_size', '_correct', '_recent_correct',
+                 '_response_time_sum', '_response_time_count', '_per_difficulty', '_run_length', '_run_correct',
+                 'last_answered_at', 'synced_total')
+
+    def __init__(self, capacity: int = 12):
+        self.capacity = capacity
+        self._flags = array('B', bytes(capacity))  # difficulty * 2 + is_correct
+        self._response_times = array('d', bytes(8 * capacity))
+        self._head = 0          # index of the oldest attempt
+        self._size = 0
+        self._correct = 0
+        self._recent_correct = 0  # correct answers among the newest size // 2 attempts
+        self._response_time_sum = 0.0
+        self._response_time_count = 0
+        self._per_difficulty = array('H', bytes(4 * (self.MAX_DIFFICULTY + 1)))  # attempts, correct per level
+        self._run_length = 0
+        self._run_correct = None
+        self.last_answered_at: Optional[float] = None
+        self.synced_total: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _newest_index(self, offset: int) -> int:
+        """Slot of the attempt `offset` places before the newest one (0 = newest)."""
+        return (self._head + self._size - 1 - offset) % self.capacity
+
+    def _newest(self, offset: int) -> Tuple[bool, int, Optional[float]]:
+        index = self._newest_index(offset)
+        flags, response_time = self._flags[index], self._response_times[index]
+        return bool(flags & 1), flags >> 1, None if math.isnan(response_time) else response_time
+
+    def record(self, is_correct: bool, difficulty: int, answered_at: float = None,
+               response_time: Optional[float] = None):
+        """Appends an attempt, evicting the oldest when full. The response time
+        defaults to the gap since the previous attempt, like the LAG() query."""
+        answered_at = time.time() if answered_at is None else answered_at
+        if response_time is None and self.last_answered_at is not None:
+            response_time = answered_at - self.last_answered_at
+        self.last_answered_at = answered_at
+        is_correct = bool(is_correct)
+
+        if self._size == self.capacity:
+            old_flags, old_response_time = self._flags[self._head], self._response_times[self._head]
+            old_correct, old_difficulty = old_flags & 1, old_flags >> 1
+            self._head = (self._head + 1) % self.capacity
+            self._size -= 1
+            self._correct -= old_correct
+            self._per_difficulty[2 * old_difficulty] -= 1
+            self._per_difficulty[2 * old_difficulty + 1] -= old_correct
+            if not math.isnan(old_response_time):
+                self._response_time_sum -= old_response_time
+                self._response_time_count -= 1
+            if self._size // 2 != (self._size + 1) // 2:
+                # The recent half shrank with the window
+                self._recent_correct -= self._flags[self._newest_index(self._size // 2)] & 1
+
+        recent_before = self._size // 2
+        index = (self._head + self._size) % self.capacity
+        self._flags[index] = difficulty * 2 + is_correct
+        self._response_times[index] = math.nan if response_time is None else response_time
+        self._size += 1
+        self._correct += is_correct
+        self._recent_correct += is_correct
+        if self._size // 2 == recent_before:
+            # The recent half did not grow, so its oldest attempt moves to the older half
+            self._recent_correct -= self._flags[self._newest_index(recent_before)] & 1
+        self._per_difficulty[2 * difficulty] += 1
+        self._per_difficulty[2 * difficulty + 1] += is_correct
+        if response_time is not None:
+            self._response_time_sum += response_time
+            self._response_time_count += 1
+
+        if self._run_correct == is_correct:
+            self._run_length += 1
+        else:
+            self._run_correct, self._run_length = is_correct, 1
+        if self.synced_total is not None:
+            self.synced_total += 1
+
+    @classmethod
+    def from_attempts(cls, attempts: List, capacity: int = 12) -> 'PerformanceWindow':
+        """Rebuilds a window from query rows ordered newest first."""
+        window = cls(capacity)
+        for attempt in reversed(attempts[:capacity]):
+            answered_at = attempt.get('answered_at')
+            window.record(
+                bool(attempt['is_correct']),
+                int(attempt['difficulty_level']),
+                answered_at.timestamp() if hasattr(answered_at, 'timestamp') else None,
+                # The first attempt of the window keeps the gap to the attempt before it
+                response_time=float(attempt['response_time']) if attempt.get('response_time') is not None else None,
+            )
+        return window
+
+    def to_state(self) -> dict:
+        """JSON-compatible snapshot, oldest attempt first (for the shared learner state store)."""
+        return {
+            'capacity': self.capacity,
+            'attempts': [list(self._newest(offset)) for offset in range(self._size - 1, -1, -1)],
+            'last_answered_at': self.last_answered_at,
+            'synced_total': self.synced_total,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> 'PerformanceWindow':
+        window = cls(state['capacity'])
+        for is_correct, difficulty, response_time in state['attempts']:
+            window.last_answered_at = None  # keep the stored gaps as they are
+            window.record(is_correct, difficulty, 0.0, response_time)
+        window.last_answered_at = state['last_answered_at']
+        window.synced_total = state['synced_total']
+        return window
+
+    def metrics(self) -> PerformanceMetrics:
+        size = self._size
+        if size == 0:
+            return PerformanceMetrics()
+        run = min(self._run_length, size)
+        if size >= 6:
+            recent = size // 2
+            learning_velocity = self._recent_correct / recent - (self._correct - self._recent_correct) / (size - recent)
+        else:
+            learning_velocity = 0.0
+
+        stabilities = []
+        if size >= 4:
+            per_difficulty = self._per_difficulty
+            for level in range(self.MAX_DIFFICULTY + 1):
+                attempts, correct = per_difficulty[2 * level], per_difficulty[2 * level + 1]
+                if attempts >= 2:
+                    success_rate = correct / attempts
+                    variance = success_rate * (1 - success_rate)  # np.var of 0/1 outcomes
+                    stabilities.append(success_rate * (1 - variance))
+        return PerformanceMetrics(
+            success_rate=self._correct / size,
+            consecutive_correct=run if self._run_correct else 0,
+            consecutive_wrong=run if not self._run_correct else 0,
+            recent_attempts=size,
+            avg_response_time=self._response_time_sum / self._response_time_count if self._response_time_count else 0.0,
+            learning_velocity=learning_velocity,
+            difficulty_stability=sum(stabilities) / len(stabilities) if stabilities else 0.0,
+        )
+
+def batch_performance_metrics(outcomes: np.ndarray, difficulties: np.ndarray, sizes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    PerformanceWindow.metrics() for many learners at once. Row i of
+    `outcomes` (bool) and `difficulties` (int) holds learner i's attempts,
+    newest first, in its first sizes[i] columns. Returns one array per
+    PerformanceMetrics field (avg_response_time excepted: no rule uses it),
+    computed with the same arithmetic as the window, so results are identical.
+    """
+    count, width = outcomes.shape
+    columns = np.arange(width)
+    valid = columns < sizes[:, None]
+    correct_flags = outcomes & valid
+    correct = correct_flags.sum(axis=1)
+    has_attempts = sizes > 0
+    safe_sizes = np.maximum(sizes, 1)
+
+    # Length of the run of equal outcomes starting at the newest attempt
+    breaks = (outcomes != outcomes[:, :1]) | ~valid
+    run = np.where(breaks.any(axis=1), breaks.argmax(axis=1), width)
+    run_correct = outcomes[:, 0] if width else np.zeros(count, dtype=bool)
+
+    recent = np.maximum(sizes // 2, 1)
+    cumulative = np.cumsum(correct_flags, axis=1) if width else np.zeros((count, 1), dtype=int)
+    recent_correct = cumulative[np.arange(count), np.minimum(recent - 1, max(width - 1, 0))]
+    older = np.maximum(sizes - recent, 1)
+    learning_velocity = np.where(sizes >= 6, recent_correct / recent - (correct - recent_correct) / older, 0.0)
+
+    stability_sum = np.zeros(count)
+    stability_count = np.zeros(count, dtype=int)
+    for level in range(PerformanceWindow.MAX_DIFFICULTY + 1):
+        at_level = valid & (difficulties == level)
+        attempts = at_level.sum(axis=1)
+        success_rate = (at_level & outcomes).sum(axis=1) / np.maximum(attempts, 1)
+        variance = success_rate * (1 - success_rate)
+        counted = attempts >= 2
+        stability_sum = np.where(counted, stability_sum + success_rate * (1 - variance), stability_sum)
+        stability_count += counted
+    difficulty_stability = np.where((sizes >= 4) & (stability_count > 0),
+                                    stability_sum / np.maximum(stability_count, 1), 0.0)
+
+    return {
+        'success_rate': np.where(has_attempts, correct / safe_sizes, 0.0),
+        'consecutive_correct': np.where(has_attempts & run_correct, run, 0),
+        'consecutive_wrong': np.where(has_attempts & ~run_correct, run, 0),
+        'recent_attempts': sizes,
+        'learning_velocity': learning_velocity,
+        'difficulty_stability': difficulty_stability,
+    }
+
+
+class RecordRing:
+    """
+    Fixed-size ring of records stored column-wise in typed arrays (one per
+    field), a compact stand-in for a deque(maxlen=...) of tuples or dicts.
+    The arrays are only allocated on the first append.
+    """
+
+    TYPECODES: Tuple[str, ...] = ()
+
+    __slots__ = ('maxlen', '_columns', '_head', '_size')
+
+    def __init__(self, maxlen: int, records=()):
+        self.maxlen = maxlen
+        self._columns = None
+        self._head = 0
+        self._size = 0
+        for record in records:
+            self.append(record)
+
+    def _pack(self, record) -> Tuple:
+        return tuple(record)
+
+    def _unpack(self, fields: Tuple):
+        return fields
+
+    def append(self, record):
+        if self._columns is None:
+            self._columns = tuple(array(code, bytes(array(code).itemsize * self.maxlen)) for code in self.TYPECODES)
+        if self._size == self.maxlen:
+            index = self._head
+            self._head = (self._head + 1) % self.maxlen
+        else:
+            index = (self._head + self._size) % self.maxlen
+            self._size += 1
+        for column, value in zip(self._columns, self._pack(record)):
+            column[index] = value
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, position: int):
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError("ring index out of range")
+        index = (self._head + position) % self.maxlen
+        return self._unpack(tuple(column[index] for column in self._columns))
+
+    def __iter__(self):
+        for position in range(self._size):
+            yield self[position]
+
+
+class AnswerRing(RecordRing):
+    """Recent answers as {'correct', 'difficulty', 'timestamp', 'response_time'} dicts (oldest first)."""
+
+    TYPECODES = ('B', 'd', 'd')  # difficulty * 2 + correct, timestamp, response time (NaN = unknown)
+
+    __slots__ = ()
+
+    def _pack(self, answer):
+        if not isinstance(answer, dict):
+            correct, difficulty, timestamp, response_time = answer
+            answer = {'correct': correct, 'difficulty': difficulty, 'timestamp': timestamp, 'response_time': response_time}
+        response_time = answer.get('response_time')
+        return (int(answer['difficulty']) * 2 + bool(answer['correct']), answer['timestamp'],
+                math.nan if response_time is None else response_time)
+
+    def _unpack(self, fields):
+        flags, timestamp, response_time = fields
+        return {'correct': bool(flags & 1), 'difficulty': flags >> 1, 'timestamp': timestamp,
+                'response_time': None if math.isnan(response_time) else response_time}
+
+
+class DifficultyHistory(RecordRing):
+    """Recent difficulty changes as (difficulty, timestamp, reason) tuples; reasons are stored as small codes."""
+
+    TYPECODES = ('B', 'd', 'B')
+
+    __slots__ = ()
+
+    _reasons: List[str] = []
+    _reason_codes: Dict[str, int] = {}
+
+    _reasons_lock = threading.Lock()
+
+    @classmethod
+    def _reason_code(cls, reason: str) -> int:
+        code = cls._reason_codes.get(reason)
+        if code is None:
+            with cls._reasons_lock:
+                code = cls._reason_codes.get(reason)
+                if code is None:
+                    if len(cls._reasons) >= 255:
+                        raise ValueError("too many distinct difficulty change reasons")
+                    code = len(cls._reasons)
+                    cls._reasons.append(reason)
+                    cls._reason_codes[reason] = code
+        return code
+
+    def _pack(self, change):
+        difficulty, timestamp, reason = change
+        return difficulty, timestamp, self._reason_code(reason)
+
+    def _unpack(self, fields):
+        difficulty, timestamp, code = fields
+        return difficulty, timestamp, self._reasons[code]
+
+
+class LearnerState:
+    """
+    Adaptive-difficulty state of one learner in one lesson.
+
+    A __slots__ object with array-backed ring buffers instead of a dict of
+    lists and deques of dicts, so a worker can hold many more learners in
+    LEARNER_STATE_MAX_ENTRIES worth of memory (see
+    scripts/benchmark_learner_state.py). Item access (state['streak_counter'])
+    is kept for callers written against the dict layout.
+    """
+
+    NUM_LEVELS = 5
+    HISTORY_SIZE = 20
+
+    __slots__ = ('current_difficulty', 'confidence_scores', 'recent_performance', 'difficulty_history',
+                 'learning_momentum', 'last_update', 'streak_counter', 'struggle_counter', 'exploration_debt',
+                 'performance_window')
+
+    def __init__(self, recent_size: int = 12):
+        self.current_difficulty = 1
+        self.confidence_scores = array('d', [0.5] * self.NUM_LEVELS)  # Confidence for each difficulty level
+        self.recent_performance = AnswerRing(recent_size)
+        self.difficulty_history = DifficultyHistory(self.HISTORY_SIZE)
+        self.learning_momentum = 0.0
+        self.last_update = time.time()
+        self.streak_counter = 0
+        self.struggle_counter = 0
+        self.exploration_debt = 0  # Track when we should explore
+        self.performance_window: Optional[PerformanceWindow] = None  # Built from user_progress on first use
+
+    def __getitem__(self, name: str):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible form, used by the Postgres learner state store."""
+        window = self.performance_window
+        return {
+            'current_difficulty': self.current_difficulty,
+            'confidence_scores': list(self.confidence_scores),
+            'recent_performance': [[a['correct'], a['difficulty'], a['timestamp'], a['response_time']]
+                                   for a in self.recent_performance],
+            'difficulty_history': [list(change) for change in self.difficulty_history],
+            'learning_momentum': self.learning_momentum,
+            'last_update': self.last_update,
+            'streak_counter': self.streak_counter,
+            'struggle_counter': self.struggle_counter,
+            'exploration_debt': self.exploration_debt,
+            'performance_window': window.to_state() if window is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], recent_size: int = 12) -> 'LearnerState':
+        state = cls(recent_size)
+        state.current_difficulty = data['current_difficulty']
+        state.confidence_scores = array('d', data['confidence_scores'])
+        # Rows written by the dict layout also hold success-rate floats here
+        state.recent_performance.extend(a for a in data['recent_performance'] if isinstance(a, (list, dict)))
+        state.difficulty_history.extend(data['difficulty_history'])
+        state.learning_momentum = data['learning_momentum']
+        state.last_update = data['last_update']
+        state.streak_counter = data['streak_counter']
+        state.struggle_counter = data['struggle_counter']
+        state.exploration_debt = data['exploration_debt']
+        window = data.get('performance_window')
+        state.performance_window = PerformanceWindow.from_state(window) if window is not None else None
+        return state
+
+
 class EnhancedAdaptiveDifficultySelector:
     """
     Ultra-responsive difficulty selector with multiple adaptation strategies.
@@ -59,93 +490,102 @@ class EnhancedAdaptiveDifficultySelector:
         self.medium_window = 6                      # Trend analysis window
         self.long_window = 12                       # Stability analysis window
         
-        # User state tracking (in-memory for speed)
-        self.user_states = {}
+        # User state tracking: a bounded per-worker LRU, or the learner_state
+        # table shared by all workers (LEARNER_STATE_BACKEND)
+        self.user_states = create_state_store_from_env(self._encode_state, self._decode_state)
         
-    def _get_user_state(self, user_id: int, lesson_id: int) -> Dict:
+        # Rolling performance windows (see PerformanceWindow)
+        self.validate_windows = os.getenv("PERFORMANCE_WINDOW_VALIDATE", "1") != "0"
+        self.window_hits = 0
+        self.window_rebuilds = 0
+        self.window_stale_rebuilds = 0
+        
+    def _get_user_state(self, user_id: int, lesson_id: int, uow=None) -> LearnerState:
         """Get or create user state for fast access."""
-        key = f"{user_id}_{lesson_id}"
-        if key not in self.user_states:
-            self.user_states[key] = {
-                'current_difficulty': 1,
-                'confidence_scores': [0.5] * 5,  # Confidence for each difficulty level
-                'recent_performance': deque(maxlen=self.long_window),
-                'difficulty_history': deque(maxlen=20),
-                'learning_momentum': 0.0,
-                'last_update': time.time(),
-                'streak_counter': 0,
-                'struggle_counter': 0,
-                'exploration_debt': 0,  # Track when we should explore
-            }
-        return self.user_states[key]
+        user_state = self.user_states.load((user_id, lesson_id), uow.cursor if uow is not None else None)
+        if user_state is None:
+            # Stores receive new states through _save_user_state
+            user_state = LearnerState(self.long_window)
+        return user_state
+
+    def _save_user_state(self, user_id: int, lesson_id: int, user_state: LearnerState, uow=None):
+        """Writes the state back; with the Postgres store this joins the request's transaction."""
+        self.user_states.save((user_id, lesson_id), user_state, uow.cursor if uow is not None else None)
+
+    def _get_user_states(self, keys: List[Tuple[int, int]], uow=None) -> List[LearnerState]:
+        """_get_user_state for many learners, with one store round trip."""
+        found = self.user_states.load_many(keys, uow.cursor if uow is not None else None)
+        states = []
+        for key in keys:
+            user_state = found.get(key)
+            if user_state is None:
+                user_state = LearnerState(self.long_window)
+            states.append(user_state)
+        return states
+
+    def _save_user_states(self, keys: List[Tuple[int, int]], states: List[LearnerState], uow=None):
+        self.user_states.save_many(dict(zip(keys, states)), uow.cursor if uow is not None else None)
+
+    def _encode_state(self, user_state: LearnerState) -> Dict:
+        return user_state.to_dict()
+
+    def _decode_state(self, encoded: Dict) -> LearnerState:
+        return LearnerState.from_dict(encoded, recent_size=self.long_window)
     
-    def get_enhanced_performance_metrics(self, user_id: int, lesson_id: int, limit: int = 12) -> PerformanceMetrics:
-        """Get comprehensive performance metrics with better analysis."""
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        # Get recent attempts with timing data
-        cur.execute("""
-            SELECT 
-                up.is_correct,
-                up.answered_at,
-                q.difficulty_level,
-                EXTRACT(EPOCH FROM (up.answered_at - LAG(up.answered_at) OVER (ORDER BY up.answered_at))) as response_time
-            FROM user_progress up
-            JOIN questions q ON up.question_id = q.id
-            WHERE up.user_id = %s AND q.lesson_id = %s
-            ORDER BY up.answered_at DESC
-            LIMIT %s
-        """, (user_id, lesson_id, limit))
-        
-        attempts = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        if not attempts:
-            return PerformanceMetrics()
-        
-        # Calculate metrics
-        correct_count = sum(1 for a in attempts if a['is_correct'])
-        success_rate = correct_count / len(attempts)
-        
-        # Calculate consecutive streaks
-        consecutive_correct = consecutive_wrong = 0
-        for attempt in attempts:
-            if attempt['is_correct']:
-                if consecutive_wrong == 0:
-                    consecutive_correct += 1
-                else:
-                    break
-            else:
-                if consecutive_correct == 0:
-                    consecutive_wrong += 1
-                else:
-                    break
-        
-        # Calculate learning velocity (improvement over time)
-        if len(attempts) >= 6:
-            recent_half = attempts[:len(attempts)//2]
-            older_half = attempts[len(attempts)//2:]
-            recent_success = sum(1 for a in recent_half if a['is_correct']) / len(recent_half)
-            older_success = sum(1 for a in older_half if a['is_correct']) / len(older_half)
-            learning_velocity = recent_success - older_success
+    def get_enhanced_performance_metrics(self, user_id: int, lesson_id: int, limit: int = 12, uow=None,
+                                         user_state: LearnerState = None) -> PerformanceMetrics:
+        """
+        Get comprehensive performance metrics with better analysis.
+        UPDATED: The last `long_window` attempts are kept in the user's
+        PerformanceWindow, which submit_answer updates in O(1). The window
+        query below only runs on a cold miss, or when bandit_state shows
+        answers this worker did not see (PERFORMANCE_WINDOW_VALIDATE).
+        """
+        use_window = limit == self.long_window
+        # Called on its own, the rebuilt window is saved here; callers that pass
+        # their user_state save it themselves
+        owns_state = use_window and user_state is None
+        if owns_state:
+            user_state = self._get_user_state(user_id, lesson_id, uow=uow)
+        window = user_state.performance_window if use_window else None
+        if window is not None and not self.validate_windows:
+            self.window_hits += 1
+            return window.metrics()
+
+        if uow is not None:
+            conn, cur = None, uow.cursor
         else:
-            learning_velocity = 0.0
-        
-        # Calculate response time average
-        response_times = [a['response_time'] for a in attempts if a['response_time'] is not None]
-        avg_response_time = np.mean(response_times) if response_times else 0.0
-        
-        return PerformanceMetrics(
-            success_rate=success_rate,
-            consecutive_correct=consecutive_correct,
-            consecutive_wrong=consecutive_wrong,
-            recent_attempts=len(attempts),
-            avg_response_time=avg_response_time,
-            learning_velocity=learning_velocity,
-            difficulty_stability=self._calculate_difficulty_stability(attempts)
-        )
+            conn = get_db_connection()
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            if window is not None:
+                # One primary-key lookup instead of the window query
+                cur.execute(WINDOW_TOTAL_SQL, (user_id, lesson_id))
+                if cur.fetchone()[0] == window.synced_total:
+                    self.window_hits += 1
+                    return window.metrics()
+                self.window_stale_rebuilds += 1
+
+            cur.execute(RECENT_ATTEMPTS_SQL, (user_id, lesson_id, user_id, lesson_id, limit))
+            attempts = cur.fetchall()
+        finally:
+            if conn is not None:
+                cur.close()
+                conn.close()
+
+        metrics = self._rebuild_window(attempts, limit, user_state if use_window else None)
+        if owns_state:
+            self._save_user_state(user_id, lesson_id, user_state, uow=uow)
+        return metrics
+
+    def _rebuild_window(self, attempts: List, limit: int, user_state: LearnerState = None) -> PerformanceMetrics:
+        """Metrics from window query rows; with a user_state the window is kept for the next call."""
+        window = PerformanceWindow.from_attempts(attempts, capacity=limit)
+        if user_state is not None:
+            window.synced_total = attempts[0].get('answers_total') if attempts else 0
+            user_state.performance_window = window
+            self.window_rebuilds += 1
+        return window.metrics()
     
     def _calculate_difficulty_stability(self, attempts: List) -> float:
         """Calculate how stable the user is at their current difficulty."""
@@ -171,20 +611,36 @@ class EnhancedAdaptiveDifficultySelector:
         
         return np.mean(stabilities) if stabilities else 0.0
     
-    def select_difficulty_ultra_responsive(self, user_id: int, lesson_id: int) -> int:
-        """Ultra-responsive difficulty selection with multiple decision paths."""
+    def select_difficulty_ultra_responsive(self, user_id: int, lesson_id: int, uow=None) -> int:
+        """
+        Ultra-responsive difficulty selection with multiple decision paths.
+        UPDATED: The learner state is loaded once from the state store and
+        saved back after the decision (in the caller's transaction with a UnitOfWork).
+        """
+        user_state = self._get_user_state(user_id, lesson_id, uow=uow)
+        new_difficulty = self._select_difficulty(user_state, user_id, lesson_id, uow)
+        self._save_user_state(user_id, lesson_id, user_state, uow=uow)
+        return new_difficulty
+
+    def _select_difficulty(self, user_state: LearnerState, user_id: int, lesson_id: int, uow=None,
+                           metrics: PerformanceMetrics = None, projected: bool = False) -> int:
+        """
+        The decision paths below. A projected decision (see project_outcomes)
+        gets its metrics passed in, skips the random exploration step and
+        only logs at debug level.
+        """
+        log = logging.debug if projected else logging.info
         try:
-            # Get user state and performance metrics
-            user_state = self._get_user_state(user_id, lesson_id)
-            metrics = self.get_enhanced_performance_metrics(user_id, lesson_id)
+            # Get performance metrics
+            if metrics is None:
+                metrics = self.get_enhanced_performance_metrics(user_id, lesson_id, uow=uow, user_state=user_state)
             
-            current_difficulty = user_state['current_difficulty']
+            current_difficulty = user_state.current_difficulty
             
             # Update user state with recent performance
             if metrics.recent_attempts > 0:
-                user_state['recent_performance'].extend([metrics.success_rate])
-                user_state['learning_momentum'] = (
-                    user_state['learning_momentum'] * 0.7 + 
+                user_state.learning_momentum = (
+                    user_state.learning_momentum * 0.7 + 
                     metrics.learning_velocity * 0.3
                 )
             
@@ -193,15 +649,15 @@ class EnhancedAdaptiveDifficultySelector:
             # 1. Crisis intervention - user is really struggling
             if metrics.consecutive_wrong >= 3 or (metrics.recent_attempts >= 3 and metrics.success_rate <= 0.2):
                 new_difficulty = max(1, current_difficulty - 2)
-                user_state['struggle_counter'] = 0  # Reset struggle counter
-                logging.info(f"CRISIS INTERVENTION: Dropping to level {new_difficulty} (was {current_difficulty})")
+                user_state.struggle_counter = 0  # Reset struggle counter
+                log(f"CRISIS INTERVENTION: Dropping to level {new_difficulty} (was {current_difficulty})")
                 return self._update_and_return(user_state, new_difficulty, "crisis_intervention")
             
             # 2. Hot streak - user is performing excellently
             if metrics.consecutive_correct >= 3 or (metrics.recent_attempts >= 3 and metrics.success_rate >= 0.9):
                 if current_difficulty < 5:
                     new_difficulty = min(5, current_difficulty + 1)
-                    logging.info(f"HOT STREAK: Promoting to level {new_difficulty} (was {current_difficulty})")
+                    log(f"HOT STREAK: Promoting to level {new_difficulty} (was {current_difficulty})")
                     return self._update_and_return(user_state, new_difficulty, "hot_streak")
             
             # 3. Fast track decisions (after minimal attempts)
@@ -211,14 +667,14 @@ class EnhancedAdaptiveDifficultySelector:
                     return self._update_and_return(user_state, decision, "fast_track")
             
             # 4. Confidence-based exploration
-            if self._should_explore(user_state, metrics):
+            if not projected and self._should_explore(user_state, metrics):
                 exploration_level = self._get_exploration_level(user_state, metrics, current_difficulty)
                 if exploration_level != current_difficulty:
-                    logging.info(f"EXPLORATION: Trying level {exploration_level} (confidence-based)")
+                    log(f"EXPLORATION: Trying level {exploration_level} (confidence-based)")
                     return self._update_and_return(user_state, exploration_level, "exploration")
             
             # 5. Momentum-based adjustment
-            if abs(user_state['learning_momentum']) > 0.2:
+            if abs(user_state.learning_momentum) > 0.2:
                 momentum_decision = self._momentum_based_decision(user_state, metrics, current_difficulty)
                 if momentum_decision != current_difficulty:
                     return self._update_and_return(user_state, momentum_decision, "momentum")
@@ -231,14 +687,14 @@ class EnhancedAdaptiveDifficultySelector:
             
             # Default: stay at current level but update confidence
             self._update_confidence_scores(user_state, metrics, current_difficulty)
-            logging.info(f"MAINTAINING: Level {current_difficulty} (SR: {metrics.success_rate:.2f})")
+            log(f"MAINTAINING: Level {current_difficulty} (SR: {metrics.success_rate:.2f})")
             return current_difficulty
             
         except Exception as e:
             logging.error(f"Error in ultra-responsive difficulty selection: {e}")
             return 1  # Safe fallback
     
-    def _fast_track_decision(self, user_state: Dict, metrics: PerformanceMetrics, current_difficulty: int) -> int:
+    def _fast_track_decision(self, user_state: LearnerState, metrics: PerformanceMetrics, current_difficulty: int) -> int:
         """Make fast decisions after minimal attempts."""
         
         # Immediate promotion conditions
@@ -254,7 +710,7 @@ class EnhancedAdaptiveDifficultySelector:
         
         return current_difficulty
     
-    def _should_explore(self, user_state: Dict, metrics: PerformanceMetrics) -> bool:
+    def _should_explore(self, user_state: LearnerState, metrics: PerformanceMetrics) -> bool:
         """Determine if we should explore a different difficulty level."""
         
         # Don't explore if user is struggling
@@ -263,21 +719,21 @@ class EnhancedAdaptiveDifficultySelector:
         
         # Explore if user is doing well and we haven't explored recently
         if (metrics.success_rate >= self.exploration_confidence and 
-            user_state['exploration_debt'] <= 0 and
+            user_state.exploration_debt <= 0 and
             random.random() < self.exploration_rate):
-            user_state['exploration_debt'] = 3  # Explore, then wait 3 decisions
+            user_state.exploration_debt = 3  # Explore, then wait 3 decisions
             return True
         
         # Decay exploration debt
-        if user_state['exploration_debt'] > 0:
-            user_state['exploration_debt'] -= 1
+        if user_state.exploration_debt > 0:
+            user_state.exploration_debt -= 1
         
         return False
     
-    def _get_exploration_level(self, user_state: Dict, metrics: PerformanceMetrics, current_difficulty: int) -> int:
+    def _get_exploration_level(self, user_state: LearnerState, metrics: PerformanceMetrics, current_difficulty: int) -> int:
         """Choose exploration level based on confidence and performance."""
         
-        confidence_scores = user_state['confidence_scores']
+        confidence_scores = user_state.confidence_scores
         
         # Try one level up if doing very well
         # CORRECTED LINE
@@ -285,15 +741,15 @@ class EnhancedAdaptiveDifficultySelector:
             return current_difficulty + 1
         
         # Try one level down if confidence is low at current level
-        if (current_difficulty > 1 and user_state['confidence_scores'][current_difficulty - 2] < 0.4):
+        if (current_difficulty > 1 and user_state.confidence_scores[current_difficulty - 2] < 0.4):
             return current_difficulty - 1
         
         return current_difficulty
     
-    def _momentum_based_decision(self, user_state: Dict, metrics: PerformanceMetrics, current_difficulty: int) -> int:
+    def _momentum_based_decision(self, user_state: LearnerState, metrics: PerformanceMetrics, current_difficulty: int) -> int:
         """Make decisions based on learning momentum."""
         
-        momentum = user_state['learning_momentum']
+        momentum = user_state.learning_momentum
         
         # Strong positive momentum - try harder content
         if momentum > 0.3 and current_difficulty < 5 and metrics.success_rate >= 0.65:
@@ -305,7 +761,7 @@ class EnhancedAdaptiveDifficultySelector:
         
         return current_difficulty
     
-    def _stability_based_decision(self, user_state: Dict, metrics: PerformanceMetrics, current_difficulty: int) -> int:
+    def _stability_based_decision(self, user_state: LearnerState, metrics: PerformanceMetrics, current_difficulty: int) -> int:
         """Make decisions based on performance stability."""
         
         # If user is stable and successful, promote
@@ -320,12 +776,12 @@ class EnhancedAdaptiveDifficultySelector:
         
         return current_difficulty
     
-    def _update_confidence_scores(self, user_state: Dict, metrics: PerformanceMetrics, difficulty: int):
+    def _update_confidence_scores(self, user_state: LearnerState, metrics: PerformanceMetrics, difficulty: int):
         """Update confidence scores for all difficulty levels."""
         
         # Update confidence for current difficulty
         if metrics.recent_attempts > 0:
-            current_confidence = user_state['confidence_scores'][difficulty-1]
+            current_confidence = user_state.confidence_scores[difficulty-1]
             
             # Weighted update based on recent performance
             new_confidence = (
@@ -333,96 +789,332 @@ class EnhancedAdaptiveDifficultySelector:
                 metrics.success_rate * self.recency_weight
             )
             
-            user_state['confidence_scores'][difficulty-1] = max(0.0, min(1.0, new_confidence))
+            user_state.confidence_scores[difficulty-1] = max(0.0, min(1.0, new_confidence))
         
-    def _update_and_return(self, user_state: Dict, new_difficulty: int, reason: str) -> int:
+    def _update_and_return(self, user_state: LearnerState, new_difficulty: int, reason: str) -> int:
         """Update user state and return new difficulty."""
         
-        old_difficulty = user_state['current_difficulty']
-        user_state['current_difficulty'] = new_difficulty
-        user_state['difficulty_history'].append((new_difficulty, time.time(), reason))
-        user_state['last_update'] = time.time()
+        old_difficulty = user_state.current_difficulty
+        user_state.current_difficulty = new_difficulty
+        user_state.difficulty_history.append((new_difficulty, time.time(), reason))
+        user_state.last_update = time.time()
         
         # Reset counters on difficulty change
         if new_difficulty != old_difficulty:
-            user_state['streak_counter'] = 0
-            user_state['struggle_counter'] = 0
+            user_state.streak_counter = 0
+            user_state.struggle_counter = 0
         
         return new_difficulty
     
     def update_bandit_state_enhanced(self, user_id: int, lesson_id: int, difficulty: int, 
-                                   was_correct: bool, response_time: float = None):
-        """Enhanced bandit state update with additional metrics."""
+                                   was_correct: bool, response_time: float = None, uow=None):
+        """
+        Enhanced bandit state update with additional metrics.
+        With a UnitOfWork the upsert joins the caller's transaction and is
+        committed by the caller; otherwise it runs and commits on its own connection.
+        """
         
         # Update database (existing functionality)
-        conn = get_db_connection()
-        cur = conn.cursor()
+        if uow is not None:
+            conn, cur = None, uow.cursor
+        else:
+            conn = get_db_connection()
+            cur = conn.cursor()
         reward = 1 if was_correct else 0
 
-        cur.execute("""
-            INSERT INTO bandit_state (user_id, lesson_id, difficulty_level, times_selected, successful_outcomes)
-            VALUES (%s, %s, %s, 1, %s) 
-            ON CONFLICT (user_id, lesson_id, difficulty_level)
-            DO UPDATE SET
-                times_selected = bandit_state.times_selected + 1,
-                successful_outcomes = bandit_state.successful_outcomes + %s
-        """, (user_id, lesson_id, difficulty, reward, reward))
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        try:
+            cur.execute(BANDIT_UPSERT_SQL, (user_id, lesson_id, difficulty, reward, reward))
+            if conn is not None:
+                conn.commit()
+        finally:
+            if conn is not None:
+                cur.close()
+                conn.close()
         
-        # Update in-memory user state for immediate response
-        user_state = self._get_user_state(user_id, lesson_id)
+        # Update the learner state for immediate response
+        user_state = self._get_user_state(user_id, lesson_id, uow=uow)
+        self._apply_answer(user_state, difficulty, was_correct, response_time)
+        self._save_user_state(user_id, lesson_id, user_state, uow=uow)
         
+        logging.info(f"Updated state for user {user_id}: streak={user_state.streak_counter}, "
+                    f"struggle={user_state.struggle_counter}, confidence={user_state.confidence_scores[difficulty-1]:.2f}")
+
+    def _apply_answer(self, user_state: LearnerState, difficulty: int, was_correct: bool, response_time: float = None):
+        """The in-memory part of an answer: counters, confidence, performance window."""
         # Update counters
         if was_correct:
-            user_state['streak_counter'] = user_state['streak_counter'] + 1
-            user_state['struggle_counter'] = 0
+            user_state.streak_counter = user_state.streak_counter + 1
+            user_state.struggle_counter = 0
             # Boost confidence
-            current_conf = user_state['confidence_scores'][difficulty-1]
-            user_state['confidence_scores'][difficulty-1] = min(1.0, current_conf * self.confidence_boost)
+            current_conf = user_state.confidence_scores[difficulty-1]
+            user_state.confidence_scores[difficulty-1] = min(1.0, current_conf * self.confidence_boost)
         else:
-            user_state['struggle_counter'] = user_state['struggle_counter'] + 1
-            user_state['streak_counter'] = 0
+            user_state.struggle_counter = user_state.struggle_counter + 1
+            user_state.streak_counter = 0
             # Decay confidence
-            current_conf = user_state['confidence_scores'][difficulty-1]
-            user_state['confidence_scores'][difficulty-1] = max(0.0, current_conf * self.confidence_decay)
+            current_conf = user_state.confidence_scores[difficulty-1]
+            user_state.confidence_scores[difficulty-1] = max(0.0, current_conf * self.confidence_decay)
+        
+        # Keep the rolling window current without re-querying user_progress
+        if user_state.performance_window is not None:
+            user_state.performance_window.record(was_correct, difficulty, response_time=response_time)
         
         # Add performance data point
-        user_state['recent_performance'].append({
-            'correct': was_correct,
-            'difficulty': difficulty,
-            'timestamp': time.time(),
-            'response_time': response_time
-        })
-        
-        logging.info(f"Updated state for user {user_id}: streak={user_state['streak_counter']}, "
-                    f"struggle={user_state['struggle_counter']}, confidence={user_state['confidence_scores'][difficulty-1]:.2f}")
-    
+        user_state.recent_performance.append((was_correct, difficulty, time.time(), response_time))
+
+    # --- Projection (question prefetch) ---
+
+    def get_learner_state(self, user_id: int, lesson_id: int, uow=None) -> LearnerState:
+        """A copy of the learner's state, safe to project from without touching the stored one."""
+        return self.copy_state(self._get_user_state(user_id, lesson_id, uow=uow))
+
+    def copy_state(self, user_state: LearnerState) -> LearnerState:
+        return LearnerState.from_dict(user_state.to_dict(), recent_size=self.long_window)
+
+    def project_outcomes(self, user_state: LearnerState, answered_difficulty: int) -> Optional[Dict[bool, Tuple[LearnerState, int]]]:
+        """
+        The difficulty the selector would pick next if the learner answers a
+        question at `answered_difficulty` correctly (True) or not (False),
+        each with the state it would leave behind. Works on copies and needs
+        the learner's performance window (None without one). Exploration is
+        random and left out, so a real decision may still differ.
+        """
+        if user_state.performance_window is None:
+            return None
+        outcomes = {}
+        for was_correct in (True, False):
+            projected = self.copy_state(user_state)
+            self._apply_answer(projected, answered_difficulty, was_correct)
+            metrics = projected.performance_window.metrics()
+            outcomes[was_correct] = projected, self._select_difficulty(projected, None, None, metrics=metrics, projected=True)
+        return outcomes
+
+    # --- Async path (AsyncUnitOfWork, see src.async_db) ---
+    # The same decisions as the sync methods above; only the state store and
+    # window queries are awaited, the rules themselves are plain CPU work.
+
+    async def _get_user_state_async(self, user_id: int, lesson_id: int, uow) -> LearnerState:
+        user_state = await self.user_states.load_async((user_id, lesson_id), uow)
+        return user_state if user_state is not None else LearnerState(self.long_window)
+
+    async def _save_user_state_async(self, user_id: int, lesson_id: int, user_state: LearnerState, uow):
+        await self.user_states.save_async((user_id, lesson_id), user_state, uow)
+
+    async def get_learner_state_async(self, user_id: int, lesson_id: int, uow) -> LearnerState:
+        """get_learner_state for the async path."""
+        return self.copy_state(await self._get_user_state_async(user_id, lesson_id, uow))
+
+    async def get_enhanced_performance_metrics_async(self, user_id: int, lesson_id: int, uow,
+                                                     user_state: LearnerState) -> PerformanceMetrics:
+        window = user_state.performance_window
+        if window is not None and not self.validate_windows:
+            self.window_hits += 1
+            return window.metrics()
+        if window is not None:
+            if await uow.fetchval(WINDOW_TOTAL_SQL, (user_id, lesson_id)) == window.synced_total:
+                self.window_hits += 1
+                return window.metrics()
+            self.window_stale_rebuilds += 1
+        attempts = await uow.fetch(RECENT_ATTEMPTS_SQL, (user_id, lesson_id, user_id, lesson_id, self.long_window))
+        return self._rebuild_window(attempts, self.long_window, user_state)
+
+    async def select_difficulty_async(self, user_id: int, lesson_id: int, uow) -> int:
+        """select_difficulty_ultra_responsive on an AsyncUnitOfWork."""
+        user_state = await self._get_user_state_async(user_id, lesson_id, uow)
+        metrics = await self.get_enhanced_performance_metrics_async(user_id, lesson_id, uow, user_state)
+        new_difficulty = self._select_difficulty(user_state, user_id, lesson_id, metrics=metrics)
+        await self._save_user_state_async(user_id, lesson_id, user_state, uow)
+        return new_difficulty
+
+    async def update_bandit_state_async(self, user_id: int, lesson_id: int, difficulty: int,
+                                        was_correct: bool, uow, response_time: float = None):
+        """update_bandit_state_enhanced on an AsyncUnitOfWork (committed by the caller)."""
+        reward = 1 if was_correct else 0
+        await uow.execute(BANDIT_UPSERT_SQL, (user_id, lesson_id, difficulty, reward, reward))
+        user_state = await self._get_user_state_async(user_id, lesson_id, uow)
+        self._apply_answer(user_state, difficulty, was_correct, response_time)
+        await self._save_user_state_async(user_id, lesson_id, user_state, uow)
+        logging.info(f"Updated state for user {user_id}: streak={user_state.streak_counter}, "
+                    f"struggle={user_state.struggle_counter}, confidence={user_state.confidence_scores[difficulty-1]:.2f}")
+
+    # --- Batch selection (dashboards, classroom pre-generation) ---
+
+    BATCH_REASONS = ("maintain", "crisis_intervention", "hot_streak", "fast_track", "exploration", "momentum", "stability")
+
+    def _batch_attempts(self, user_ids: np.ndarray, lesson_ids: np.ndarray, uow=None):
+        """The last long_window attempts of every (user, lesson) pair in one set-based query."""
+        if uow is not None:
+            conn, cur = None, uow.cursor
+        else:
+            conn = get_db_connection()
+            cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT p.idx, a.is_correct, a.difficulty_level
+                FROM unnest(%s::int[], %s::int[]) WITH ORDINALITY AS p(user_id, lesson_id, idx)
+                CROSS JOIN LATERAL (
+                    SELECT up.is_correct, up.answered_at, q.difficulty_level
+                    FROM user_progress up
+                    JOIN questions q ON up.question_id = q.id
+                    WHERE up.user_id = p.user_id AND q.lesson_id = p.lesson_id
+                    ORDER BY up.answered_at DESC
+                    LIMIT %s
+                ) a
+                ORDER BY p.idx, a.answered_at DESC
+            """, (user_ids.tolist(), lesson_ids.tolist(), self.long_window))
+            rows = cur.fetchall()
+        finally:
+            if conn is not None:
+                cur.close()
+                conn.close()
+
+        count = len(user_ids)
+        outcomes = np.zeros((count, self.long_window), dtype=bool)
+        difficulties = np.zeros((count, self.long_window), dtype=np.int64)
+        sizes = np.zeros(count, dtype=np.int64)
+        if rows:
+            data = np.array([(row[0], row[1], row[2]) for row in rows], dtype=np.int64)
+            learner = data[:, 0] - 1
+            # Rows arrive grouped by learner, newest first: position = row number within the group
+            starts = np.flatnonzero(np.r_[True, learner[1:] != learner[:-1]])
+            position = np.arange(len(learner)) - np.repeat(starts, np.diff(np.r_[starts, len(learner)]))
+            outcomes[learner, position] = data[:, 1].astype(bool)
+            difficulties[learner, position] = data[:, 2]
+            sizes = np.bincount(learner, minlength=count)
+        return outcomes, difficulties, sizes
+
+    def _decide_batch(self, metrics: Dict[str, np.ndarray], current: np.ndarray, momentum: np.ndarray,
+                      debt: np.ndarray, confidence: np.ndarray):
+        """
+        The decision paths of select_difficulty_ultra_responsive as array
+        operations, evaluated in the same order. Returns the new difficulty,
+        the index of the deciding path in BATCH_REASONS, and the updated
+        momentum, exploration debt and confidence scores.
+        """
+        n = metrics['recent_attempts']
+        sr = metrics['success_rate']
+        cc, cw = metrics['consecutive_correct'], metrics['consecutive_wrong']
+        rows = np.arange(len(current))
+        new = current.copy()
+        reason = np.zeros(len(current), dtype=np.int64)
+        decided = np.zeros(len(current), dtype=bool)
+
+        def decide(mask, values, code):
+            nonlocal decided
+            new[mask] = values[mask]
+            reason[mask] = code
+            decided = decided | mask
+
+        momentum = np.where(n > 0, momentum * 0.7 + metrics['learning_velocity'] * 0.3, momentum)
+
+        # 1. Crisis intervention
+        decide((cw >= 3) | ((n >= 3) & (sr <= 0.2)), np.maximum(1, current - 2), 1)
+        # 2. Hot streak
+        hot = ~decided & ((cc >= 3) | ((n >= 3) & (sr >= 0.9))) & (current < 5)
+        decide(hot, current + 1, 2)
+        # 3. Fast track
+        up = (cc >= self.consecutive_threshold_up) & (sr >= self.immediate_promotion_threshold) & (current < 5)
+        down = ((cw >= self.consecutive_threshold_down) | (sr <= self.immediate_demotion_threshold)) & (current > 1)
+        decide(~decided & (n >= self.min_attempts_fast_track) & (up | down), np.where(up, current + 1, current - 1), 3)
+        # 4. Exploration: random draws in learner order, as the scalar path would make them
+        calm = ~decided & ~((sr < 0.6) | (cw >= 2))
+        draws = calm & (sr >= self.exploration_confidence) & (debt <= 0)
+        explore = np.zeros(len(current), dtype=bool)
+        explore[draws] = np.array([random.random() for _ in range(int(draws.sum()))]) < self.exploration_rate
+        debt = np.where(explore, 3, np.where(calm & (debt > 0), debt - 1, debt))
+        up = (current < 5) & (sr >= 0.8) & (confidence[rows, current - 1] > 0.7)
+        down = ~up & (current > 1) & (confidence[rows, np.maximum(current - 2, 0)] < 0.4)
+        decide(explore & (up | down), np.where(up, current + 1, current - 1), 4)
+        # 5. Momentum
+        up = (momentum > 0.3) & (current < 5) & (sr >= 0.65)
+        down = ~up & (momentum < -0.3) & (current > 1)
+        decide(~decided & (np.abs(momentum) > 0.2) & (up | down), np.where(up, current + 1, current - 1), 5)
+        # 6. Stability
+        stability = metrics['difficulty_stability']
+        up = (stability > 0.7) & (sr >= 0.75) & (current < 5)
+        down = ~up & (stability < 0.3) & (sr < 0.6) & (current > 1)
+        decide(~decided & (n >= self.min_attempts_stable) & (up | down), np.where(up, current + 1, current - 1), 6)
+
+        # Default: stay, and move the confidence at the current level towards the success rate
+        maintain = ~decided & (n > 0)
+        confidence = confidence.copy()
+        level = current[maintain] - 1
+        updated = confidence[maintain, level] * (1 - self.recency_weight) + sr[maintain] * self.recency_weight
+        confidence[maintain, level] = np.clip(updated, 0.0, 1.0)
+        return new, reason, momentum, debt, confidence
+
+    def select_difficulties_batch(self, user_ids, lesson_ids, uow=None) -> np.ndarray:
+        """
+        select_difficulty_ultra_responsive for many (user, lesson) pairs:
+        one query for all their recent attempts, one state load and save,
+        and the decision rules as NumPy array operations. Returns the
+        difficulties in input order, with the same results and state updates
+        the scalar path would produce calling it pair by pair.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        lesson_ids = np.asarray(lesson_ids, dtype=np.int64)
+        if user_ids.shape != lesson_ids.shape or user_ids.ndim != 1:
+            raise ValueError("user_ids and lesson_ids must be 1-D arrays of the same length")
+        keys = list(zip(user_ids.tolist(), lesson_ids.tolist()))
+        if len(set(keys)) != len(keys):
+            raise ValueError("(user_id, lesson_id) pairs must be unique")
+        if not keys:
+            return np.zeros(0, dtype=np.int64)
+
+        metrics = batch_performance_metrics(*self._batch_attempts(user_ids, lesson_ids, uow=uow))
+        states = self._get_user_states(keys, uow=uow)
+        current = np.array([state.current_difficulty for state in states], dtype=np.int64)
+        momentum = np.array([state.learning_momentum for state in states], dtype=np.float64)
+        debt = np.array([state.exploration_debt for state in states], dtype=np.int64)
+        confidence = np.array([state.confidence_scores for state in states], dtype=np.float64)
+
+        new, reason, momentum, debt, confidence = self._decide_batch(metrics, current, momentum, debt, confidence)
+
+        now = time.time()
+        for state, learning_momentum, exploration_debt in zip(states, momentum.tolist(), debt.tolist()):
+            state.learning_momentum = learning_momentum
+            state.exploration_debt = exploration_debt
+        for i in np.flatnonzero(metrics['recent_attempts'] > 0).tolist():
+            states[i].confidence_scores[:] = array('d', confidence[i].tolist())
+        for i in np.flatnonzero(reason).tolist():
+            state, difficulty = states[i], int(new[i])
+            if reason[i] == 1:
+                state.struggle_counter = 0
+            state.difficulty_history.append((difficulty, now, self.BATCH_REASONS[reason[i]]))
+            state.last_update = now
+            if difficulty != state.current_difficulty:
+                state.current_difficulty = difficulty
+                state.streak_counter = 0
+                state.struggle_counter = 0
+        self._save_user_states(keys, states, uow=uow)
+
+        changed = int((new != current).sum())
+        logging.info(f"Batch difficulty selection: {len(keys)} learners, {changed} changed level")
+        return new
+
     def get_user_insights(self, user_id: int, lesson_id: int) -> Dict[str, Any]:
         """Get comprehensive user learning insights."""
         
         user_state = self._get_user_state(user_id, lesson_id)
-        metrics = self.get_enhanced_performance_metrics(user_id, lesson_id)
+        metrics = self.get_enhanced_performance_metrics(user_id, lesson_id, user_state=user_state)
         
         return {
-            'current_difficulty': user_state['current_difficulty'],
-            'confidence_scores': user_state['confidence_scores'],
-            'learning_momentum': user_state['learning_momentum'],
-            'streak_counter': user_state['streak_counter'],
-            'struggle_counter': user_state['struggle_counter'],
+            'current_difficulty': user_state.current_difficulty,
+            'confidence_scores': list(user_state.confidence_scores),
+            'learning_momentum': user_state.learning_momentum,
+            'streak_counter': user_state.streak_counter,
+            'struggle_counter': user_state.struggle_counter,
             'success_rate': metrics.success_rate,
             'consecutive_correct': metrics.consecutive_correct,
             'consecutive_wrong': metrics.consecutive_wrong,
             'difficulty_stability': metrics.difficulty_stability,
             'learning_velocity': metrics.learning_velocity,
             'recent_attempts': metrics.recent_attempts,
-            'difficulty_history': list(user_state['difficulty_history'])[-5:],  # Last 5 changes
+            'difficulty_history': list(user_state.difficulty_history)[-5:],  # Last 5 changes
             'recommendation': self._get_learning_recommendation(user_state, metrics)
         }
     
-    def _get_learning_recommendation(self, user_state: Dict, metrics: PerformanceMetrics) -> str:
+    def _get_learning_recommendation(self, user_state: LearnerState, metrics: PerformanceMetrics) -> str:
         """Provide learning recommendations based on current state."""
         
         if metrics.consecutive_wrong >= 3:
@@ -433,9 +1125,9 @@ class EnhancedAdaptiveDifficultySelector:
             return "Focus on mastering current level before advancing"
         elif metrics.success_rate > 0.8 and metrics.difficulty_stability > 0.6:
             return "Excellent progress! Time to level up"
-        elif user_state['learning_momentum'] > 0.3:
+        elif user_state.learning_momentum > 0.3:
             return "Great improvement trend - keep building on this progress"
-        elif user_state['learning_momentum'] < -0.3:
+        elif user_state.learning_momentum < -0.3:
             return "Consider reviewing fundamentals to build stronger foundation"
         else:
             return "Steady progress - maintain current practice routine"
@@ -444,17 +1136,21 @@ class EnhancedAdaptiveDifficultySelector:
 # Global enhanced instance
 enhanced_difficulty_selector = EnhancedAdaptiveDifficultySelector()
 
-def select_difficulty_ultra_responsive(user_id: int, lesson_id: int) -> int:
+def select_difficulty_ultra_responsive(user_id: int, lesson_id: int, uow=None) -> int:
     """Main interface for ultra-responsive difficulty selection."""
-    return enhanced_difficulty_selector.select_difficulty_ultra_responsive(user_id, lesson_id)
+    return enhanced_difficulty_selector.select_difficulty_ultra_responsive(user_id, lesson_id, uow=uow)
 
 def update_bandit_state_enhanced(user_id: int, lesson_id: int, difficulty: int, 
-                               was_correct: bool, response_time: float = None):
+                               was_correct: bool, response_time: float = None, uow=None):
     """Enhanced bandit state update with immediate response capabilities."""
     enhanced_difficulty_selector.update_bandit_state_enhanced(
-        user_id, lesson_id, difficulty, was_correct, response_time
+        user_id, lesson_id, difficulty, was_correct, response_time, uow=uow
     )
 
+def select_difficulties_batch(user_ids, lesson_ids, uow=None) -> np.ndarray:
+    """Difficulty decisions for many (user_id, lesson_id) pairs at once."""
+    return enhanced_difficulty_selector.select_difficulties_batch(user_ids, lesson_ids, uow=uow)
+
 def get_user_learning_insights(user_id: int, lesson_id: int) -> Dict[str, Any]:
     """Get comprehensive user learning insights."""
     return enhanced_difficulty_selector.get_user_insights(user_id, lesson_id)
\ No newline at end of file
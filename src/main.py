@@ -1,29 +1,46 @@
 import logging
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, File, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, Field
 import psycopg2.extras
 from datetime import timedelta, date, datetime
+import io
 import random
-from jose import jwt, JWTError
+from jose import JWTError
 from typing import List, Optional
 import os
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+import asyncpg
 
 # --- Import our custom modules ---
 # MODIFIED: Import the new, advanced functions
 from .learning_models import (
-    select_difficulty_ultra_responsive,
-    update_bandit_state_enhanced
+    enhanced_difficulty_selector,
+    select_difficulties_batch
 )
-from .adaptive_engine import get_db_connection, select_question
+from .adaptive_engine import select_question_async
+from .question_index import question_index
+from . import question_prefetch
+from .db_pool import PoolTimeoutError, get_pool, get_pool_stats
+from .unit_of_work import UnitOfWork, get_unit_of_work
+from .async_db import AsyncUnitOfWork, async_pool, get_async_unit_of_work
+from .achievements import achievement_catalog
+from .grading import encode_answers, embedding_to_bytes
+from .grading_cascade import create_cascade_from_env
+from .grading_cache import create_result_cache_from_env
+from .auth_cache import create_auth_cache_from_env
+from .password_hasher import PasswordHasherBusyError, create_password_hasher_from_env
+from .admin_stats import create_dashboard_stats_from_env, load_dashboard
+from . import admin_listing
+from . import question_import
+from . import analytics_export
+from .inference_batcher import create_encoder_from_env
+from . import model_store
 from . import security
 from .db_models import User
 
-# MODIFIED: Add SentenceTransformer imports directly, as it's no longer in learning_models.py
-from sentence_transformers import SentenceTransformer, util
-
 # --- Basic App Setup ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 app = FastAPI(title="LearnBuddy AI Engine", version="1.0.0")
@@ -36,11 +53,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the admin panel read the pagination cursor
+    expose_headers=["X-Next-Cursor"],
 )
-similarity_model = SentenceTransformer(
-    'all-MiniLM-L6-v2',
-    cache_folder=os.environ.get('TRANSFORMERS_CACHE', './model_cache')
-)
+
+@app.exception_handler(PoolTimeoutError)
+def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    logging.warning(f"Database pool exhausted on {request.url.path}: {exc}")
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": "Server is busy, please try again."}, headers={"Retry-After": "1"})
+
+@app.exception_handler(PasswordHasherBusyError)
+def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    logging.warning(f"Password hashing saturated on {request.url.path}: {exc}")
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": "Too many logins right now, please try again."}, headers={"Retry-After": "1"})
+
+@app.on_event("startup")
+def warm_db_pool():
+    try:
+        get_pool().fill()
+    except Exception as e:
+        logging.warning(f"Could not pre-open database connections: {e}")
+
+@app.on_event("startup")
+async def warm_async_db_pool():
+    try:
+        await async_pool.get_pool()
+    except Exception as e:
+        logging.warning(f"Could not open the async database pool: {e}")
+
+@app.on_event("shutdown")
+async def close_async_db_pool():
+    await async_pool.close()
+
+@app.on_event("startup")
+def load_question_index():
+    try:
+        count = question_index.load()
+        logging.info(f"Question index loaded with {count} questions")
+    except Exception as e:
+        logging.warning(f"Could not load the question index, selecting from the database: {e}")
+    question_index.start_refresher()
+
+@app.on_event("startup")
+def warm_similarity_model():
+    # A no-op when gunicorn already loaded the model in the master process;
+    # ONNX sessions are always created here, in the worker
+    try:
+        model_store.get_grading_model()
+    except Exception as e:
+        logging.warning(f"Could not load the similarity model at startup: {e}")
+    logging.info(f"Worker memory after startup: {model_store.memory_usage()}")
 
 # --- Pydantic Models for API Data (Unchanged) ---
 class UserCreate(BaseModel):
@@ -57,12 +119,17 @@ class Token(BaseModel):
 
 class NextQuestionRequest(BaseModel):
     lesson_id: int
+    # Answers to plan ahead; > 0 adds a question queue and a cursor to the response
+    prefetch: int = Field(0, ge=0, le=question_prefetch.MAX_DEPTH)
 
 class AnswerSubmission(BaseModel):
     lesson_id: int
     question_id: int
-    difficulty_answered: int
+    # Kept for older clients; the graded question's own difficulty_level is what gets recorded
+    difficulty_answered: Optional[int] = None
     user_answer: str
+    # Cursor from /next_question or the previous submit, when following a prefetched queue
+    cursor: Optional[str] = None
 
 class QuestResponse(BaseModel):
     title: str
@@ -117,55 +184,164 @@ class QuestionCreateUpdate(BaseModel):
     difficulty_level: int
     correct_answer_text: str
 
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class QuestionImportReport(BaseModel):
+    rows_read: int
+    rows_imported: int
+    rows_failed: int
+    embeddings_computed: int
+    errors: List[ImportRowError]
+    committed: bool
+    seconds: float
+    rows_per_sec: float
+
+class BatchDifficultyRequest(BaseModel):
+    user_ids: List[int] = Field(..., max_length=50000)
+    lesson_ids: List[int] = Field(..., max_length=50000)
+
+class BatchDifficultyResponse(BaseModel):
+    user_ids: List[int]
+    lesson_ids: List[int]
+    difficulty_levels: List[int]
+
 class AdminStats(BaseModel):
     total_users: int
     total_questions: int
     total_answers_submitted: int
     questions_by_difficulty: dict
-
-# --- Load Similarity Model on Startup ---
-similarity_model = SentenceTransformer('all-MiniLM-L6-v2')
-
-
-# --- Achievement Helper Function (Unchanged) ---
-def check_and_award_achievements(user_id: int, conn, cur):
-    cur.execute("SELECT id, name, criteria_type, criteria_value, xp_reward FROM achievements WHERE id NOT IN (SELECT achievement_id FROM user_achievements WHERE user_id = %s)", (user_id,))
-    unearned_achievements = cur.fetchall()
-    if not unearned_achievements: return
-    cur.execute("SELECT streak_count FROM users WHERE id = %s", (user_id,))
-    user_stats = cur.fetchone()
-    cur.execute("SELECT COUNT(*) FROM user_progress WHERE user_id = %s", (user_id,))
-    total_answers = cur.fetchone()['count']
-    cur.execute("SELECT COUNT(*) FROM user_progress WHERE user_id = %s AND is_correct = TRUE", (user_id,))
-    total_correct_answers = cur.fetchone()['count']
-    xp_to_add = 0
-    for achievement in unearned_achievements:
-        unlocked = False
-        if achievement['criteria_type'] == 'STREAK' and user_stats['streak_count'] >= achievement['criteria_value']: unlocked = True
-        elif achievement['criteria_type'] == 'ANSWERS_TOTAL' and total_answers >= achievement['criteria_value']: unlocked = True
-        elif achievement['criteria_type'] == 'CORRECT_ANSWERS_TOTAL' and total_correct_answers >= achievement['criteria_value']: unlocked = True
-        if unlocked:
-            cur.execute("INSERT INTO user_achievements (user_id, achievement_id) VALUES (%s, %s)", (user_id, achievement['id']))
-            xp_to_add += achievement['xp_reward']
-            logging.info(f"User {user_id} unlocked achievement '{achievement['name']}'!")
-    if xp_to_add > 0: cur.execute("UPDATE users SET xp = xp + %s WHERE id = %s", (xp_to_add, user_id))
-
-
-# --- Security & Dependencies (Unchanged) ---
-def get_current_user(token: str = Depends(security.oauth2_scheme)) -> User:
-    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    # When the figures were read, and how long ago that was
+    as_of: datetime
+    age_seconds: float
+
+class PoolStats(BaseModel):
+    worker_pid: int
+    min_size: int = 0
+    max_size: int = 0
+    size: int = 0
+    idle: int = 0
+    in_use: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    connections_created: int = 0
+    connections_discarded: int = 0
+    avg_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+# --- Similarity Model ---
+# Loaded once per process by model_store (see gunicorn.conf.py for sharing it
+# across workers). Concurrent submissions are encoded together in micro-batches.
+grading_encoder = create_encoder_from_env(model_store.similarity_model)
+# Repeat answers are replayed from the result cache instead of being re-encoded
+grading_results = create_result_cache_from_env()
+grading_cascade = create_cascade_from_env(grading_results)
+auth_cache = create_auth_cache_from_env()
+# bcrypt runs in its own bounded process pool, never in the request threads
+password_hasher = create_password_hasher_from_env()
+# /admin/stats snapshots, shared by concurrent dashboard loads
+dashboard_stats = create_dashboard_stats_from_env()
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+
+# --- Achievement & Quest Helper Functions ---
+# UPDATED: These run on the request's AsyncUnitOfWork (see src.async_db).
+# Achievements are awarded from the counters on the users row (see src.achievements).
+
+# XP for a correct answer, before quest and achievement rewards
+ANSWER_XP = 10
+
+# Everything /submit_answer records after grading, in one round trip: the
+# progress row, today's quest, the answer counters and XP, and the answer
+# achievements this answer reached. The users UPDATE holds the row lock, so
+# concurrent answers from one user see each other's counters and a threshold
+# (== the new counter value) is reached by exactly one of them.
+RECORD_ANSWER_SQL = """
+    WITH progress AS (
+        INSERT INTO user_progress (user_id, question_id, is_correct) VALUES (%s, %s, %s)
+    ), quest AS (
+        UPDATE user_quests uq
+        SET current_progress = uq.current_progress + 1,
+            is_completed = (uq.current_progress + 1 >= q.completion_target)
+        FROM quests q
+        WHERE uq.quest_id = q.id AND uq.user_id = %s AND uq.assigned_date = CURRENT_DATE AND uq.is_completed = FALSE
+          AND (q.quest_type = 'TOTAL_ANSWERS' OR (q.quest_type = 'CORRECT_ANSWERS' AND %s))
+        RETURNING uq.is_completed, q.xp_reward
+    ), quest_reward AS (
+        SELECT COALESCE(SUM(xp_reward) FILTER (WHERE is_completed), 0) AS xp, COALESCE(bool_or(is_completed), FALSE) AS completed
+        FROM quest
+    ), counters AS (
+        UPDATE users u
+        SET total_answers = u.total_answers + 1,
+            total_correct = u.total_correct + CASE WHEN %s THEN 1 ELSE 0 END,
+            xp = u.xp + %s + (SELECT xp FROM quest_reward) + (
+                SELECT COALESCE(SUM(a.xp_reward), 0) FROM achievements a
+                WHERE ((a.criteria_type = 'ANSWERS_TOTAL' AND a.criteria_value = u.total_answers + 1)
+                    OR (a.criteria_type = 'CORRECT_ANSWERS_TOTAL' AND %s AND a.criteria_value = u.total_correct + 1))
+                  AND NOT EXISTS (SELECT 1 FROM user_achievements ua WHERE ua.user_id = u.id AND ua.achievement_id = a.id)
+            )
+        WHERE u.id = %s
+        RETURNING u.id, u.total_answers, u.total_correct
+    ), awarded AS (
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT c.id, a.id FROM counters c JOIN achievements a
+          ON (a.criteria_type = 'ANSWERS_TOTAL' AND a.criteria_value = c.total_answers)
+          OR (a.criteria_type = 'CORRECT_ANSWERS_TOTAL' AND %s AND a.criteria_value = c.total_correct)
+        ON CONFLICT (user_id, achievement_id) DO NOTHING
+        RETURNING achievement_id
+    )
+    SELECT qr.completed AS quest_completed,
+           %s + qr.xp + COALESCE((SELECT SUM(a.xp_reward) FROM awarded JOIN achievements a ON a.id = awarded.achievement_id), 0) AS xp_gain,
+           ARRAY(SELECT a.name FROM awarded JOIN achievements a ON a.id = awarded.achievement_id) AS unlocked
+    FROM quest_reward qr;
+"""
+
+async def record_answer(user_id: int, question_id: int, is_correct: bool, uow: AsyncUnitOfWork):
+    """
+    Runs RECORD_ANSWER_SQL and returns (xp_gain, quest_completed_this_turn);
+    xp_gain is everything the answer added to users.xp.
+    """
+    answer_xp = ANSWER_XP if is_correct else 0
+    row = await uow.fetchrow(RECORD_ANSWER_SQL, (
+        user_id, question_id, is_correct,
+        user_id, is_correct,
+        is_correct, answer_xp, is_correct, user_id,
+        is_correct,
+        answer_xp,
+    ))
+    for name in row['unlocked']:
+        logging.info(f"User {user_id} unlocked achievement '{name}'!")
+    return int(row['xp_gain']), row['quest_completed']
+
+
+# --- Security & Dependencies ---
+def credentials_exception() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+
+def token_subject(token: str) -> str:
     try:
-        payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None: raise credentials_exception
-    except JWTError: raise credentials_exception
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT id, username, email, xp, is_admin FROM users WHERE username = %s", (username,))
-    user_data = cur.fetchone()
-    cur.close()
-    conn.close()
-    if user_data is None: raise credentials_exception
+        # Claims are memoized until the token expires
+        payload = auth_cache.decode(token)
+    except JWTError: raise credentials_exception()
+    username: str = payload.get("sub")
+    if username is None: raise credentials_exception()
+    return username
+
+def get_current_user(token: str = Depends(security.oauth2_scheme), uow: UnitOfWork = Depends(get_unit_of_work)) -> User:
+    # A cache hit never checks out a connection; a miss runs on the request's
+    # unit of work, so the endpoint reuses this connection
+    user_data = auth_cache.get_user(token_subject(token), uow.cursor)
+    if user_data is None: raise credentials_exception()
+    return UserInDB.model_validate(dict(user_data))
+
+async def get_current_user_async(token: str = Depends(security.oauth2_scheme), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)) -> User:
+    """get_current_user for the async learner endpoints, on the request's AsyncUnitOfWork."""
+    user_data = await auth_cache.get_user_async(token_subject(token), uow)
+    if user_data is None: raise credentials_exception()
     return UserInDB.model_validate(dict(user_data))
 
 def get_current_admin_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
@@ -175,34 +351,26 @@ def get_current_admin_user(current_user: UserInDB = Depends(get_current_user)) -
 
 
 # --- Learner Endpoints ---
+# UPDATED: The learner endpoints are async and run on asyncpg (src.async_db),
+# so a request waiting on the database holds no thread. bcrypt waits on its
+# process pool and answer grading (model inference) runs in the threadpool.
 @app.post("/signup", summary="Create a new user", status_code=status.HTTP_201_CREATED)
-def create_user_learner(user: UserCreate):
-    # This function is unchanged
-    hashed_password = security.get_password_hash(user.password)
-    conn = get_db_connection()
-    cur = conn.cursor()
+async def create_user_learner(user: UserCreate, uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    hashed_password = await password_hasher.hash_async(user.password)
     try:
-        cur.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id;", (user.username, user.email, hashed_password))
-        new_user_id = cur.fetchone()[0]
-        conn.commit()
-    except psycopg2.IntegrityError:
-        conn.rollback()
+        new_user_id = await uow.fetchval("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id;", (user.username, user.email, hashed_password))
+        await uow.commit()
+    except asyncpg.IntegrityConstraintViolationError:
+        await uow.rollback()
         raise HTTPException(status_code=400, detail="Username or email already registered.")
-    finally:
-        cur.close()
-        conn.close()
     return {"id": new_user_id, "username": user.username, "email": user.email}
 
 @app.post("/token", response_model=Token, summary="User login")
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    # This function is unchanged
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT * FROM users WHERE username = %s", (form_data.username,))
-    user = cur.fetchone()
-    if not user or not security.verify_password(form_data.password, user['password_hash']):
-        cur.close()
-        conn.close()
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    user = await uow.fetchrow("SELECT * FROM users WHERE username = %s", (form_data.username,))
+    # Hand the connection back while the hash waits its turn; the streak update checks out a new one
+    await uow.close()
+    if not user or not await password_hasher.verify_async(form_data.password, user['password_hash']):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password", headers={"WWW-Authenticate": "Bearer"})
     today = date.today()
     last_login = user['last_login_date']
@@ -211,276 +379,405 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     elif last_login < today:
         if last_login == today - timedelta(days=1): new_streak += 1
         else: new_streak = 1
-    cur.execute("UPDATE users SET streak_count = %s, last_login_date = %s WHERE id = %s", (new_streak, today, user['id']))
-    check_and_award_achievements(user['id'], conn, cur)
-    conn.commit()
-    cur.close()
-    conn.close()
+    await uow.execute("UPDATE users SET streak_count = %s, last_login_date = %s WHERE id = %s", (new_streak, today, user['id']))
+    await achievement_catalog.award_async(user['id'], {'STREAK': (user['streak_count'], new_streak)}, uow)
+    await uow.commit()
+    # A login is the natural point to re-read the row (it may also have earned XP)
+    auth_cache.invalidate(user['username'])
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(data={"sub": user['username']}, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
 
+def pick_indexed_question(lesson_id: int, difficulty: int, exclude=()):
+    """(question_id, question_text, difficulty_level) from the in-memory question index, or None."""
+    return question_index.pick(lesson_id, difficulty, exclude=exclude) if question_index.loaded else None
+
+async def pick_question(lesson_id: int, difficulty: int, uow: AsyncUnitOfWork, exclude=()):
+    """
+    Picked from the in-memory question index; the database query is only the
+    fallback for a worker whose index could not be loaded (and ignores exclude).
+    Returns (question_id, question_text, difficulty_level) or None.
+    """
+    if question_index.loaded:
+        return pick_indexed_question(lesson_id, difficulty, exclude)
+    question_id, question_text, actual_difficulty = await select_question_async(difficulty, lesson_id, uow)
+    return None if question_id is None else (question_id, question_text, actual_difficulty)
+
 @app.post("/next_question", summary="Get the next AI-selected question (Protected)", tags=["Learner"])
-def get_next_question(req: NextQuestionRequest, current_user: User = Depends(get_current_user)):
+async def get_next_question(req: NextQuestionRequest, current_user: User = Depends(get_current_user_async), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
     # The AI decides the IDEAL difficulty
-    optimal_difficulty = select_difficulty_ultra_responsive(current_user.id, req.lesson_id)
+    optimal_difficulty = await enhanced_difficulty_selector.select_difficulty_async(current_user.id, req.lesson_id, uow)
+    # Persists the learner state when it lives in Postgres (LEARNER_STATE_BACKEND)
+    await uow.commit()
     
-    # Unpack the THREE values from the new select_question function
-    question_id, question_text, actual_difficulty = select_question(optimal_difficulty, req.lesson_id)
+    question_id, question_text, actual_difficulty = await pick_question(req.lesson_id, optimal_difficulty, uow) or (None, None, None)
     
     if question_id is None:
         raise HTTPException(status_code=404, detail="No questions found for this lesson.")
         
     # Return the ACTUAL difficulty of the question served
-    return {"difficulty_level": actual_difficulty, "question_id": question_id, "question_text": question_text}
-
-@app.post("/submit_answer", summary="Submit an answer (Protected)", tags=["Learner"])
-def submit_answer(submission: AnswerSubmission, current_user: User = Depends(get_current_user)):
-    # MODIFIED: Logic updated to use new functions
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        cur.execute("SELECT correct_answer_text FROM questions WHERE id = %s;", (submission.question_id,))
-        result = cur.fetchone()
-        if not result: raise HTTPException(status_code=404, detail="Question ID not found.")
-        
-        correct_answer = result['correct_answer_text']
-        
-        # Perform similarity check directly in the endpoint
-        embedding1 = similarity_model.encode(submission.user_answer.lower().strip(), convert_to_tensor=True)
-        embedding2 = similarity_model.encode(correct_answer.lower().strip(), convert_to_tensor=True)
-        similarity_score = util.cos_sim(embedding1, embedding2).item()
-        is_correct = similarity_score > 0.8
-        
-        # Call the new, enhanced update function
-        update_bandit_state_enhanced(
-            user_id=current_user.id, 
-            lesson_id=submission.lesson_id, 
-            difficulty=submission.difficulty_answered, 
-            was_correct=is_correct
+    response = {"difficulty_level": actual_difficulty, "question_id": question_id, "question_text": question_text}
+    if req.prefetch:
+        # NEW: the questions for both outcomes of the next `prefetch` answers,
+        # so the client can keep going without calling /next_question again
+        plan, texts = question_prefetch.plan_questions(
+            current_user.id, req.lesson_id, (question_id, optimal_difficulty, actual_difficulty), req.prefetch,
+            lambda difficulty, exclude: pick_indexed_question(req.lesson_id, difficulty, exclude),
+            await enhanced_difficulty_selector.get_learner_state_async(current_user.id, req.lesson_id, uow)
         )
-        
-        cur.execute("INSERT INTO user_progress (user_id, question_id, is_correct) VALUES (%s, %s, %s);", (current_user.id, submission.question_id, is_correct))
-        
-        xp_gain = 10 if is_correct else 0
-        quest_completed_this_turn = False
-        
-        cur.execute("SELECT uq.id, uq.current_progress, q.quest_type, q.completion_target, q.xp_reward FROM user_quests uq JOIN quests q ON uq.quest_id = q.id WHERE uq.user_id = %s AND uq.assigned_date = CURRENT_DATE AND uq.is_completed = FALSE;", (current_user.id,))
-        active_quest = cur.fetchone()
-        if active_quest:
-            quest_progress_updated = (active_quest['quest_type'] == 'TOTAL_ANSWERS') or (active_quest['quest_type'] == 'CORRECT_ANSWERS' and is_correct)
-            if quest_progress_updated:
-                new_progress = active_quest['current_progress'] + 1
-                cur.execute("UPDATE user_quests SET current_progress = %s WHERE id = %s", (new_progress, active_quest['id']))
-                if new_progress >= active_quest['completion_target']:
-                    cur.execute("UPDATE user_quests SET is_completed = TRUE WHERE id = %s", (active_quest['id'],))
-                    xp_gain += active_quest['xp_reward']
-                    quest_completed_this_turn = True
-        
-        if xp_gain > 0: cur.execute("UPDATE users SET xp = xp + %s WHERE id = %s;", (xp_gain, current_user.id))
-        
-        check_and_award_achievements(current_user.id, conn, cur)
-        conn.commit()
+        response["queue"] = plan.queue(texts)
+        response["cursor"] = plan.to_cursor()
+    return response
 
-        return {"status": "Answer processed", "is_correct": is_correct, "similarity_score": round(similarity_score, 2), "quest_completed": quest_completed_this_turn}
-    finally:
-        cur.close()
-        conn.close()
+@app.post("/submit_answer", summary="Submit an answer (Protected)", tags=["Learner"])
+async def submit_answer(submission: AnswerSubmission, current_user: User = Depends(get_current_user_async), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    plan = None
+    if submission.cursor:
+        try:
+            plan = question_prefetch.QuestionPlan.from_cursor(submission.cursor, current_user.id, submission.lesson_id)
+        except question_prefetch.InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid or expired prefetch cursor.")
+
+    # MODIFIED: All bookkeeping below runs in the request's single transaction
+    result = await uow.fetchrow(*grading_results.question_query(submission.question_id, submission.user_answer))
+    if not result: raise HTTPException(status_code=404, detail="Question ID not found.")
+    
+    # Exact/numeric/lexical tiers decide most short answers, repeats come from
+    # the result cache; only the rest are encoded (in the threadpool, so the
+    # event loop keeps serving while the model runs)
+    is_correct, similarity_score, new_reference, tier = await run_in_threadpool(
+        grading_cascade.grade,
+        grading_encoder, submission.user_answer, result['correct_answer_text'], result['answer_embedding'],
+        question_id=submission.question_id,
+        stored_result=(result['cached_is_correct'], result['cached_similarity_score'])
+    )
+    if new_reference is not None:
+        # Not backfilled yet - persist it so the next submission skips this encode
+        await uow.execute("UPDATE questions SET answer_embedding = %s WHERE id = %s;", (new_reference, submission.question_id))
+    if tier == "embedding":
+        await grading_results.save_async(uow, submission.question_id, result['correct_answer_text'], submission.user_answer, is_correct, similarity_score)
+    
+    # Call the new, enhanced update function with the question's stored difficulty,
+    # the same one the performance window is rebuilt from
+    await enhanced_difficulty_selector.update_bandit_state_async(
+        current_user.id, submission.lesson_id, result['difficulty_level'], is_correct, uow
+    )
+    
+    # UPDATED: progress, quest, XP and achievements in one statement
+    xp_gain, quest_completed_this_turn = await record_answer(current_user.id, submission.question_id, is_correct, uow)
+    
+    response = {"status": "Answer processed", "is_correct": is_correct, "similarity_score": round(similarity_score, 2), "quest_completed": quest_completed_this_turn}
+    if plan is not None:
+        # Tells the client whether its queued question still stands, or replaces the plan:
+        # the selection step /next_question would have taken decides
+        difficulty = await enhanced_difficulty_selector.select_difficulty_async(current_user.id, submission.lesson_id, uow)
+        followed = question_prefetch.follow_plan(plan, submission.question_id, is_correct, difficulty)
+        if followed is None:
+            followed = question_prefetch.replan(
+                plan, await pick_question(submission.lesson_id, difficulty, uow, exclude={submission.question_id}), difficulty,
+                lambda difficulty, exclude: pick_indexed_question(submission.lesson_id, difficulty, exclude),
+                await enhanced_difficulty_selector.get_learner_state_async(current_user.id, submission.lesson_id, uow)
+            )
+        response["prefetch"] = followed
+    await uow.commit()
+    auth_cache.add_xp(current_user.username, xp_gain)
+
+    return response
 
 @app.get("/users/me/stats", response_model=UserStatsResponse, summary="Get current user's stats (Protected)", tags=["Learner"])
-def get_user_stats(current_user: User = Depends(get_current_user)):
-    # This function is unchanged
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT xp, streak_count, last_login_date FROM users WHERE id = %s", (current_user.id,))
-    stats = cur.fetchone()
-    cur.close()
-    conn.close()
+async def get_user_stats(current_user: User = Depends(get_current_user_async), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    stats = await uow.fetchrow("SELECT xp, streak_count, last_login_date FROM users WHERE id = %s", (current_user.id,))
     if not stats: raise HTTPException(status_code=404, detail="User not found.")
     return UserStatsResponse(xp=stats['xp'], streak_count=stats['streak_count'], last_login_date=stats['last_login_date'])
 
 @app.get("/quests/today", response_model=QuestResponse, summary="Get today's quest (Protected)", tags=["Learner"])
-def get_daily_quest(current_user: User = Depends(get_current_user)):
-    # This function is unchanged
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT q.title, q.description, uq.current_progress, q.completion_target, q.xp_reward, uq.is_completed FROM user_quests uq JOIN quests q ON uq.quest_id = q.id WHERE uq.user_id = %s AND uq.assigned_date = CURRENT_DATE;", (current_user.id,))
-    quest_data = cur.fetchone()
+async def get_daily_quest(current_user: User = Depends(get_current_user_async), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    quest_sql = "SELECT q.title, q.description, uq.current_progress, q.completion_target, q.xp_reward, uq.is_completed FROM user_quests uq JOIN quests q ON uq.quest_id = q.id WHERE uq.user_id = %s AND uq.assigned_date = CURRENT_DATE;"
+    quest_data = await uow.fetchrow(quest_sql, (current_user.id,))
     if not quest_data:
-        cur.execute("SELECT id FROM quests WHERE quest_type != 'TIME_BASED' ORDER BY RANDOM() LIMIT 1")
-        random_quest = cur.fetchone()
+        random_quest = await uow.fetchrow("SELECT id FROM quests WHERE quest_type != 'TIME_BASED' ORDER BY RANDOM() LIMIT 1")
         if not random_quest:
-            cur.close()
-            conn.close()
             raise HTTPException(status_code=404, detail="No available quests to assign.")
-        cur.execute("INSERT INTO user_quests (user_id, quest_id) VALUES (%s, %s) RETURNING id;", (current_user.id, random_quest['id']))
-        conn.commit()
-        cur.execute("SELECT q.title, q.description, uq.current_progress, q.completion_target, q.xp_reward, uq.is_completed FROM user_quests uq JOIN quests q ON uq.quest_id = q.id WHERE uq.user_id = %s AND uq.assigned_date = CURRENT_DATE;", (current_user.id,))
-        quest_data = cur.fetchone()
-    cur.close()
-    conn.close()
+        await uow.execute("INSERT INTO user_quests (user_id, quest_id) VALUES (%s, %s) RETURNING id;", (current_user.id, random_quest['id']))
+        await uow.commit()
+        quest_data = await uow.fetchrow(quest_sql, (current_user.id,))
     return QuestResponse(**quest_data)
 
 @app.get("/achievements", response_model=List[AchievementResponse], summary="Get user's unlocked achievements", tags=["Learner"])
-def get_user_achievements(current_user: User = Depends(get_current_user)):
-    # This function is unchanged
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT a.name, a.description, a.icon_class, ua.unlocked_at FROM user_achievements ua JOIN achievements a ON ua.achievement_id = a.id WHERE ua.user_id = %s ORDER BY ua.unlocked_at DESC;", (current_user.id,))
-    achievements = cur.fetchall()
-    cur.close()
-    conn.close()
+async def get_user_achievements(current_user: User = Depends(get_current_user_async), uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    achievements = await uow.fetch("SELECT a.name, a.description, a.icon_class, ua.unlocked_at FROM user_achievements ua JOIN achievements a ON ua.achievement_id = a.id WHERE ua.user_id = %s ORDER BY ua.unlocked_at DESC;", (current_user.id,))
     return [AchievementResponse(**ach) for ach in achievements]
 
 
 # ===================================================================
 # ===================== ADMIN PANEL ENDPOINTS =======================
 # ===================================================================
+# Admin endpoints share the request's unit of work with get_current_user,
+# so each request holds at most one pooled connection.
 
 @app.post("/admin/token", response_model=Token, summary="Admin user login", tags=["Admin"])
-def admin_login(form_data: OAuth2PasswordRequestForm = Depends()):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT * FROM users WHERE username = %s", (form_data.username,))
-    user = cur.fetchone()
-    cur.close()
-    conn.close()
-    if not user or not user['is_admin'] or not security.verify_password(form_data.password, user['password_hash']):
+def admin_login(form_data: OAuth2PasswordRequestForm = Depends(), uow: UnitOfWork = Depends(get_unit_of_work)):
+    uow.cursor.execute("SELECT * FROM users WHERE username = %s", (form_data.username,))
+    user = uow.cursor.fetchone()
+    uow.close()
+    if not user or not user['is_admin'] or not password_hasher.verify(form_data.password, user['password_hash']):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password, or not an admin.")
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(data={"sub": user['username']}, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/admin/stats", response_model=AdminStats, summary="Get dashboard statistics", tags=["Admin"])
-def get_admin_stats(admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT count(*) FROM users;")
-    total_users = cur.fetchone()[0]
-    cur.execute("SELECT count(*) FROM questions;")
-    total_questions = cur.fetchone()[0]
-    cur.execute("SELECT count(*) FROM user_progress;")
-    total_answers = cur.fetchone()[0]
-    cur.execute("SELECT difficulty_level, count(*) FROM questions GROUP BY difficulty_level;")
-    difficulty_counts = {str(row['difficulty_level']): row['count'] for row in cur.fetchall()}
-    cur.close()
-    conn.close()
-    return {"total_users": total_users, "total_questions": total_questions, "total_answers_submitted": total_answers, "questions_by_difficulty": difficulty_counts}
-
-@app.get("/admin/users", response_model=List[UserAdminResponse], summary="Get all users", tags=["Admin"])
-def get_all_users(admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT id, username, email, xp, is_admin FROM users ORDER BY id ASC;")
-    users = [UserAdminResponse.model_validate(dict(row)) for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return users
+def get_admin_stats(admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    # UPDATED: trigger-maintained counters (no table scans), served from a
+    # snapshot at most ADMIN_STATS_MAX_AGE_SECONDS old
+    return dashboard_stats.get(lambda: load_dashboard(uow.cursor))
+
+@app.get("/admin/stats/cache", summary="Get dashboard statistics cache counters for this worker", tags=["Admin"])
+def get_admin_stats_cache(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **dashboard_stats.stats()}
+
+@app.get("/admin/db_pool", response_model=PoolStats, summary="Get database connection pool statistics for this worker", tags=["Admin"])
+def get_db_pool_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return PoolStats(worker_pid=os.getpid(), **get_pool_stats())
+
+@app.get("/admin/async_db_pool", summary="Get async (learner endpoint) database pool statistics for this worker", tags=["Admin"])
+def get_async_db_pool_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **async_pool.stats()}
+
+@app.get("/admin/achievements", summary="Get achievement engine statistics for this worker", tags=["Admin"])
+def get_achievement_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **achievement_catalog.stats()}
+
+@app.get("/admin/grading", summary="Get answer-grading batch statistics for this worker", tags=["Admin"])
+def get_grading_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {
+        "worker_pid": os.getpid(),
+        **grading_encoder.stats(),
+        "cascade": grading_cascade.stats(),
+        "result_cache": grading_results.stats(),
+    }
+
+@app.get("/admin/question_index", summary="Get the in-memory question index of this worker", tags=["Admin"])
+def get_question_index_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **question_index.stats()}
+
+@app.post("/admin/difficulties", response_model=BatchDifficultyResponse, summary="Select the next difficulty for many learners at once", tags=["Admin"])
+def select_batch_difficulties(req: BatchDifficultyRequest, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    # For dashboards and classroom pre-generation: one query and vectorized rules for every pair
+    try:
+        levels = select_difficulties_batch(req.user_ids, req.lesson_ids, uow=uow)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    uow.commit()
+    return BatchDifficultyResponse(user_ids=req.user_ids, lesson_ids=req.lesson_ids, difficulty_levels=levels.tolist())
+
+@app.get("/admin/password_hasher", summary="Get password hashing pool statistics for this worker", tags=["Admin"])
+def get_password_hasher_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **password_hasher.stats()}
+
+@app.get("/admin/auth_cache", summary="Get authentication cache statistics for this worker", tags=["Admin"])
+def get_auth_cache_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **auth_cache.stats()}
+
+@app.get("/admin/prefetch", summary="Get question prefetch statistics for this worker", tags=["Admin"])
+def get_prefetch_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    return {"worker_pid": os.getpid(), **question_prefetch.prefetch_stats.stats()}
+
+@app.get("/admin/learner_state", summary="Get learner state store statistics for this worker", tags=["Admin"])
+def get_learner_state_stats(admin: UserInDB = Depends(get_current_admin_user)):
+    selector = enhanced_difficulty_selector
+    return {
+        "worker_pid": os.getpid(),
+        **selector.user_states.stats(),
+        "performance_windows": {
+            "hits": selector.window_hits,
+            "rebuilds": selector.window_rebuilds,
+            "stale_rebuilds": selector.window_stale_rebuilds,
+        },
+    }
+
+@app.get("/admin/memory", summary="Get resident memory of this worker", tags=["Admin"])
+def get_worker_memory(admin: UserInDB = Depends(get_current_admin_user)):
+    return {**model_store.memory_usage(), **model_store.model_info()}
+
+# UPDATED: The admin listings take filters and keyset pagination. With
+# `limit` they return one page and, unless it was the last one, the cursor for
+# the next in the X-Next-Cursor header. Without it the whole (filtered) listing
+# is streamed from a server-side cursor as the same JSON array.
+def listing_page(response: Response, sql: str, params: tuple, limit: int, uow: UnitOfWork, model):
+    rows, next_cursor = admin_listing.fetch_page(uow.cursor, sql, params, limit)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return [model.model_validate(dict(row)) for row in rows]
+
+@app.get("/admin/users", response_model=List[UserAdminResponse], summary="Get users (paged with limit/cursor, streamed without)", tags=["Admin"])
+def get_all_users(
+    response: Response,
+    username_prefix: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=admin_listing.MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor from the previous page"),
+    admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    sql, params = admin_listing.users_query(username_prefix, cursor, limit)
+    if limit is None:
+        return StreamingResponse(admin_listing.stream_json_array(sql, params, UserAdminResponse), media_type="application/json")
+    return listing_page(response, sql, params, limit, uow, UserAdminResponse)
 
 @app.get("/admin/users/{user_id}", response_model=UserAdminResponse, summary="Get a single user by ID", tags=["Admin"])
-def get_user_by_id(user_id: int, admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT id, username, email, xp, is_admin FROM users WHERE id = %s;", (user_id,))
-    user = cur.fetchone()
-    cur.close()
-    conn.close()
+def get_user_by_id(user_id: int, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    uow.cursor.execute("SELECT id, username, email, xp, is_admin FROM users WHERE id = %s;", (user_id,))
+    user = uow.cursor.fetchone()
     if not user: raise HTTPException(status_code=404, detail="User not found.")
     return UserAdminResponse.model_validate(dict(user))
 
 @app.post("/admin/users", response_model=UserAdminResponse, status_code=status.HTTP_201_CREATED, summary="Create a new user as Admin", tags=["Admin"])
-def create_user_admin(user: UserAdminCreate, admin: UserInDB = Depends(get_current_admin_user)):
-    hashed_password = security.get_password_hash(user.password)
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def create_user_admin(user: UserAdminCreate, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    hashed_password = password_hasher.hash(user.password)
     try:
-        cur.execute("INSERT INTO users (username, email, password_hash, xp, is_admin) VALUES (%s, %s, %s, %s, %s) RETURNING id;", (user.username, user.email, hashed_password, user.xp, user.is_admin))
-        new_user_id = cur.fetchone()['id']
-        conn.commit()
+        uow.cursor.execute("INSERT INTO users (username, email, password_hash, xp, is_admin) VALUES (%s, %s, %s, %s, %s) RETURNING id;", (user.username, user.email, hashed_password, user.xp, user.is_admin))
+        new_user_id = uow.cursor.fetchone()['id']
+        uow.commit()
     except psycopg2.IntegrityError:
-        conn.rollback()
+        uow.rollback()
         raise HTTPException(status_code=400, detail="Username or email already in use.")
-    finally:
-        cur.close()
-        conn.close()
     return UserAdminResponse(id=new_user_id, **user.model_dump())
 
 @app.put("/admin/users/{user_id}", response_model=UserAdminResponse, summary="Update a user as Admin", tags=["Admin"])
-def update_user_admin(user_id: int, user_update: UserAdminUpdate, admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def update_user_admin(user_id: int, user_update: UserAdminUpdate, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    cur = uow.cursor
+    # The self-join returns the username before the update, which is what cached rows are keyed by
     if user_update.password:
-        hashed_password = security.get_password_hash(user_update.password)
-        cur.execute("UPDATE users SET username=%s, email=%s, xp=%s, is_admin=%s, password_hash=%s WHERE id=%s RETURNING id;", (user_update.username, user_update.email, user_update.xp, user_update.is_admin, hashed_password, user_id))
+        hashed_password = password_hasher.hash(user_update.password)
+        cur.execute("UPDATE users u SET username=%s, email=%s, xp=%s, is_admin=%s, password_hash=%s FROM users old WHERE u.id=%s AND old.id = u.id RETURNING u.id, old.username;", (user_update.username, user_update.email, user_update.xp, user_update.is_admin, hashed_password, user_id))
     else:
-        cur.execute("UPDATE users SET username=%s, email=%s, xp=%s, is_admin=%s WHERE id=%s RETURNING id;", (user_update.username, user_update.email, user_update.xp, user_update.is_admin, user_id))
+        cur.execute("UPDATE users u SET username=%s, email=%s, xp=%s, is_admin=%s FROM users old WHERE u.id=%s AND old.id = u.id RETURNING u.id, old.username;", (user_update.username, user_update.email, user_update.xp, user_update.is_admin, user_id))
     
     updated_user = cur.fetchone()
     if updated_user is None: raise HTTPException(status_code=404, detail="User not found.")
-    conn.commit()
-    cur.close()
-    conn.close()
+    uow.commit()
+    auth_cache.invalidate(updated_user['username'], user_update.username)
     return UserAdminResponse(id=user_id, **user_update.model_dump())
 
 @app.delete("/admin/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a user", tags=["Admin"])
-def delete_user(user_id: int, admin: UserInDB = Depends(get_current_admin_user)):
+def delete_user(user_id: int, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
     if user_id == admin.id:
         raise HTTPException(status_code=400, detail="Admins cannot delete their own account.")
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM users WHERE id = %s RETURNING id;", (user_id,))
-    if cur.fetchone() is None: raise HTTPException(status_code=404, detail="User not found.")
-    conn.commit()
-    cur.close()
-    conn.close()
+    uow.cursor.execute("DELETE FROM users WHERE id = %s RETURNING id, username;", (user_id,))
+    deleted_user = uow.cursor.fetchone()
+    if deleted_user is None: raise HTTPException(status_code=404, detail="User not found.")
+    uow.commit()
+    auth_cache.invalidate(deleted_user['username'])
     return
 
-@app.get("/admin/questions", response_model=List[QuestionAdmin], summary="Get all questions", tags=["Admin"])
-def get_all_questions(admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("SELECT id, lesson_id, content as question_text, difficulty_level FROM questions ORDER BY id DESC;")
-    questions = [QuestionAdmin.model_validate(dict(row)) for row in cur.fetchall()]
-    cur.close()
-    conn.close()
-    return questions
+@app.get("/admin/questions", response_model=List[QuestionAdmin], summary="Get questions (paged with limit/cursor, streamed without)", tags=["Admin"])
+def get_all_questions(
+    response: Response,
+    lesson_id: Optional[int] = None,
+    difficulty: Optional[int] = Query(None, ge=1, le=5),
+    limit: Optional[int] = Query(None, ge=1, le=admin_listing.MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor from the previous page"),
+    admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    sql, params = admin_listing.questions_query(lesson_id, difficulty, cursor, limit)
+    if limit is None:
+        return StreamingResponse(admin_listing.stream_json_array(sql, params, QuestionAdmin), media_type="application/json")
+    return listing_page(response, sql, params, limit, uow, QuestionAdmin)
 
 @app.post("/admin/questions", response_model=QuestionAdmin, status_code=status.HTTP_201_CREATED, summary="Create a new question", tags=["Admin"])
-def create_question(question: QuestionCreateUpdate, admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("INSERT INTO questions (lesson_id, content, difficulty_level, correct_answer_text) VALUES (%s, %s, %s, %s) RETURNING id;", (question.lesson_id, question.question_text, question.difficulty_level, question.correct_answer_text))
-    new_id = cur.fetchone()['id']
-    conn.commit()
-    cur.close()
-    conn.close()
+def create_question(question: QuestionCreateUpdate, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    answer_embedding = embedding_to_bytes(encode_answers(grading_encoder, [question.correct_answer_text])[0])
+    uow.cursor.execute("INSERT INTO questions (lesson_id, content, difficulty_level, correct_answer_text, answer_embedding) VALUES (%s, %s, %s, %s, %s) RETURNING id;", (question.lesson_id, question.question_text, question.difficulty_level, question.correct_answer_text, answer_embedding))
+    new_id = uow.cursor.fetchone()['id']
+    uow.commit()
+    question_index.upsert(new_id, question.lesson_id, question.difficulty_level, question.question_text)
     return {**question.model_dump(exclude={"correct_answer_text"}), "id": new_id, "question_text": question.question_text}
 
+# NEW: Bulk import from a CSV (with a header) or JSONL file with the
+# QuestionCreateUpdate fields. Rows are validated and COPY'd in chunks with
+# their embeddings encoded a chunk at a time, all in one transaction; invalid
+# rows are skipped and listed in the report (strict=true rejects the whole file).
+@app.post("/admin/questions/import", response_model=QuestionImportReport, summary="Bulk-import questions from CSV or JSONL", tags=["Admin"])
+def import_questions(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or jsonl; taken from the file name when omitted"),
+    strict: bool = False,
+    admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    try:
+        fmt = question_import.detect_format(file.filename, format)
+    except question_import.ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        # Large batches go straight to the model, not through the request micro-batcher
+        encoder = model_store.get_grading_model()
+    except Exception as e:
+        logging.warning(f"Importing questions without embeddings: {e}")
+        encoder = None
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = question_import.import_questions(stream, fmt, uow.conn, encoder=encoder, strict=strict)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"The file is not valid UTF-8: {e}")
+    finally:
+        stream.detach()
+    if not report["committed"]:
+        raise HTTPException(status_code=422, detail=report)
+    if report["rows_imported"]:
+        question_index.load(uow.cursor)
+    logging.info(f"Question import: {report['rows_imported']} imported, {report['rows_failed']} failed, {report['rows_per_sec']} rows/s")
+    return report
+
 @app.put("/admin/questions/{question_id}", response_model=QuestionAdmin, summary="Update a question", tags=["Admin"])
-def update_question(question_id: int, question: QuestionCreateUpdate, admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    cur.execute("UPDATE questions SET lesson_id=%s, content=%s, difficulty_level=%s, correct_answer_text=%s WHERE id=%s RETURNING id;", (question.lesson_id, question.question_text, question.difficulty_level, question.correct_answer_text, question_id))
-    if cur.fetchone() is None: raise HTTPException(status_code=404, detail="Question not found.")
-    conn.commit()
-    cur.close()
-    conn.close()
+def update_question(question_id: int, question: QuestionCreateUpdate, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    answer_embedding = embedding_to_bytes(encode_answers(grading_encoder, [question.correct_answer_text])[0])
+    uow.cursor.execute("UPDATE questions SET lesson_id=%s, content=%s, difficulty_level=%s, correct_answer_text=%s, answer_embedding=%s WHERE id=%s RETURNING id;", (question.lesson_id, question.question_text, question.difficulty_level, question.correct_answer_text, answer_embedding, question_id))
+    if uow.cursor.fetchone() is None: raise HTTPException(status_code=404, detail="Question not found.")
+    # Cached grading results were decided against the old correct answer
+    grading_results.invalidate(question_id, uow.cursor)
+    uow.commit()
+    question_index.upsert(question_id, question.lesson_id, question.difficulty_level, question.question_text)
     return {**question.model_dump(exclude={"correct_answer_text"}), "id": question_id, "question_text": question.question_text}
 
 @app.delete("/admin/questions/{question_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a question", tags=["Admin"])
-def delete_question(question_id: int, admin: UserInDB = Depends(get_current_admin_user)):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM questions WHERE id = %s RETURNING id;", (question_id,))
-    if cur.fetchone() is None: raise HTTPException(status_code=404, detail="Question not found.")
-    conn.commit()
-    cur.close()
-    conn.close()
+def delete_question(question_id: int, admin: UserInDB = Depends(get_current_admin_user), uow: UnitOfWork = Depends(get_unit_of_work)):
+    uow.cursor.execute("DELETE FROM questions WHERE id = %s RETURNING id;", (question_id,))
+    if uow.cursor.fetchone() is None: raise HTTPException(status_code=404, detail="Question not found.")
+    uow.commit()
+    grading_results.invalidate(question_id)  # the table rows went with the question (ON DELETE CASCADE)
+    question_index.remove(question_id)
     return
 
+# NEW: Streams user_progress ("progress"), bandit_state ("bandit") or quest
+# history ("quests") for offline analysis, in keyset batches on short-lived
+# pooled connections (see analytics_export.iter_batches), optionally gzipped.
+@app.get("/admin/export/{dataset}", summary="Stream an analytics export (NDJSON, CSV or columnar batches)", tags=["Admin"])
+def export_analytics(
+    dataset: str,
+    format: str = Query("ndjson", description="ndjson, csv or columnar"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    lesson_id: Optional[int] = None,
+    gzip: bool = False,
+    admin: UserInDB = Depends(get_current_admin_user)
+):
+    # Everything is validated before the response starts: afterwards an error could only truncate it
+    if format not in analytics_export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format!r}; expected one of {', '.join(analytics_export.FORMATS)}")
+    try:
+        query = analytics_export.export_query(dataset, since, until, lesson_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    chunks = analytics_export.encode_batches(analytics_export.iter_batches(analytics_export.pooled_query, query), format)
+    filename = f"{dataset}.{'csv' if format == 'csv' else 'ndjson'}"
+    if gzip:
+        chunks, media_type, filename = analytics_export.gzip_stream(chunks), "application/gzip", filename + ".gz"
+    else:
+        media_type = analytics_export.MEDIA_TYPES[format]
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 @app.get("/users/me", summary="Get current user's profile info", tags=["Learner"])
-def get_current_user_profile(current_user: UserInDB = Depends(get_current_user)):
+async def get_current_user_profile(current_user: UserInDB = Depends(get_current_user_async)):
     return JSONResponse(content={
         "username": current_user.username,
         "email": current_user.email
-    })
\ No newline at end of file
+    })
@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+import re
+from typing import List, NamedTuple
+
+MIGRATIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'migrations'))
+
+# Serializes concurrent runners (several containers or gunicorn masters starting at once)
+ADVISORY_LOCK_ID = 7263001
+
+# First line of a migration that must run outside a transaction (CREATE INDEX CONCURRENTLY)
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+_FILENAME_RE = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+    sql: str
+    checksum: str
+
+    @property
+    def transactional(self) -> bool:
+        return not self.sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+
+def discover_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """Reads NNNN_name.sql files in version order; versions must be unique."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME_RE.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path) as f:
+            sql = f.read()
+        migrations.append(Migration(int(match.group(1)), match.group(2), path, sql,
+                                    hashlib.sha256(sql.encode()).hexdigest()))
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return sorted(migrations)
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Splits a no-transaction migration into statements (each needs its own
+    autocommit execute). Only full-line comments and a ';' at the end of a
+    line are understood, which is all these files use.
+    """
+    statements, current = [], []
+    for line in sql.splitlines():
+        if line.strip().startswith("--"):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statement = "\n".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def applied_migrations(cur) -> dict:
+    cur.execute("SELECT version, checksum FROM schema_migrations;")
+    return {version: checksum for version, checksum in cur.fetchall()}
+
+
+def migration_status(conn, directory: str = MIGRATIONS_DIR) -> List[dict]:
+    """One row per migration file: applied or pending, and whether the file changed since it was applied."""
+    with conn.cursor() as cur:
+        ensure_migrations_table(cur)
+        applied = applied_migrations(cur)
+    conn.commit()
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "applied": m.version in applied,
+            "modified_since_applied": m.version in applied and applied[m.version] != m.checksum,
+        }
+        for m in discover_migrations(directory)
+    ]
+
+
+def _apply(conn, migration: Migration):
+    if migration.transactional:
+        with conn.cursor() as cur:
+            cur.execute(migration.sql)
+            cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s);",
+                        (migration.version, migration.name, migration.checksum))
+        conn.commit()
+        return
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for statement in split_statements(migration.sql):
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s);",
+                        (migration.version, migration.name, migration.checksum))
+    finally:
+        conn.autocommit = False
+
+
+def migrate(conn, target: int = None, directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """
+    Applies every pending migration up to `target` (default: all) in version
+    order and returns the ones applied. Each migration commits on its own, so
+    a failure leaves the database at the last successful version. A session
+    advisory lock makes concurrent runners wait instead of racing.
+    """
+    applied_now = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s);", (ADVISORY_LOCK_ID,))
+    try:
+        with conn.cursor() as cur:
+            ensure_migrations_table(cur)
+            applied = applied_migrations(cur)
+        conn.commit()
+        for migration in discover_migrations(directory):
+            if target is not None and migration.version > target:
+                break
+            if migration.version in applied:
+                if applied[migration.version] != migration.checksum:
+                    logging.warning(f"Migration {migration.version:04d}_{migration.name} changed after it was applied")
+                continue
+            logging.info(f"Applying migration {migration.version:04d}_{migration.name}")
+            try:
+                _apply(conn, migration)
+            except Exception:
+                conn.rollback()
+                logging.error(f"Migration {migration.version:04d}_{migration.name} failed")
+                raise
+            applied_now.append(migration)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (ADVISORY_LOCK_ID,))
+        conn.commit()
+    return applied_now
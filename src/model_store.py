@@ -0,0 +1,178 @@
+import gc
+import logging
+import os
+import resource
+import threading
+import time
+
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+DEFAULT_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'model_cache'))
+
+# Which encoder grades answers: "torch" (sentence-transformers), or the ONNX
+# exports from scripts/export_onnx.py, "onnx" (fp32) and "onnx-int8".
+GRADER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_model = None
+_loaded_in_pid = None
+_load_lock = threading.Lock()
+_onnx_models = {}
+
+
+def get_cache_dir() -> str:
+    return os.environ.get('TRANSFORMERS_CACHE', DEFAULT_CACHE_DIR)
+
+
+def resolve_local_snapshot(cache_dir: str = None, model_name: str = MODEL_NAME):
+    """
+    Returns the path of the cached Hugging Face snapshot for `model_name`
+    (model_cache/models--<org>--<name>/snapshots/<revision>), or None when
+    the snapshot or its weights are not on disk.
+    """
+    cache_dir = cache_dir or get_cache_dir()
+    repo_dir = os.path.join(cache_dir, 'models--' + model_name.replace('/', '--'))
+    try:
+        with open(os.path.join(repo_dir, 'refs', 'main')) as f:
+            revision = f.read().strip()
+    except OSError:
+        return None
+    snapshot = os.path.join(repo_dir, 'snapshots', revision)
+    has_weights = any(
+        os.path.exists(os.path.join(snapshot, weights))  # follows the blob symlink
+        for weights in ('model.safetensors', 'pytorch_model.bin')
+    )
+    return snapshot if has_weights else None
+
+
+def get_grader_backend() -> str:
+    backend = os.getenv("GRADER_BACKEND", "torch")
+    if backend not in GRADER_BACKENDS:
+        raise ValueError(f"GRADER_BACKEND must be one of {GRADER_BACKENDS}, got '{backend}'")
+    return backend
+
+
+def get_onnx_dir() -> str:
+    return os.getenv("GRADER_ONNX_DIR", os.path.join(get_cache_dir(), 'onnx'))
+
+
+def memory_usage() -> dict:
+    """
+    Memory of the current process in MB. On Linux this comes from
+    /proc/self/smaps_rollup, which also splits out pages still shared
+    copy-on-write with the gunicorn master (e.g. preloaded model weights).
+    """
+    usage = {"pid": os.getpid()}
+    fields = {"Rss": "rss_mb", "Pss": "pss_mb", "Shared_Clean": "shared_clean_mb",
+              "Shared_Dirty": "shared_dirty_mb", "Private_Clean": "private_clean_mb",
+              "Private_Dirty": "private_dirty_mb"}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    usage[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        # Not Linux: only the peak RSS is available (kB on Linux, bytes on macOS)
+        usage["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return usage
+
+
+def get_similarity_model():
+    """
+    Returns the process-wide SentenceTransformer, loading it on first use.
+    The weights are read from the local model_cache snapshot when present, so
+    no network access is needed. When loaded in the gunicorn master (see
+    gunicorn.conf.py) every worker inherits the same copy-on-write pages.
+    """
+    global _model, _loaded_in_pid
+    if _model is not None:
+        return _model
+    with _load_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+
+            rss_before = memory_usage().get("rss_mb")
+            started = time.perf_counter()
+            snapshot = resolve_local_snapshot()
+            if snapshot:
+                model = SentenceTransformer(snapshot, device='cpu')
+            else:
+                logging.warning(f"No local snapshot of {MODEL_NAME} in {get_cache_dir()}, downloading it")
+                model = SentenceTransformer(MODEL_NAME, cache_folder=get_cache_dir(), device='cpu')
+            rss_after = memory_usage().get("rss_mb")
+            logging.info(
+                f"Loaded similarity model from {snapshot or MODEL_NAME} in {time.perf_counter() - started:.1f}s "
+                f"(pid {os.getpid()}, RSS {rss_before} MB -> {rss_after} MB)"
+            )
+            _model, _loaded_in_pid = model, os.getpid()
+    return _model
+
+
+def get_onnx_model(variant: str):
+    """
+    Returns the process-wide ONNX encoder for `variant` ("onnx" or "onnx-int8"),
+    creating the onnxruntime session on first use. Sessions are never created
+    in the gunicorn master: each worker builds its own after fork.
+    """
+    model = _onnx_models.get(variant)
+    if model is not None:
+        return model
+    with _load_lock:
+        if variant not in _onnx_models:
+            from .onnx_backend import OnnxSentenceEncoder
+
+            started = time.perf_counter()
+            threads = int(os.getenv("GRADER_ONNX_THREADS", "0"))
+            _onnx_models[variant] = OnnxSentenceEncoder(get_onnx_dir(), variant, intra_op_threads=threads)
+            logging.info(
+                f"Loaded {variant} similarity model from {get_onnx_dir()} in "
+                f"{time.perf_counter() - started:.1f}s (pid {os.getpid()})"
+            )
+    return _onnx_models[variant]
+
+
+def get_grading_model(backend: str = None):
+    """The encoder for the configured GRADER_BACKEND."""
+    backend = backend or get_grader_backend()
+    if backend == "torch":
+        return get_similarity_model()
+    return get_onnx_model(backend)
+
+
+def preload_for_fork():
+    """
+    Called in the gunicorn master before workers are forked. Loads the model
+    and moves everything allocated so far into the permanent GC generation,
+    so the collector in each worker never touches (and un-shares) those pages.
+    No inference is run here: thread pools started before fork() can deadlock
+    in the children.
+    """
+    if get_grader_backend() == "torch":
+        import torch
+
+        torch.set_grad_enabled(False)
+        get_similarity_model()
+    gc.collect()
+    gc.freeze()
+
+
+def model_info() -> dict:
+    return {
+        "model": MODEL_NAME,
+        "backend": get_grader_backend(),
+        "loaded": _model is not None or bool(_onnx_models),
+        "loaded_in_pid": _loaded_in_pid,
+        "shared_from_master": _loaded_in_pid is not None and _loaded_in_pid != os.getpid(),
+    }
+
+
+class SharedSimilarityModel:
+    """
+    Stand-in for the grading encoder that defers loading until the first
+    encode() call, so importing the app never pays for (or requires) the model.
+    """
+
+    def encode(self, *args, **kwargs):
+        return get_grading_model().encode(*args, **kwargs)
+
+
+similarity_model = SharedSimilarityModel()
@@ -0,0 +1,78 @@
+import json
+import os
+from typing import List
+
+import numpy as np
+
+# Files written by scripts/export_onnx.py into model_cache/onnx/
+ONNX_MODEL_FILES = {
+    "onnx": "model.onnx",
+    "onnx-int8": "model.int8.onnx",
+}
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Mean over the non-padding tokens (the all-MiniLM-L6-v2 pooling layer)."""
+    mask = attention_mask[..., np.newaxis].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.clip(norms, 1e-12, None)
+
+
+class OnnxSentenceEncoder:
+    """
+    CPU answer encoder that runs an exported ONNX graph of all-MiniLM-L6-v2
+    (fp32 or dynamically quantized int8) with onnxruntime, then applies the
+    same mean pooling and normalization as the sentence-transformers pipeline.
+    Exposes the subset of SentenceTransformer.encode() used by src.grading.
+    """
+
+    def __init__(self, model_dir: str, variant: str = "onnx", intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if variant not in ONNX_MODEL_FILES:
+            raise ValueError(f"Unknown ONNX variant '{variant}', expected one of {sorted(ONNX_MODEL_FILES)}")
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILES[variant])
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found, run scripts/export_onnx.py first")
+
+        with open(os.path.join(model_dir, "sentence_bert_config.json")) as f:
+            max_seq_length = json.load(f).get("max_seq_length", 256)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")  # pad to the longest in the batch
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.variant = variant
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_embeddings = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        return mean_pool(token_embeddings, feeds["attention_mask"])
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batches = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        embeddings = np.concatenate(batches).astype(np.float32)
+        if normalize_embeddings:
+            embeddings = l2_normalize(embeddings)
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from . import security
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the hashing queue is full or a hash did not finish in time."""
+
+
+def _timed(fn, *args):
+    """Runs in a pool process; returns fn's result and how long fn took there."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt (security.verify_password / get_password_hash) in a small
+    process pool instead of the request threads.
+    Features:
+    - At most `workers` hashes run at once; up to `max_queue` more may wait,
+      anything beyond that is rejected at once with PasswordHasherBusyError,
+      so a login rush cannot tie up the threads that serve questions
+    - A caller waits at most `timeout` seconds for its hash
+    - Queue depth and latency metrics (see `stats()`)
+    With workers=0 hashes run inline in the calling thread.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32, timeout: float = 10.0):
+        if workers < 0 or max_queue < 0:
+            raise ValueError("workers and max_queue must not be negative")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._pool = None
+        self._pool_pid = None
+        self._start_lock = threading.Lock()
+
+        # Statistics
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._max_queue_depth = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._queue_wait_total = 0.0
+        self._hash_time_total = 0.0
+        self._max_latency = 0.0
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        # Pool processes belong to the process that started them, so each gunicorn worker starts its own
+        if self._pool is not None and self._pool_pid == os.getpid():
+            return self._pool
+        with self._start_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # spawn: the children import src.security only, not the worker's model and threads
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pool_pid = os.getpid()
+        return self._pool
+
+    def _submit(self, fn, *args):
+        """Admits a hash (or rejects it when the queue is full) and hands it to the pool."""
+        with self._stats_lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordHasherBusyError(f"{self._in_flight} password hashes already running or queued")
+            self._in_flight += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._in_flight - self.workers)
+
+        started = time.perf_counter()
+        try:
+            pool = self._ensure_pool()
+            future = pool.submit(_timed, fn, *args)
+        except Exception as e:
+            self._release()
+            if isinstance(e, BrokenProcessPool):
+                self._reset_pool(pool)
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future, pool, started
+
+    def _run(self, fn, *args):
+        if self.workers == 0:
+            result, elapsed = _timed(fn, *args)
+            self._record(elapsed, elapsed)
+            return result
+
+        future, pool, started = self._submit(fn, *args)
+        try:
+            result, hash_seconds = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._timed_out()
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise
+        self._record(time.perf_counter() - started, hash_seconds)
+        return result
+
+    async def _run_async(self, fn, *args):
+        """_run for async endpoints: waits on the pool without holding a thread."""
+        if self.workers == 0:
+            return await asyncio.to_thread(self._run, fn, *args)
+
+        future, pool, started = self._submit(fn, *args)
+        try:
+            # Cancelling the wrapper on timeout cancels the pool future too
+            result, hash_seconds = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._timed_out()
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise
+        self._record(time.perf_counter() - started, hash_seconds)
+        return result
+
+    def _timed_out(self):
+        with self._stats_lock:
+            self._timeouts += 1
+        raise PasswordHasherBusyError(f"Password hash did not finish within {self.timeout}s")
+
+    def _release(self):
+        with self._stats_lock:
+            self._in_flight -= 1
+
+    def _reset_pool(self, pool):
+        logging.error("Password hashing pool broke, starting a new one on the next hash")
+        with self._start_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _record(self, latency: float, hash_seconds: float):
+        with self._stats_lock:
+            self._completed += 1
+            self._queue_wait_total += max(latency - hash_seconds, 0.0)
+            self._hash_time_total += hash_seconds
+            self._max_latency = max(self._max_latency, latency)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(security.verify_password, plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self._run(security.get_password_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(security.verify_password, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(security.get_password_hash, password)
+
+    def shutdown(self):
+        with self._start_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self.workers, 0),
+                "max_queue_depth": self._max_queue_depth,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_queue_wait_ms": round(self._queue_wait_total / self._completed * 1000, 3) if self._completed else 0.0,
+                "avg_hash_ms": round(self._hash_time_total / self._completed * 1000, 3) if self._completed else 0.0,
+                "max_latency_ms": round(self._max_latency * 1000, 3),
+            }
+
+
+def create_password_hasher_from_env() -> PasswordHasher:
+    """Builds the hasher using PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE and PASSWORD_HASH_TIMEOUT_SECONDS."""
+    return PasswordHasher(
+        workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+        max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32")),
+        timeout=float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "10")),
+    )
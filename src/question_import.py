@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+import logging
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .grading import embedding_to_bytes, encode_answers
+
+FORMATS = ("csv", "jsonl")
+# Rows validated, encoded and copied together
+DEFAULT_CHUNK_SIZE = 5000
+# Failed rows listed in the report (all are counted)
+DEFAULT_MAX_ERRORS = 100
+MAX_INT = 2 ** 31 - 1
+
+COPY_SQL = """
+    COPY questions (lesson_id, content, difficulty_level, correct_answer_text, answer_embedding)
+    FROM STDIN WITH (FORMAT csv)
+"""
+
+
+class ImportFormatError(ValueError):
+    """Raised when the input's format cannot be determined or is not supported."""
+
+
+def detect_format(filename: Optional[str], fmt: Optional[str] = None) -> str:
+    fmt = (fmt or (filename or "").rsplit(".", 1)[-1]).lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported import format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def iter_records(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yields (line number, record, parse error) from a CSV (with header) or JSONL text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "expected a JSON object"
+            continue
+        yield line_no, record, None
+
+
+def _as_int(value) -> Optional[int]:
+    """
+    The integer `value` stands for: ints, integral floats (JSON's 3.0) and
+    digit strings (CSV fields). Bools, fractions and anything else are None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    if isinstance(value, str):
+        text = value.strip()
+        digits = text[1:] if text[:1] in "+-" else text
+        return int(text) if digits.isascii() and digits.isdigit() else None
+    return None
+
+
+def validate_record(record: dict) -> Tuple[Optional[tuple], Optional[str]]:
+    """
+    (lesson_id, content, difficulty_level, correct_answer_text), or the
+    reason the record cannot be imported. The question text may be given
+    as question_text (as in the admin API) or content (as in the table).
+    """
+    lesson_id = _as_int(record.get("lesson_id"))
+    difficulty = _as_int(record.get("difficulty_level"))
+    if lesson_id is None or difficulty is None:
+        return None, "lesson_id and difficulty_level must be integers"
+    content = str(record.get("question_text") or record.get("content") or "").strip()
+    answer = str(record.get("correct_answer_text") or "").strip()
+    # Anything COPY would reject has to be caught here: one bad row aborts the whole COPY
+    if not 0 < lesson_id <= MAX_INT:
+        return None, "lesson_id must be a positive integer"
+    if not 1 <= difficulty <= 5:
+        return None, "difficulty_level must be between 1 and 5"
+    if not content:
+        return None, "question_text is empty"
+    if not answer:
+        return None, "correct_answer_text is empty"
+    if len(answer) > 255:
+        return None, "correct_answer_text is longer than 255 characters"
+    if "\x00" in content or "\x00" in answer:
+        return None, "text contains a NUL character"
+    return (lesson_id, content, difficulty, answer), None
+
+
+def _encode_chunk(encoder, answers: List[str], batch_size: int) -> dict:
+    """answer -> embedding bytes, encoding each distinct answer once."""
+    distinct = list(dict.fromkeys(answers))
+    embeddings = encode_answers(encoder, distinct, batch_size=batch_size)
+    return {answer: embedding_to_bytes(e) for answer, e in zip(distinct, embeddings)}
+
+
+def _copy_chunk(cur, rows: List[tuple], embeddings: Optional[dict]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for lesson_id, content, difficulty, answer in rows:
+        blob = embeddings.get(answer) if embeddings else None
+        # An unquoted empty field is NULL in COPY's CSV format
+        writer.writerow((lesson_id, content, difficulty, answer, "\\x" + blob.hex() if blob is not None else None))
+    buffer.seek(0)
+    cur.copy_expert(COPY_SQL, buffer)
+
+
+def import_questions(stream: Iterable[str], fmt: str, conn, encoder=None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, encode_batch_size: int = 256,
+                     max_errors: int = DEFAULT_MAX_ERRORS, strict: bool = False) -> dict:
+    """
+    Loads questions from a CSV/JSONL text stream into the questions table.
+    - The stream is read and validated `chunk_size` records at a time; each
+      chunk's answer embeddings are encoded in one batch (when an encoder is
+      given) and the chunk is sent with COPY, so memory is bounded by the chunk
+    - Everything is loaded in a single transaction on `conn`, committed at the
+      end. Invalid records are skipped and reported; with strict=True any
+      invalid record rolls the whole import back instead
+    - If encoding fails the chunk is loaded without embeddings (grading
+      computes them lazily, or run scripts/backfill_embeddings.py)
+    Returns the report: counts, the first `max_errors` failures, rows/sec.
+    """
+    started = time.perf_counter()
+    report = {"rows_read": 0, "rows_imported": 0, "rows_failed": 0, "embeddings_computed": 0,
+              "errors": [], "committed": False}
+
+    def fail(line_no: int, error: str):
+        report["rows_failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"line": line_no, "error": error})
+
+    def flush(chunk: List[tuple]):
+        embeddings = None
+        if encoder is not None:
+            try:
+                embeddings = _encode_chunk(encoder, [row[3] for row in chunk], encode_batch_size)
+                report["embeddings_computed"] += len(embeddings)
+            except Exception as e:
+                logging.warning(f"Encoding an import chunk failed, loading it without embeddings: {e}")
+        _copy_chunk(cur, chunk, embeddings)
+        report["rows_imported"] += len(chunk)
+
+    cur = conn.cursor()
+    try:
+        chunk = []
+        for line_no, record, error in iter_records(stream, fmt):
+            report["rows_read"] += 1
+            row = None
+            if error is None:
+                row, error = validate_record(record)
+            if error is not None:
+                fail(line_no, error)
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        if strict and report["rows_failed"]:
+            conn.rollback()
+            report["rows_imported"] = 0
+        else:
+            conn.commit()
+            report["committed"] = True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    elapsed = time.perf_counter() - started
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(report["rows_imported"] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
@@ -0,0 +1,205 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Collection, Dict, List, Optional, Tuple
+
+from .adaptive_engine import get_db_connection
+
+MAX_DIFFICULTY = 5
+# Random draws pick() makes before filtering a bucket for `exclude`
+PICK_ATTEMPTS = 4
+# One row, bumped by a trigger on every write to questions (migrations/0011_question_index_version.sql)
+VERSION_SQL = "SELECT version FROM question_index_version;"
+
+
+class QuestionIndex:
+    """
+    In-memory index of lesson -> difficulty -> [(question_id, content)], so
+    /next_question can pick a question without querying the database.
+
+    pick() keeps the semantics of adaptive_engine.select_question: a random
+    question at the highest difficulty <= the target. Buckets are plain lists
+    with a position map, so picks, inserts and removals are all O(1).
+
+    The admin endpoints update the index of the worker that served them
+    straight away. Every worker also polls the questions table's version
+    (QUESTION_INDEX_REFRESH_SECONDS) and reloads when it changed, so the
+    other workers serve a deleted or stale question for at most one poll
+    interval. A submit for a question deleted in that window gets a 404,
+    as it would for any deleted question.
+
+    Two locks:
+    - _lock guards the buckets for pick() and is never held across a query
+    - _write_lock serializes load() with upsert()/remove(), so a reload built
+      from a snapshot taken before an admin commit cannot swap in over that
+      commit's upsert (the upsert waits and is applied to the new buckets)
+    """
+
+    def __init__(self, refresh_seconds: float = 2.0):
+        self.refresh_seconds = refresh_seconds
+        self._lessons: Dict[int, Dict[int, List[Tuple[int, str]]]] = {}
+        self._positions: Dict[int, Tuple[int, int, int]] = {}  # id -> (lesson, difficulty, index in bucket)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._version = None
+        self._loaded_at = None
+        self._reloads = 0
+        self._picks = 0
+        self._refresher = None
+        self._refresher_pid = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def load(self, cur=None):
+        """(Re)builds the whole index from the questions table and swaps it in."""
+        conn = None
+        if cur is None:
+            conn = get_db_connection()
+            cur = conn.cursor()
+        try:
+            with self._write_lock:
+                return self._load_locked(cur)
+        finally:
+            if conn is not None:
+                cur.close()
+                conn.close()
+
+    def _load_locked(self, cur) -> int:
+        # The version is read first: a write committed in between is in the
+        # rows but not the version, which only costs one extra reload
+        cur.execute(VERSION_SQL)
+        version = cur.fetchone()[0]
+        cur.execute("SELECT id, lesson_id, difficulty_level, content FROM questions;")
+        rows = cur.fetchall()
+
+        lessons, positions = {}, {}
+        for question_id, lesson_id, difficulty, content in rows:
+            bucket = lessons.setdefault(lesson_id, {}).setdefault(difficulty, [])
+            positions[question_id] = (lesson_id, difficulty, len(bucket))
+            bucket.append((question_id, content))
+        with self._lock:
+            self._lessons, self._positions = lessons, positions
+            self._version = version
+            self._loaded_at = time.time()
+            self._reloads += 1
+        return len(positions)
+
+    def refresh(self, cur=None) -> bool:
+        """Reloads the index if the questions table changed since the last load; True if it did."""
+        conn = None
+        if cur is None:
+            conn = get_db_connection()
+            cur = conn.cursor()
+        try:
+            cur.execute(VERSION_SQL)
+            if self.loaded and cur.fetchone()[0] == self._version:
+                return False
+            with self._write_lock:
+                self._load_locked(cur)
+            return True
+        finally:
+            if conn is not None:
+                cur.close()
+                conn.close()
+
+    def pick(self, lesson_id: int, difficulty: int, exclude: Collection[int] = ()) -> Optional[Tuple[int, str, int]]:
+        """
+        Returns (question_id, content, difficulty) or None when the lesson has nothing <= difficulty.
+        Questions in `exclude` are avoided when the level has others (repeating
+        one beats dropping a level).
+        """
+        with self._lock:
+            self._picks += 1
+            levels = self._lessons.get(lesson_id)
+            if not levels:
+                return None
+            for level in range(min(difficulty, MAX_DIFFICULTY), 0, -1):
+                bucket = levels.get(level)
+                if bucket:
+                    if exclude:
+                        return self._pick_excluding(bucket, exclude) + (level,)
+                    question_id, content = random.choice(bucket)
+                    return question_id, content, level
+        return None
+
+    @staticmethod
+    def _pick_excluding(bucket: List[Tuple[int, str]], exclude: Collection[int]) -> Tuple[int, str]:
+        # A few rejected draws keep this O(1) under the lock; the O(bucket) copy
+        # is only for buckets that are mostly (or entirely) excluded
+        if len(bucket) > len(exclude):
+            for _ in range(PICK_ATTEMPTS):
+                entry = random.choice(bucket)
+                if entry[0] not in exclude:
+                    return entry
+        return random.choice([entry for entry in bucket if entry[0] not in exclude] or bucket)
+
+    def _remove_locked(self, question_id: int):
+        position = self._positions.pop(question_id, None)
+        if position is None:
+            return
+        lesson_id, difficulty, index = position
+        bucket = self._lessons[lesson_id][difficulty]
+        last = bucket.pop()
+        if index < len(bucket):
+            # Move the last entry into the hole instead of shifting the list
+            bucket[index] = last
+            self._positions[last[0]] = (lesson_id, difficulty, index)
+        if not bucket:
+            del self._lessons[lesson_id][difficulty]
+            if not self._lessons[lesson_id]:
+                del self._lessons[lesson_id]
+
+    def upsert(self, question_id: int, lesson_id: int, difficulty: int, content: str):
+        """Applies a committed insert or update to this worker's index."""
+        with self._write_lock, self._lock:
+            self._remove_locked(question_id)
+            bucket = self._lessons.setdefault(lesson_id, {}).setdefault(difficulty, [])
+            self._positions[question_id] = (lesson_id, difficulty, len(bucket))
+            bucket.append((question_id, content))
+
+    def remove(self, question_id: int):
+        """Applies a committed delete to this worker's index."""
+        with self._write_lock, self._lock:
+            self._remove_locked(question_id)
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"Question index refresh failed, keeping the previous one: {e}")
+
+    def start_refresher(self):
+        """Starts (once per process) the daemon thread that polls the version and reloads on change."""
+        if self.refresh_seconds <= 0:
+            return
+        if self._refresher is not None and self._refresher_pid == os.getpid() and self._refresher.is_alive():
+            return
+        self._refresher = threading.Thread(target=self._refresh_loop, name="question-index-refresh", daemon=True)
+        self._refresher_pid = os.getpid()
+        self._refresher.start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "loaded_at": self._loaded_at,
+                "version": self._version,
+                "refresh_seconds": self.refresh_seconds,
+                "reloads": self._reloads,
+                "picks": self._picks,
+                "lessons": len(self._lessons),
+                "questions": len(self._positions),
+                "questions_per_difficulty": {
+                    str(level): sum(len(levels.get(level, ())) for levels in self._lessons.values())
+                    for level in range(1, MAX_DIFFICULTY + 1)
+                },
+            }
+
+
+question_index = QuestionIndex(refresh_seconds=float(os.getenv("QUESTION_INDEX_REFRESH_SECONDS", "2")))
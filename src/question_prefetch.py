@@ -0,0 +1,185 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from . import security
+from .learning_models import LearnerState, enhanced_difficulty_selector
+
+# Answers planned ahead at most; a plan holds up to 2 + 4 + 8 questions
+MAX_DEPTH = 3
+CURSOR_TTL_MINUTES = float(os.getenv("PREFETCH_CURSOR_TTL_MINUTES", "60"))
+CURSOR_TYPE = "prefetch"
+
+# (question_id, difficulty the selector projected, difficulty of the question picked)
+PlanEntry = Tuple[int, int, int]
+# pick(difficulty, exclude) -> (question_id, question_text, difficulty_level) or None
+PickFn = Callable[[int, Collection[int]], Optional[Tuple[int, str, int]]]
+
+
+class InvalidCursorError(ValueError):
+    """The cursor is malformed, expired, or was issued for another learner or lesson."""
+
+
+class QuestionPlan:
+    """
+    Questions planned ahead for one learner in one lesson, keyed by outcome
+    path: "" is the question being answered, and each answer appends "c"
+    (correct) or "i" (incorrect), so "ci" is the question to ask after a
+    correct then an incorrect answer. `path` is where the learner is now.
+    The plan travels with the client as a signed cursor, so any worker can
+    continue it.
+    """
+
+    def __init__(self, user_id: int, lesson_id: int, depth: int, entries: Dict[str, PlanEntry], path: str = ""):
+        self.user_id = user_id
+        self.lesson_id = lesson_id
+        self.depth = depth
+        self.entries = entries
+        self.path = path
+
+    @property
+    def current(self) -> PlanEntry:
+        return self.entries[self.path]
+
+    def next_entry(self, was_correct: bool) -> Optional[PlanEntry]:
+        return self.entries.get(self.path + ("c" if was_correct else "i"))
+
+    def advanced(self, was_correct: bool) -> 'QuestionPlan':
+        return QuestionPlan(self.user_id, self.lesson_id, self.depth, self.entries,
+                            self.path + ("c" if was_correct else "i"))
+
+    def queue(self, texts: Dict[int, str]) -> List[dict]:
+        """The planned questions after the current one, shortest paths first."""
+        paths = sorted((p for p in self.entries if len(p) > len(self.path) and p.startswith(self.path)),
+                       key=lambda p: (len(p), p))
+        return [
+            {"path": path, "question_id": self.entries[path][0], "question_text": texts.get(self.entries[path][0]),
+             "difficulty_level": self.entries[path][2]}
+            for path in paths
+        ]
+
+    def to_cursor(self) -> str:
+        expire = datetime.now(timezone.utc) + timedelta(minutes=CURSOR_TTL_MINUTES)
+        payload = {
+            "typ": CURSOR_TYPE, "uid": self.user_id, "lid": self.lesson_id, "d": self.depth,
+            "p": self.path, "e": {path: list(entry) for path, entry in self.entries.items()}, "exp": expire,
+        }
+        return jwt.encode(payload, security.SECRET_KEY, algorithm=security.ALGORITHM)
+
+    @classmethod
+    def from_cursor(cls, cursor: str, user_id: int, lesson_id: int) -> 'QuestionPlan':
+        try:
+            payload = jwt.decode(cursor, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+        except JWTError as e:
+            raise InvalidCursorError(str(e))
+        if payload.get("typ") != CURSOR_TYPE or payload.get("uid") != user_id or payload.get("lid") != lesson_id:
+            raise InvalidCursorError("cursor was issued for another learner or lesson")
+        entries = {path: tuple(entry) for path, entry in payload["e"].items()}
+        if payload["p"] not in entries:
+            raise InvalidCursorError("cursor points outside its plan")
+        return cls(user_id, lesson_id, payload["d"], entries, payload["p"])
+
+
+class PrefetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.questions_planned = 0
+        self.cursor_submits = 0
+        self.kept = 0
+        self.replanned_stale = 0
+        self.replanned_exhausted = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "plans": self.plans,
+                "questions_planned": self.questions_planned,
+                "cursor_submits": self.cursor_submits,
+                "kept": self.kept,
+                "replanned_stale": self.replanned_stale,
+                "replanned_exhausted": self.replanned_exhausted,
+                "keep_rate": round(self.kept / self.cursor_submits, 4) if self.cursor_submits else 0.0,
+            }
+
+
+prefetch_stats = PrefetchStats()
+
+
+def plan_questions(user_id: int, lesson_id: int, root: PlanEntry, depth: int, pick: PickFn,
+                   user_state: LearnerState) -> Tuple[QuestionPlan, Dict[int, str]]:
+    """
+    Plans `depth` answers ahead of the `root` question the learner is about
+    to get, from `user_state` (a copy of the learner's state after that
+    question was selected, see get_learner_state): for each outcome path the
+    selector's projected difficulty, and a question at that difficulty not
+    already on the path. Returns the plan and the text of each planned question.
+    """
+    entries: Dict[str, PlanEntry] = {"": root}
+    texts: Dict[int, str] = {}
+    frontier = [("", user_state)]
+    for _ in range(depth):
+        next_frontier = []
+        for path, node_state in frontier:
+            outcomes = enhanced_difficulty_selector.project_outcomes(node_state, entries[path][2])
+            if outcomes is None:
+                continue
+            on_path = {entries[path[:length]][0] for length in range(len(path) + 1)}
+            for was_correct, (projected_state, difficulty) in outcomes.items():
+                picked = pick(difficulty, on_path)
+                if picked is None:
+                    continue
+                question_id, question_text, difficulty_level = picked
+                child = path + ("c" if was_correct else "i")
+                entries[child] = (question_id, difficulty, difficulty_level)
+                texts[question_id] = question_text
+                next_frontier.append((child, projected_state))
+        frontier = next_frontier
+    prefetch_stats.add(plans=1, questions_planned=len(entries) - 1)
+    return QuestionPlan(user_id, lesson_id, depth, entries), texts
+
+
+def follow_plan(plan: QuestionPlan, question_id: int, was_correct: bool, difficulty: int) -> Optional[dict]:
+    """
+    Called by submit_answer for a learner on a plan, with `difficulty` from
+    the selection step /next_question would have taken after this answer.
+    Returns the advanced cursor when that step landed on the planned
+    difficulty. Otherwise (the learner strayed from the projection,
+    exploration kicked in, or the plan ran out) the remaining entries are
+    stale and None is returned: the caller picks the real next question and
+    replans from it (see replan).
+    """
+    planned = plan.next_entry(was_correct) if plan.current[0] == question_id else None
+    if planned is not None and planned[1] == difficulty:
+        prefetch_stats.add(cursor_submits=1, kept=1)
+        return {"valid": True, "cursor": plan.advanced(was_correct).to_cursor()}
+    if planned is None and plan.current[0] == question_id:
+        prefetch_stats.add(cursor_submits=1, replanned_exhausted=1)
+    else:
+        prefetch_stats.add(cursor_submits=1, replanned_stale=1)
+    return None
+
+
+def replan(plan: QuestionPlan, picked: Optional[Tuple[int, str, int]], difficulty: int, pick: PickFn,
+           user_state: LearnerState) -> dict:
+    """The prefetch part of submit_answer's response when the plan went stale: the next question and a fresh plan."""
+    if picked is None:
+        return {"valid": False, "cursor": None, "queue": []}
+    next_id, next_text, next_level = picked
+    new_plan, texts = plan_questions(plan.user_id, plan.lesson_id, (next_id, difficulty, next_level), plan.depth, pick, user_state)
+    return {
+        "valid": False,
+        "difficulty_level": next_level,
+        "question_id": next_id,
+        "question_text": next_text,
+        "queue": new_plan.queue(texts),
+        "cursor": new_plan.to_cursor(),
+    }
@@ -0,0 +1,68 @@
+import psycopg2.extras
+
+from .adaptive_engine import get_db_connection
+
+
+class UnitOfWork:
+    """
+    A single database transaction shared by everything that runs for one request.
+    Features:
+    - The pooled connection is checked out lazily, on first use
+    - Helpers (bandit update, quests, achievements) share one DictCursor
+    - Nothing is committed until the endpoint calls commit(); anything left
+      uncommitted is rolled back when the unit of work is closed
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._cur = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = get_db_connection()
+        return self._conn
+
+    @property
+    def cursor(self):
+        if self._cur is None:
+            self._cur = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        return self._cur
+
+    def commit(self):
+        if self._conn is not None:
+            self._conn.commit()
+
+    def rollback(self):
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def close(self):
+        """Releases the cursor and hands the connection back to the pool."""
+        if self._cur is not None:
+            self._cur.close()
+            self._cur = None
+        if self._conn is not None:
+            self._conn.rollback()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def get_unit_of_work():
+    """
+    FastAPI dependency yielding the request's UnitOfWork.
+    FastAPI caches dependencies per request, so get_current_user and the
+    endpoint itself receive the same instance (and the same connection).
+    """
+    uow = UnitOfWork()
+    try:
+        yield uow
+    finally:
+        uow.close()
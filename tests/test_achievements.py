@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.achievements import AWARD_SQL, BACKFILL_AWARDS_SQL, CATALOG_SQL, COUNTERS, AchievementCatalog
+from src.migrations import discover_migrations, split_statements
+
+ROWS = [
+    {'id': 1, 'name': 'First Correct Answer', 'criteria_type': 'CORRECT_ANSWERS_TOTAL', 'criteria_value': 1, 'xp_reward': 10},
+    {'id': 2, 'name': 'Curious Learner', 'criteria_type': 'ANSWERS_TOTAL', 'criteria_value': 10, 'xp_reward': 15},
+    {'id': 3, 'name': 'Knowledge Seeker', 'criteria_type': 'CORRECT_ANSWERS_TOTAL', 'criteria_value': 10, 'xp_reward': 25},
+    {'id': 4, 'name': 'On Fire!', 'criteria_type': 'STREAK', 'criteria_value': 3, 'xp_reward': 50},
+    {'id': 5, 'name': 'Scholar', 'criteria_type': 'ANSWERS_TOTAL', 'criteria_value': 100, 'xp_reward': 100},
+    {'id': 6, 'name': 'Legacy', 'criteria_type': 'LESSONS_COMPLETED', 'criteria_value': 1, 'xp_reward': 5},
+]
+
+
+def catalog_uow(awarded=()):
+    uow = MagicMock()
+
+    async def fetch(sql, params=()):
+        if sql == CATALOG_SQL:
+            return ROWS
+        return [{'achievement_id': a} for a in awarded]
+
+    uow.fetch = AsyncMock(side_effect=fetch)
+    return uow
+
+
+class TestAchievementCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = AchievementCatalog()
+        self.catalog.load(ROWS)
+
+    def test_only_crossed_thresholds_are_candidates(self):
+        ids = lambda found: [a.id for a in found]
+        self.assertEqual(ids(self.catalog.crossed('ANSWERS_TOTAL', 9, 10)), [2])
+        self.assertEqual(ids(self.catalog.crossed('ANSWERS_TOTAL', 10, 11)), [])
+        self.assertEqual(ids(self.catalog.crossed('ANSWERS_TOTAL', 0, 500)), [2, 5])
+        self.assertEqual(ids(self.catalog.crossed('CORRECT_ANSWERS_TOTAL', 0, 1)), [1])
+        # A counter that did not move (wrong answer) or went down (lost streak) crosses nothing
+        self.assertEqual(ids(self.catalog.crossed('CORRECT_ANSWERS_TOTAL', 1, 1)), [])
+        self.assertEqual(ids(self.catalog.crossed('STREAK', 5, 1)), [])
+
+    def test_unknown_criteria_types_are_ignored(self):
+        self.assertEqual(self.catalog.crossed('LESSONS_COMPLETED', 0, 1), [])
+        self.assertNotIn('LESSONS_COMPLETED', self.catalog.stats()['achievements'])
+
+
+class TestAwardAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_no_crossing_costs_no_award_query(self):
+        catalog, uow = AchievementCatalog(), catalog_uow()
+        xp = await catalog.award_async(1, {'ANSWERS_TOTAL': (3, 4), 'CORRECT_ANSWERS_TOTAL': (2, 2)}, uow)
+        self.assertEqual(xp, 0)
+        # Only the catalog load, once per refresh interval
+        uow.fetch.assert_awaited_once_with(CATALOG_SQL)
+        await catalog.award_async(1, {'ANSWERS_TOTAL': (4, 5)}, uow)
+        uow.fetch.assert_awaited_once()
+
+    async def test_crossings_are_awarded_in_one_statement(self):
+        catalog, uow = AchievementCatalog(), catalog_uow(awarded=[2, 3])
+        xp = await catalog.award_async(7, {'ANSWERS_TOTAL': (9, 10), 'CORRECT_ANSWERS_TOTAL': (9, 10)}, uow)
+        self.assertEqual(xp, 15 + 25)
+        uow.fetch.assert_awaited_with(AWARD_SQL, (7, [2, 3], 7))
+        self.assertEqual(catalog.stats()['awarded'], 2)
+
+    async def test_already_held_achievements_earn_nothing(self):
+        catalog, uow = AchievementCatalog(), catalog_uow(awarded=[])
+        self.assertEqual(await catalog.award_async(7, {'STREAK': (2, 3)}, uow), 0)
+        stats = catalog.stats()
+        self.assertEqual((stats['candidates'], stats['awarded']), (1, 0))
+
+
+class TestBackfillAwards(unittest.TestCase):
+    def test_every_counter_is_compared_with_at_least(self):
+        for criteria_type, column in COUNTERS.items():
+            self.assertIn(f"WHEN '{criteria_type}' THEN u.{column}", BACKFILL_AWARDS_SQL)
+        self.assertIn("a.criteria_value <= CASE", BACKFILL_AWARDS_SQL)
+        self.assertIn("ON CONFLICT (user_id, achievement_id) DO NOTHING", BACKFILL_AWARDS_SQL)
+
+    def test_migration_runs_the_backfill(self):
+        migration = next(m for m in discover_migrations() if m.version == 10)
+        self.assertTrue(migration.transactional)
+        normalize = lambda sql: " ".join(sql.split()).rstrip(";")
+        self.assertEqual([normalize(s) for s in split_statements(migration.sql)], [normalize(BACKFILL_AWARDS_SQL)])
+
+
+if __name__ == '__main__':
+    unittest.main()
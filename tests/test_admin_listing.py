@@ -0,0 +1,67 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pydantic import BaseModel
+
+from src import admin_listing
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+
+
+class TestListingQueries(unittest.TestCase):
+    def test_users_filters_and_keyset(self):
+        sql, params = admin_listing.users_query(username_prefix="an_", cursor=40, limit=20)
+        self.assertIn("WHERE username LIKE %s AND id > %s ORDER BY id ASC LIMIT %s", sql)
+        self.assertEqual(params, ("an\\_%", 40, 20))
+
+    def test_questions_filters_and_keyset(self):
+        sql, params = admin_listing.questions_query(lesson_id=3, difficulty=2, cursor=100, limit=50)
+        self.assertIn("WHERE lesson_id = %s AND difficulty_level = %s AND id < %s ORDER BY id DESC LIMIT %s", sql)
+        self.assertEqual(params, (3, 2, 100, 50))
+
+    def test_unfiltered_listing_has_no_limit(self):
+        sql, params = admin_listing.questions_query()
+        self.assertNotIn("WHERE", sql)
+        self.assertNotIn("LIMIT", sql)
+        self.assertEqual(params, ())
+
+    def test_next_cursor_only_when_the_page_is_full(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [{'id': 1}, {'id': 2}]
+        self.assertEqual(admin_listing.fetch_page(cur, "SQL", (), 2)[1], 2)
+        self.assertIsNone(admin_listing.fetch_page(cur, "SQL", (), 3)[1])
+
+
+class TestStreamJsonArray(unittest.TestCase):
+    def stream(self, rows, batch_size):
+        uow = MagicMock()
+        uow.__enter__.return_value = uow
+        cur = uow.conn.cursor.return_value
+        cur.__iter__.return_value = iter(rows)
+        with patch('src.admin_listing.UnitOfWork', return_value=uow):
+            chunks = list(admin_listing.stream_json_array("SQL", (), Row, batch_size=batch_size))
+        return chunks, uow, cur
+
+    def test_streams_a_json_array_in_batches(self):
+        rows = [{'id': i, 'name': f"row {i}"} for i in range(5)]
+        chunks, uow, cur = self.stream(rows, batch_size=2)
+        self.assertEqual(json.loads("".join(chunks)), rows)
+        # "[", two full batches, then the rest with "]"
+        self.assertEqual(len(chunks), 4)
+        # A named (server-side) cursor, fetching batch_size rows per round trip
+        self.assertEqual(uow.conn.cursor.call_args.kwargs['name'], "admin_listing")
+        self.assertEqual(cur.itersize, 2)
+        cur.close.assert_called_once()
+        uow.__exit__.assert_called_once()
+
+    def test_empty_listing(self):
+        chunks, _, _ = self.stream([], batch_size=10)
+        self.assertEqual(json.loads("".join(chunks)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
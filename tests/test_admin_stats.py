@@ -0,0 +1,76 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.admin_stats import DashboardStats, load_dashboard
+
+
+class TestLoadDashboard(unittest.TestCase):
+    def test_maps_counter_rows(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = [
+            {'name': 'users', 'value': 3}, {'name': 'answers', 'value': 120}, {'name': 'questions', 'value': 5},
+            {'name': 'questions_difficulty_2', 'value': 2}, {'name': 'questions_difficulty_1', 'value': 3},
+            {'name': 'questions_difficulty_4', 'value': 0},
+        ]
+        self.assertEqual(load_dashboard(cur), {
+            "total_users": 3, "total_questions": 5, "total_answers_submitted": 120,
+            "questions_by_difficulty": {"1": 3, "2": 2},
+        })
+
+    def test_empty_counters(self):
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+        self.assertEqual(load_dashboard(cur)["total_answers_submitted"], 0)
+
+
+class TestDashboardStats(unittest.TestCase):
+    def test_snapshot_is_reused_until_it_is_too_old(self):
+        stats = DashboardStats(max_age=5)
+        compute = MagicMock(return_value={"total_users": 1})
+        with patch('src.admin_stats.time.time', return_value=1000.0):
+            first = stats.get(compute)
+        with patch('src.admin_stats.time.time', return_value=1003.0):
+            second = stats.get(compute)
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual((first["age_seconds"], second["age_seconds"]), (0.0, 3.0))
+        self.assertEqual(first["as_of"], second["as_of"])
+        with patch('src.admin_stats.time.time', return_value=1006.0):
+            stats.get(compute)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_concurrent_requests_share_one_computation(self):
+        stats = DashboardStats(max_age=0)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"total_users": len(calls)}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(stats.get(compute)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(stats.get(compute))) for _ in range(4)]
+        for thread in followers:
+            thread.start()
+        while stats.stats()["coalesced"] < 4:
+            release.wait(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r["total_users"] for r in results], [1] * 5)
+
+    def test_failure_is_raised_and_not_cached(self):
+        stats = DashboardStats(max_age=60)
+        with self.assertRaises(RuntimeError):
+            stats.get(MagicMock(side_effect=RuntimeError("db down")))
+        self.assertEqual(stats.get(lambda: {"total_users": 2})["total_users"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import csv
+import gzip
+import io
+import json
+import unittest
+from datetime import date, datetime, timezone
+
+from src import analytics_export
+
+
+class FakeTable:
+    """A RunQuery over in-memory rows that honours the keyset and LIMIT parameters."""
+
+    def __init__(self, columns, rows, key_length=1, seek=None):
+        self.columns, self.rows, self.key_length, self.seek = columns, rows, key_length, seek
+        self.queries = []
+
+    def __call__(self, sql, params):
+        self.queries.append((sql, params))
+        if sql.startswith("SELECT MIN"):
+            return ["min"], [(self.seek,)]
+        limit = params[-1]
+        after = tuple(params[-1 - self.key_length:-1]) if " > " in sql else None
+        rows = [row for row in self.rows if after is None or tuple(row[:self.key_length]) > after]
+        return self.columns, rows[:limit]
+
+
+class TestExportQuery(unittest.TestCase):
+    def test_filters(self):
+        since = datetime(2025, 1, 1)
+        query = analytics_export.export_query("progress", since=since, lesson_id=3)
+        self.assertEqual(query.where, ("p.answered_at >= %s", "q.lesson_id = %s"))
+        # Naive times are taken as UTC
+        self.assertEqual(query.params, (since.replace(tzinfo=timezone.utc), 3))
+
+    def test_rejects_filters_a_dataset_cannot_apply(self):
+        for args in (("bandit", datetime(2025, 1, 1)), ("quests", None, None, 1), ("nope",),
+                     ("progress", datetime(2025, 2, 1), datetime(2025, 1, 1, tzinfo=timezone.utc))):
+            with self.assertRaises(ValueError):
+                analytics_export.export_query(*args)
+
+
+class TestIterBatches(unittest.TestCase):
+    def test_walks_the_table_by_keyset(self):
+        table = FakeTable(["id", "x"], [(i, i * 10) for i in range(1, 8)])
+        batches = list(analytics_export.iter_batches(table, analytics_export.export_query("progress"), batch_size=3))
+        self.assertEqual([[row[0] for row in rows] for _, rows in batches], [[1, 2, 3], [4, 5, 6], [7]])
+        self.assertTrue(all(sql.rstrip(";").endswith("ORDER BY p.id LIMIT %s") for sql, _ in table.queries))
+        self.assertEqual(table.queries[1][1], (3, 3))
+
+    def test_composite_key(self):
+        rows = [(1, 1, 1, 5, 2), (1, 1, 2, 3, 1), (2, 1, 1, 1, 0)]
+        table = FakeTable(["user_id", "lesson_id", "difficulty_level", "times_selected", "successful_outcomes"], rows, key_length=3)
+        batches = list(analytics_export.iter_batches(table, analytics_export.export_query("bandit", lesson_id=1), batch_size=2))
+        self.assertEqual(sum(len(rows) for _, rows in batches), 3)
+        sql, params = table.queries[1]
+        self.assertIn("lesson_id = %s AND (user_id, lesson_id, difficulty_level) > (%s, %s, %s)", sql)
+        self.assertEqual(params, (1, 1, 1, 2, 2))
+
+    def test_time_range_starts_at_the_seek_position(self):
+        table = FakeTable(["id"], [(i,) for i in range(1, 6)], seek=3)
+        query = analytics_export.export_query("progress", since=datetime(2025, 1, 1))
+        batches = list(analytics_export.iter_batches(table, query, batch_size=10))
+        self.assertEqual([row[0] for row in batches[0][1]], [4, 5])
+
+    def test_nothing_after_since(self):
+        table = FakeTable(["id"], [(1,)], seek=None)
+        query = analytics_export.export_query("progress", since=datetime(2025, 1, 1))
+        self.assertEqual(list(analytics_export.iter_batches(table, query)), [])
+        self.assertEqual(len(table.queries), 1)
+
+
+class TestEncodeBatches(unittest.TestCase):
+    batches = [(["id", "day", "ok"], [(1, date(2025, 1, 2), True), (2, date(2025, 1, 3), False)]),
+               (["id", "day", "ok"], [(3, date(2025, 1, 4), True)])]
+
+    def encode(self, fmt):
+        return "".join(analytics_export.encode_batches(iter(self.batches), fmt))
+
+    def test_ndjson(self):
+        lines = [json.loads(line) for line in self.encode("ndjson").splitlines()]
+        self.assertEqual(lines[0], {"id": 1, "day": "2025-01-02", "ok": True})
+        self.assertEqual(len(lines), 3)
+
+    def test_csv_has_one_header(self):
+        rows = list(csv.reader(io.StringIO(self.encode("csv"))))
+        self.assertEqual(rows[0], ["id", "day", "ok"])
+        self.assertEqual([row[0] for row in rows[1:]], ["1", "2", "3"])
+
+    def test_columnar_batches(self):
+        first = json.loads(self.encode("columnar").splitlines()[0])
+        self.assertEqual(first, {"num_rows": 2, "columns": {"id": [1, 2], "day": ["2025-01-02", "2025-01-03"], "ok": [True, False]}})
+
+    def test_gzip_stream_round_trips(self):
+        data = b"".join(analytics_export.gzip_stream(analytics_export.encode_batches(iter(self.batches), "ndjson")))
+        self.assertEqual(gzip.decompress(data).decode(), self.encode("ndjson"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import socket
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.async_db import AsyncPool, AsyncUnitOfWork, get_async_unit_of_work, rowcount, to_asyncpg_sql
+from src.db_pool import PoolTimeoutError
+from src.learner_state import MemoryStateStore
+from src.learning_models import EnhancedAdaptiveDifficultySelector
+from src.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+
+def fake_pool():
+    conn = MagicMock()
+    for method in ('execute', 'executemany', 'fetch', 'fetchrow', 'fetchval'):
+        setattr(conn, method, AsyncMock())
+    tx = conn.transaction.return_value
+    tx.start, tx.commit, tx.rollback = AsyncMock(), AsyncMock(), AsyncMock()
+    pool = MagicMock()
+    pool.acquire = AsyncMock(return_value=conn)
+    pool.release = AsyncMock()
+    return pool, conn, tx
+
+
+class TestSqlTranslation(unittest.TestCase):
+    def test_placeholders_are_numbered_in_order(self):
+        self.assertEqual(
+            to_asyncpg_sql("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s"),
+            "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2",
+        )
+        self.assertEqual(to_asyncpg_sql("SELECT 1"), "SELECT 1")
+
+    def test_rowcount_from_command_status(self):
+        self.assertEqual(rowcount("UPDATE 3"), 3)
+        self.assertEqual(rowcount("INSERT 0 1"), 1)
+        self.assertEqual(rowcount("CREATE TABLE"), 0)
+        self.assertEqual(rowcount(""), 0)
+
+
+class TestAsyncUnitOfWork(unittest.IsolatedAsyncioTestCase):
+    async def test_connection_is_checked_out_lazily(self):
+        pool, _, _ = fake_pool()
+        await AsyncUnitOfWork(pool).close()
+        pool.acquire.assert_not_called()
+        pool.release.assert_not_called()
+
+    async def test_statements_share_one_transaction_until_commit(self):
+        pool, conn, tx = fake_pool()
+        async with AsyncUnitOfWork(pool) as uow:
+            await uow.execute("UPDATE users SET xp = xp + %s WHERE id = %s", (10, 1))
+            await uow.fetchrow("SELECT xp FROM users WHERE id = %s", (1,))
+            await uow.commit()
+            await uow.fetchval("SELECT 1")
+        pool.acquire.assert_awaited_once()
+        conn.execute.assert_awaited_once_with("UPDATE users SET xp = xp + $1 WHERE id = $2", 10, 1)
+        # One transaction up to commit(), a new one for the statement after it
+        self.assertEqual(tx.start.await_count, 2)
+        tx.commit.assert_awaited_once()
+        # ... which is rolled back on close, before the connection goes back
+        tx.rollback.assert_awaited_once()
+        pool.release.assert_awaited_once_with(conn)
+
+    async def test_dependency_rolls_back_and_releases_on_error(self):
+        pool, conn, tx = fake_pool()
+        with patch('src.async_db.async_pool', pool):
+            dependency = get_async_unit_of_work()
+            uow = await dependency.__anext__()
+            await uow.execute("SELECT 1")
+            with self.assertRaises(RuntimeError):
+                await dependency.athrow(RuntimeError("endpoint failed"))
+        tx.commit.assert_not_called()
+        tx.rollback.assert_awaited_once()
+        pool.release.assert_awaited_once_with(conn)
+
+    async def test_checkout_timeout_raises_pool_timeout(self):
+        pool = AsyncPool(max_size=1, timeout=0.01)
+        asyncpg_pool = MagicMock()
+        asyncpg_pool.acquire = AsyncMock(side_effect=asyncio.TimeoutError)
+        pool.get_pool = AsyncMock(return_value=asyncpg_pool)
+        with self.assertRaises(PoolTimeoutError):
+            await pool.acquire()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    async def test_pool_of_a_previous_loop_is_closed(self):
+        pool = AsyncPool(dsn="postgresql://test")
+        old_loop = asyncio.new_event_loop()
+        self.addCleanup(old_loop.close)
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        holder = MagicMock()
+        holder._con._transport.get_extra_info.return_value = client
+        stale = MagicMock(_holders=[holder])
+        pool._pool, pool._loop = stale, old_loop
+        with patch('src.async_db.asyncpg.create_pool', AsyncMock(return_value="new pool")):
+            self.assertEqual(await pool.get_pool(), "new pool")
+        # That loop cannot run terminate(): the socket is shut down, so the server sees EOF
+        server.settimeout(5)
+        self.assertEqual(server.recv(1), b"")
+        self.assertNotEqual(client.fileno(), -1)
+
+    async def test_pool_of_a_running_loop_is_closed_on_that_loop(self):
+        pool = AsyncPool(dsn="postgresql://test")
+        old_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=old_loop.run_forever)
+        thread.start()
+        closed_on = Future()
+
+        async def close():
+            closed_on.set_result(asyncio.get_running_loop())
+
+        stale = MagicMock()
+        stale.close = close
+        pool._pool, pool._loop = stale, old_loop
+        with patch('src.async_db.asyncpg.create_pool', AsyncMock(return_value="new pool")):
+            await pool.get_pool()
+        self.assertIs(closed_on.result(timeout=5), old_loop)
+        stale.terminate.assert_not_called()
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join(5)
+        old_loop.close()
+
+
+class TestAsyncSelector(unittest.IsolatedAsyncioTestCase):
+    async def test_async_selection_matches_the_sync_path(self):
+        answers = [(3, True), (3, True), (3, True), (4, False), (4, True), (4, True), (5, False), (4, False)]
+        sync_selector, async_selector = EnhancedAdaptiveDifficultySelector(), EnhancedAdaptiveDifficultySelector()
+        for selector in (sync_selector, async_selector):
+            selector.user_states = MemoryStateStore()
+            selector.validate_windows = False
+        uow = MagicMock()
+        uow.fetch, uow.execute = AsyncMock(return_value=[]), AsyncMock()
+
+        with patch('src.learning_models.get_db_connection') as get_db_connection, \
+                patch('src.learning_models.random.random', return_value=0.99):
+            get_db_connection.return_value.cursor.return_value.fetchall.return_value = []
+            for difficulty, was_correct in answers:
+                sync_selector.update_bandit_state_enhanced(1, 1, difficulty, was_correct)
+                await async_selector.update_bandit_state_async(1, 1, difficulty, was_correct, uow)
+                self.assertEqual(
+                    await async_selector.select_difficulty_async(1, 1, uow),
+                    sync_selector.select_difficulty_ultra_responsive(1, 1),
+                )
+        self.assertEqual(uow.execute.await_count, len(answers))
+
+
+class TestAsyncPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    async def test_inline_verify_async(self):
+        hasher = PasswordHasher(workers=0)
+        hashed = await hasher.hash_async("a_strong_password")
+        self.assertTrue(await hasher.verify_async("a_strong_password", hashed))
+        self.assertFalse(await hasher.verify_async("wrong", hashed))
+
+    async def test_timeout_frees_the_slot(self):
+        hasher = PasswordHasher(workers=1, max_queue=0, timeout=0.01)
+        pool = MagicMock()
+        pool.submit.side_effect = lambda fn, *args: Future()
+        hasher._ensure_pool = lambda: pool
+        with self.assertRaises(PasswordHasherBusyError):
+            await hasher.verify_async("slow", "hash")
+        stats = hasher.stats()
+        self.assertEqual((stats["timeouts"], stats["in_flight"]), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
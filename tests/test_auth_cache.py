@@ -0,0 +1,83 @@
+import time
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from jose import JWTError, jwt
+
+from src import security
+from src.auth_cache import AuthCache
+
+
+def user_cursor(row):
+    cur = MagicMock()
+    cur.fetchone.return_value = row
+    return cur
+
+
+class TestAuthCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = AuthCache(max_entries=10, user_ttl=30)
+        self.row = {'id': 1, 'username': 'ana', 'email': 'ana@example.com', 'xp': 10, 'is_admin': False}
+
+    def test_claims_are_memoized(self):
+        token = security.create_access_token({"sub": "ana"}, timedelta(minutes=5))
+        with patch('src.auth_cache.jwt.decode', wraps=jwt.decode) as decode:
+            self.assertEqual(self.cache.decode(token)["sub"], "ana")
+            self.assertEqual(self.cache.decode(token)["sub"], "ana")
+        decode.assert_called_once()
+
+    def test_invalid_and_expired_tokens_are_rejected_and_not_cached(self):
+        forged = jwt.encode({"sub": "ana", "exp": time.time() + 60}, "not-the-secret", algorithm=security.ALGORITHM)
+        for _ in range(2):
+            with self.assertRaises(JWTError):
+                self.cache.decode(forged)
+        expired = security.create_access_token({"sub": "ana"}, timedelta(seconds=-1))
+        with self.assertRaises(JWTError):
+            self.cache.decode(expired)
+        self.assertEqual(len(self.cache.claims), 0)
+
+    def test_memoized_claims_expire_with_the_token(self):
+        token = security.create_access_token({"sub": "ana"}, timedelta(minutes=5))
+        self.cache.decode(token)
+        # Past the token's exp the memoized claims are not used; jwt.decode checks it again
+        with patch('src.auth_cache.time.time', return_value=time.time() + 600), \
+                patch('src.auth_cache.jwt.decode', side_effect=JWTError("Signature has expired.")) as decode:
+            with self.assertRaises(JWTError):
+                self.cache.decode(token)
+        decode.assert_called_once()
+
+    def test_user_row_is_cached_per_subject(self):
+        cur = user_cursor(self.row)
+        self.assertEqual(self.cache.get_user('ana', cur), self.row)
+        self.assertEqual(self.cache.get_user('ana', cur), self.row)
+        cur.execute.assert_called_once()
+        self.assertEqual(self.cache.stats()['db_lookups'], 1)
+
+    def test_unknown_users_are_not_cached(self):
+        cur = user_cursor(None)
+        self.assertIsNone(self.cache.get_user('ghost', cur))
+        self.assertIsNone(self.cache.get_user('ghost', cur))
+        self.assertEqual(cur.execute.call_count, 2)
+
+    def test_invalidate_and_xp_updates(self):
+        cur = user_cursor(dict(self.row))
+        self.cache.get_user('ana', cur)
+        self.cache.add_xp('ana', 15)
+        self.assertEqual(self.cache.get_user('ana', cur)['xp'], 25)
+        self.cache.invalidate('ana')
+        self.assertEqual(self.cache.get_user('ana', cur)['xp'], 10)
+        self.assertEqual(cur.execute.call_count, 2)
+
+    def test_zero_ttl_disables_the_user_cache(self):
+        cache = AuthCache(user_ttl=None)
+        cur = user_cursor(self.row)
+        cache.get_user('ana', cur)
+        cache.get_user('ana', cur)
+        cache.add_xp('ana', 5)
+        self.assertEqual(cur.execute.call_count, 2)
+        self.assertIsNone(cache.stats()['users'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from src.learner_state import MemoryStateStore
+from src.learning_models import EnhancedAdaptiveDifficultySelector
+
+
+class FakeProgressCursor:
+    """Answers the scalar window query and the batch query from {(user, lesson): [(is_correct, difficulty), ...]} (oldest first)."""
+
+    def __init__(self, history):
+        self.history = history
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        if "unnest" in sql:
+            user_ids, lesson_ids, limit = params
+            self._rows = [
+                (idx, is_correct, difficulty)
+                for idx, key in enumerate(zip(user_ids, lesson_ids), start=1)
+                for is_correct, difficulty in reversed(self.history.get(key, [])[-limit:])
+            ]
+        else:
+            _, _, user_id, lesson_id, limit = params
+            attempts = self.history.get((user_id, lesson_id), [])
+            self._rows = [
+                {'is_correct': is_correct, 'difficulty_level': difficulty, 'answered_at': None,
+                 'response_time': None, 'answers_total': len(attempts)}
+                for is_correct, difficulty in reversed(attempts[-limit:])
+            ]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class TestBatchSelection(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(11)
+        self.keys = [(user_id, 1 + user_id % 3) for user_id in range(1, 301)]
+        self.history = {key: [] for key in self.keys}
+        self.rng = rng
+        self.cursor = FakeProgressCursor(self.history)
+        conn = MagicMock()
+        conn.cursor.return_value = self.cursor
+        patcher = patch('src.learning_models.get_db_connection', return_value=conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def new_selector(self):
+        selector = EnhancedAdaptiveDifficultySelector()
+        selector.user_states = MemoryStateStore()
+        return selector
+
+    def answer_round(self):
+        for key in self.keys:
+            skill = (key[0] % 10) / 10
+            for _ in range(self.rng.randint(0, 3)):
+                self.history[key].append((self.rng.random() < skill, self.rng.randint(1, 5)))
+
+    def test_same_decisions_and_state_as_the_scalar_path(self):
+        scalar, batch = self.new_selector(), self.new_selector()
+        user_ids = np.array([key[0] for key in self.keys])
+        lesson_ids = np.array([key[1] for key in self.keys])
+        for round_number in range(8):
+            self.answer_round()
+            for key in self.keys:
+                if key in scalar.user_states:
+                    scalar.user_states[key].performance_window = None  # history changed behind the selector's back
+
+            random.seed(round_number)
+            expected = [scalar.select_difficulty_ultra_responsive(*key) for key in self.keys]
+            random.seed(round_number)
+            actual = batch.select_difficulties_batch(user_ids, lesson_ids)
+
+            np.testing.assert_array_equal(actual, expected)
+            for key in self.keys:
+                a, b = scalar.user_states[key], batch.user_states[key]
+                self.assertEqual(
+                    (a.current_difficulty, a.learning_momentum, a.exploration_debt, list(a.confidence_scores),
+                     a.streak_counter, a.struggle_counter, [change[::2] for change in a.difficulty_history]),
+                    (b.current_difficulty, b.learning_momentum, b.exploration_debt, list(b.confidence_scores),
+                     b.streak_counter, b.struggle_counter, [change[::2] for change in b.difficulty_history]),
+                    msg=f"round {round_number}, learner {key}"
+                )
+
+    def test_one_query_for_all_learners(self):
+        self.answer_round()
+        self.new_selector().select_difficulties_batch([key[0] for key in self.keys], [key[1] for key in self.keys])
+        self.assertEqual(len(self.cursor.executed), 1)
+
+    def test_rejects_duplicate_pairs(self):
+        with self.assertRaises(ValueError):
+            self.new_selector().select_difficulties_batch([1, 1], [2, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+
+from src.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'b' is now the oldest
+        cache.set('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_hit_and_miss_counters(self):
+        cache = LRUCache(max_size=10)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('missing')
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    @patch('src.cache.time.monotonic')
+    def test_entries_expire_after_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = LRUCache(max_size=10, ttl=5)
+        cache.set('a', 1)
+        mock_monotonic.return_value = 104.0
+        self.assertEqual(cache.get('a'), 1)
+        mock_monotonic.return_value = 105.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_discard_where(self):
+        cache = LRUCache(max_size=10)
+        for key in [(1, 'x'), (1, 'y'), (2, 'x')]:
+            cache.set(key, True)
+        self.assertEqual(cache.discard_where(lambda key: key[0] == 1), 2)
+        self.assertEqual(len(cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
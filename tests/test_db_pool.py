@@ -0,0 +1,132 @@
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import psycopg2.extensions
+
+from src import db_pool
+from src.db_pool import ConnectionPool, PoolTimeoutError, connection_kwargs_from_env
+
+
+def make_fake_connection():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    conn._last_used = 0.0
+    return conn
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool({}, min_size=1, max_size=2, timeout=0.05, ping_after=3600)
+        patcher = patch.object(ConnectionPool, '_connect', side_effect=lambda: make_fake_connection())
+        self.mock_connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_connections_are_reused(self):
+        conn = self.pool.getconn()
+        self.pool.putconn(conn)
+        self.assertIs(self.pool.getconn(), conn)
+        self.assertEqual(self.mock_connect.call_count, 1)
+        self.assertEqual(self.pool.stats()['checkouts'], 2)
+
+    def test_checkout_times_out_when_exhausted(self):
+        self.pool.getconn()
+        self.pool.getconn()
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.getconn()
+        stats = self.pool.stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['in_use'], 2)
+
+    def test_waiter_gets_returned_connection(self):
+        first = self.pool.getconn()
+        self.pool.getconn()
+        self.pool.timeout = 2
+        threading.Timer(0.05, self.pool.putconn, args=(first,)).start()
+        self.assertIs(self.pool.getconn(), first)
+
+    def test_unfinished_transaction_is_rolled_back_on_return(self):
+        conn = self.pool.getconn()
+        conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        self.pool.putconn(conn)
+        conn.rollback.assert_called_once()
+
+    def test_unhealthy_connection_is_replaced(self):
+        conn = self.pool.getconn()
+        self.pool.putconn(conn)
+        conn.closed = 1
+        replacement = self.pool.getconn()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(self.pool.stats()['connections_discarded'], 1)
+        self.assertEqual(self.pool.stats()['size'], 1)
+
+    def test_stale_connection_is_pinged(self):
+        self.pool.ping_after = 0
+        conn = self.pool.getconn()
+        self.pool.putconn(conn)
+        conn.cursor.return_value.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+        self.assertIsNot(self.pool.getconn(), conn)
+
+    def test_fill_opens_min_size(self):
+        self.pool.min_size = 2
+        self.pool.fill()
+        self.assertEqual(self.pool.stats()['idle'], 2)
+
+    def test_closeall_closes_checked_out_connections_on_return(self):
+        idle, busy = self.pool.getconn(), self.pool.getconn()
+        self.pool.putconn(idle)
+        self.pool.closeall()
+        idle.close_for_real.assert_called_once()
+        self.pool.putconn(busy)
+        busy.close_for_real.assert_called_once()
+        stats = self.pool.stats()
+        self.assertEqual((stats['closed'], stats['size'], stats['idle']), (True, 0, 0))
+        with self.assertRaises(psycopg2.pool.PoolError):
+            self.pool.getconn()
+
+    def test_closeall_wakes_waiters(self):
+        self.pool.getconn()
+        self.pool.getconn()
+        self.pool.timeout = 2
+        threading.Timer(0.05, self.pool.closeall).start()
+        with self.assertRaises(psycopg2.pool.PoolError) as caught:
+            self.pool.getconn()
+        self.assertNotIsInstance(caught.exception, PoolTimeoutError)
+
+
+class TestPoolConfiguration(unittest.TestCase):
+    def setUp(self):
+        self.original_env = os.environ.copy()
+        self.addCleanup(setattr, db_pool, '_pool', None)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.original_env)
+
+    def test_missing_database_url(self):
+        os.environ.pop('DATABASE_URL', None)
+        with self.assertRaises(ValueError):
+            connection_kwargs_from_env()
+
+    def test_pool_settings_from_env(self):
+        os.environ['DATABASE_URL'] = 'postgresql://user:password@db:5432/learnbuddy'
+        os.environ['DB_POOL_MAX_SIZE'] = '7'
+        db_pool._pool = None
+        pool = db_pool.get_pool()
+        self.assertEqual(pool.max_size, 7)
+        self.assertEqual(pool.connect_kwargs['database'], 'learnbuddy')
+        self.assertIs(db_pool.get_pool(), pool)
+
+    def test_pool_is_rebuilt_after_fork(self):
+        os.environ['DATABASE_URL'] = 'postgresql://user:password@db:5432/learnbuddy'
+        db_pool._pool = None
+        pool = db_pool.get_pool()
+        pool.pid = -1  # Pretend this pool was inherited from a parent process
+        self.assertIsNot(db_pool.get_pool(), pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
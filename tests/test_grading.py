@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.grading import (
+    cosine_similarity,
+    embedding_from_bytes,
+    embedding_to_bytes,
+    encode_answers,
+    grade_answer,
+)
+
+
+def make_fake_model(vectors):
+    """A stand-in for SentenceTransformer that maps known strings to fixed vectors."""
+    model = MagicMock()
+
+    def encode(texts, **kwargs):
+        return np.array([vectors[t] for t in texts], dtype=np.float32)
+
+    model.encode.side_effect = encode
+    return model
+
+
+class TestReferenceEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.model = make_fake_model({
+            '4': [1.0, 0.0, 0.0],
+            'four': [0.9, 0.1, 0.0],
+            'seven': [0.0, 1.0, 0.0],
+        })
+
+    def test_bytes_round_trip(self):
+        embedding = encode_answers(self.model, ['  Four '])[0]
+        restored = embedding_from_bytes(memoryview(embedding_to_bytes(embedding)))
+        np.testing.assert_array_equal(restored, embedding)
+        self.assertEqual(len(embedding_to_bytes(embedding)), 3 * 4)
+
+    def test_precomputed_reference_only_encodes_learner_answer(self):
+        reference = embedding_to_bytes(encode_answers(self.model, ['4'])[0])
+        self.model.encode.reset_mock()
+
+        is_correct, score, new_reference = grade_answer(self.model, 'Four', '4', reference)
+
+        self.model.encode.assert_called_once()
+        self.assertEqual(self.model.encode.call_args[0][0], ['four'])
+        self.assertTrue(is_correct)
+        self.assertGreater(score, 0.8)
+        self.assertIsNone(new_reference)
+
+    def test_missing_reference_is_computed_and_returned(self):
+        is_correct, score, new_reference = grade_answer(self.model, 'seven', '4', None)
+
+        self.model.encode.assert_called_once()
+        self.assertFalse(is_correct)
+        self.assertAlmostEqual(score, 0.0)
+        np.testing.assert_array_equal(embedding_from_bytes(new_reference), [1.0, 0.0, 0.0])
+
+    def test_reference_from_another_model_is_replaced(self):
+        stale = embedding_to_bytes(np.ones(5, dtype=np.float32))
+        _, _, new_reference = grade_answer(self.model, '4', '4', stale)
+        self.assertIsNotNone(new_reference)
+
+    def test_cosine_similarity_of_zero_vector(self):
+        self.assertEqual(cosine_similarity(np.zeros(3), np.ones(3)), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
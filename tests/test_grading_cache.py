@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.grading_cache import GradingResultCache
+from src.grading_cascade import GradingCascade
+
+
+class TestGradingResultCache(unittest.TestCase):
+    def test_local_hit_after_put(self):
+        cache = GradingResultCache(max_size=10)
+        self.assertIsNone(cache.get(1, 'Paris', 'capital of france'))
+        cache.put(1, 'Paris', 'capital of france', True, 0.91)
+        self.assertEqual(cache.get(1, 'paris', ' Capital of France '), (True, 0.91))
+        stats = cache.stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 1))
+
+    def test_changed_correct_answer_is_a_miss(self):
+        cache = GradingResultCache(max_size=10)
+        cache.put(1, 'Paris', 'capital of france', True, 0.91)
+        self.assertIsNone(cache.get(1, 'Lyon', 'capital of france'))
+
+    def test_stored_result_fills_local_tier(self):
+        cache = GradingResultCache(max_size=10, use_db=True)
+        self.assertEqual(cache.get(1, 'Paris', 'capital of france', (False, 0.42)), (False, 0.42))
+        self.assertEqual(cache.get(1, 'Paris', 'capital of france'), (False, 0.42))
+        self.assertEqual((cache.stats()['db_hits'], cache.stats()['local_hits']), (1, 1))
+
+    def test_invalidate_drops_local_and_table_rows(self):
+        cache = GradingResultCache(max_size=10, use_db=True)
+        cache.put(1, 'Paris', 'a', True, 0.9)
+        cache.put(2, 'Paris', 'a', True, 0.9)
+        cur = MagicMock()
+        self.assertEqual(cache.invalidate(1, cur), 1)
+        cur.execute.assert_called_once_with("DELETE FROM grading_cache WHERE question_id = %s;", (1,))
+        self.assertIsNotNone(cache.get(2, 'Paris', 'a'))
+
+    def test_save_writes_only_with_db_tier_and_trims(self):
+        cur = MagicMock()
+        GradingResultCache(use_db=False).save(cur, 1, 'Paris', 'a', True, 0.9)
+        cur.execute.assert_not_called()
+
+        cur.rowcount = 0
+        cache = GradingResultCache(use_db=True, trim_every=2)
+        cache.save(cur, 1, 'Paris', 'a', True, 0.9)
+        self.assertEqual(cur.execute.call_count, 1)
+        cache.save(cur, 1, 'Paris', 'b', True, 0.9)
+        self.assertEqual(cur.execute.call_count, 3)  # second save + trim
+        self.assertIn('DELETE FROM grading_cache', cur.execute.call_args[0][0])
+
+    def test_question_query_joins_the_table_only_when_enabled(self):
+        sql, params = GradingResultCache(use_db=True).question_query(7, ' Four ')
+        self.assertIn('LEFT JOIN grading_cache', sql)
+        self.assertEqual(params, ('four', 7))
+        sql, params = GradingResultCache(use_db=False).question_query(7, ' Four ')
+        self.assertNotIn('grading_cache', sql)
+        self.assertEqual(params, (7,))
+
+
+class TestCascadeWithCache(unittest.TestCase):
+    def test_repeat_answer_skips_the_model(self):
+        model = MagicMock()
+        model.encode.return_value = np.array([[1.0, 0.0], [0.95, 0.05]], dtype=np.float32)
+        cascade = GradingCascade(result_cache=GradingResultCache(max_size=10))
+        first = cascade.grade(model, 'capital of france', 'Paris', None, question_id=3)
+        second = cascade.grade(model, 'Capital of France', 'Paris', None, question_id=3)
+        self.assertEqual(first[3], 'embedding')
+        self.assertEqual(second[3], 'cache')
+        self.assertEqual(first[:2], second[:2])
+        model.encode.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from fractions import Fraction
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.grading import embedding_to_bytes
+from src.grading_cascade import GradingCascade, lexical_similarity, parse_numeric
+
+
+class TestParseNumeric(unittest.TestCase):
+    def test_numbers_and_units(self):
+        self.assertEqual(parse_numeric('2.5 hours'), (Fraction(5, 2), 'h'))
+        self.assertEqual(parse_numeric('2.5 hrs'), (Fraction(5, 2), 'h'))
+        self.assertEqual(parse_numeric('1,000'), (Fraction(1000), ''))
+        self.assertEqual(parse_numeric('3/4'), (Fraction(3, 4), ''))
+        self.assertEqual(parse_numeric('x = 7'), (Fraction(7), ''))
+
+    def test_number_words(self):
+        self.assertEqual(parse_numeric('thirty-six'), (Fraction(36), ''))
+        self.assertEqual(parse_numeric('one hundred and five'), (Fraction(105), ''))
+        self.assertEqual(parse_numeric('five meters'), (Fraction(5), 'm'))
+
+    def test_non_numbers(self):
+        self.assertIsNone(parse_numeric("I don't know"))
+        self.assertIsNone(parse_numeric('two and a half'))
+        self.assertIsNone(parse_numeric('paris'))
+
+    def test_zero_denominator_is_not_a_number(self):
+        for text in ('3/0', '1/0', '0/0', '2/0 m'):
+            self.assertIsNone(parse_numeric(text))
+
+
+class TestGradingCascade(unittest.TestCase):
+    def setUp(self):
+        self.cascade = GradingCascade()
+        self.model = MagicMock()
+
+    def grade(self, user_answer, correct_answer, reference_blob=None):
+        return self.cascade.grade(self.model, user_answer, correct_answer, reference_blob)
+
+    def test_exact_match_skips_the_model(self):
+        self.assertEqual(self.grade(' 4. ', '4'), (True, 1.0, None, 'exact'))
+        self.model.encode.assert_not_called()
+
+    def test_numeric_tier_decides_both_ways(self):
+        self.assertEqual(self.grade('four', '4')[::3], (True, 'numeric'))
+        self.assertEqual(self.grade('5 m', '5 meters')[::3], (True, 'numeric'))
+        self.assertEqual(self.grade('314', '314.16')[::3], (True, 'numeric'))
+        self.assertEqual(self.grade('25 hours', '2.5 hours')[::3], (False, 'numeric'))
+        self.assertEqual(self.grade('31.4', '314.16')[::3], (False, 'numeric'))
+        self.model.encode.assert_not_called()
+
+    def test_zero_denominator_answers_are_graded(self):
+        self.assertIsNone(self.cascade._cheap_tiers('3/0', '4'))
+        self.assertIsNone(self.cascade._cheap_tiers('4', '1/0'))
+        self.model.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        self.assertFalse(self.grade('0/0', '4')[0])
+
+    def test_conflicting_units_fall_through(self):
+        self.model.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        is_correct, score, new_reference, tier = self.grade('5 cm', '5 meters')
+        self.assertEqual(tier, 'embedding')
+        self.assertFalse(is_correct)
+        self.assertIsNotNone(new_reference)
+
+    def test_lexical_tier_only_accepts(self):
+        reference = 'the mitochondria is the powerhouse of the cell'
+        self.assertGreater(lexical_similarity('the mitochondria is the powerhouse of teh cell', reference), 0.9)
+        self.assertEqual(self.grade('Paris, France', 'paris france')[::3], (True, 'lexical'))
+        self.assertEqual(self.grade('The mitochondria is the powerhouse of teh cell', reference)[::3], (True, 'lexical'))
+        self.model.encode.assert_not_called()
+
+    def test_embedding_tier_uses_stored_reference(self):
+        reference = np.array([1.0, 0.0], dtype=np.float32)
+        self.model.encode.return_value = np.array([[0.9, 0.1]], dtype=np.float32)
+        is_correct, score, new_reference, tier = self.grade(
+            'two and a half hours', '2.5 hours', embedding_to_bytes(reference)
+        )
+        self.assertEqual(tier, 'embedding')
+        self.assertTrue(is_correct)
+        self.assertIsNone(new_reference)
+        self.model.encode.assert_called_once()
+
+    def test_stats_report_hit_rates(self):
+        self.grade('4', '4')
+        self.grade('four', '4')
+        self.grade('5', '4')
+        self.model.encode.return_value = np.array([[1.0, 0.0], [1.0, 0.0]], dtype=np.float32)
+        self.grade('the number after three', '4')
+        stats = self.cascade.stats()
+        self.assertEqual(stats['graded'], 4)
+        self.assertEqual(stats['encodes_avoided'], 3)
+        self.assertEqual(stats['tiers']['numeric']['hits'], 2)
+        self.assertEqual(stats['tiers']['numeric']['hit_rate'], 0.5)
+        self.assertEqual(stats['tiers']['embedding']['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
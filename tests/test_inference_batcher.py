@@ -0,0 +1,82 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src.grading import encode_answers
+from src.inference_batcher import MicroBatchEncoder
+
+
+class FakeModel:
+    """Encodes each text as [len(text), 1] and records the batch sizes it saw."""
+
+    def __init__(self, delay_event=None):
+        self.batches = []
+        self.delay_event = delay_event
+
+    def encode(self, texts, **kwargs):
+        if self.delay_event is not None:
+            self.delay_event.wait(1)
+        self.batches.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+class TestMicroBatchEncoder(unittest.TestCase):
+    def test_results_are_routed_back_to_callers(self):
+        encoder = MicroBatchEncoder(FakeModel(), window_ms=1, max_batch=8)
+        result = encoder.encode(['a', 'abc'])
+        np.testing.assert_array_equal(result, [[1, 1], [3, 1]])
+        np.testing.assert_array_equal(encoder.encode('ab'), [2, 1])
+
+    def test_concurrent_requests_share_a_batch(self):
+        release = threading.Event()
+        model = FakeModel(delay_event=release)
+        encoder = MicroBatchEncoder(model, window_ms=50, max_batch=64)
+        results = {}
+
+        def submit(i):
+            results[i] = encoder.encode(['x' * i])
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(1, 21)]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(sum(len(b) for b in model.batches), 20)
+        self.assertLess(len(model.batches), 20)
+        for i, embedding in results.items():
+            self.assertEqual(embedding[0][0], i)
+        stats = encoder.stats()
+        self.assertEqual(stats['items'], 20)
+        self.assertGreater(stats['avg_batch_size'], 1)
+
+    def test_batches_are_capped_at_max_batch(self):
+        model = FakeModel()
+        encoder = MicroBatchEncoder(model, window_ms=20, max_batch=3)
+        encoder.encode([str(i) for i in range(7)])
+        self.assertTrue(all(len(b) <= 3 for b in model.batches))
+        self.assertEqual(encoder.stats()['largest_batch'], 3)
+
+    def test_model_errors_reach_every_waiting_caller(self):
+        model = MagicMock()
+        model.encode.side_effect = RuntimeError("model crashed")
+        encoder = MicroBatchEncoder(model, window_ms=1, max_batch=4)
+        with self.assertRaises(RuntimeError):
+            encoder.encode(['a', 'b'])
+        # The worker thread keeps serving after a failure
+        model.encode.side_effect = None
+        model.encode.return_value = np.ones((1, 2), dtype=np.float32)
+        np.testing.assert_array_equal(encoder.encode(['c']), [[1, 1]])
+
+    def test_works_as_grading_model(self):
+        encoder = MicroBatchEncoder(FakeModel(), window_ms=1)
+        embeddings = encode_answers(encoder, ['  Four ', '4'])
+        self.assertEqual(embeddings.shape, (2, 2))
+        self.assertEqual(embeddings[0][0], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.learner_state import MemoryStateStore, PostgresStateStore, create_state_store_from_env
+from src.learning_models import (AnswerRing, DifficultyHistory, EnhancedAdaptiveDifficultySelector, LearnerState,
+                                 PerformanceWindow)
+
+
+class FakeLearnerStateTable:
+    """Stands in for the learner_state table behind a cursor."""
+
+    def __init__(self):
+        self.rows = {}
+        self.rowcount = 0
+        self._result = None
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().startswith("SELECT state"):
+            state = self.rows.get(tuple(params))
+            self._result = (state,) if state is not None else None
+        elif sql.lstrip().startswith("INSERT INTO learner_state"):
+            user_id, lesson_id, payload = params
+            self.rows[(user_id, lesson_id)] = payload
+        elif sql.lstrip().startswith("DELETE"):
+            self.rowcount = 0
+
+    def fetchone(self):
+        return self._result
+
+
+class TestMemoryStateStore(unittest.TestCase):
+    def test_bounded_with_eviction_metrics(self):
+        store = MemoryStateStore(max_entries=2)
+        for user_id in range(3):
+            store.save((user_id, 1), {'current_difficulty': user_id})
+        self.assertNotIn((0, 1), store)
+        self.assertEqual(store.load((2, 1))['current_difficulty'], 2)
+        stats = store.stats()
+        self.assertEqual((stats['backend'], stats['size'], stats['evictions']), ('memory', 2, 1))
+
+    def test_idle_states_expire(self):
+        store = MemoryStateStore(ttl=0.0)
+        store[(1, 1)] = {}
+        self.assertIsNone(store.load((1, 1)))
+        self.assertEqual(store.stats()['expirations'], 1)
+
+    def test_backend_from_env(self):
+        with patch.dict('os.environ', {'LEARNER_STATE_BACKEND': 'postgres'}):
+            self.assertIsInstance(create_state_store_from_env(dict, dict), PostgresStateStore)
+        with patch.dict('os.environ', {'LEARNER_STATE_BACKEND': 'redis'}):
+            with self.assertRaises(ValueError):
+                create_state_store_from_env(dict, dict)
+
+
+class TestLearnerState(unittest.TestCase):
+    def test_rings_keep_the_newest_records(self):
+        ring = AnswerRing(3)
+        for i in range(5):
+            ring.append((i % 2 == 0, i % 5 + 1, float(i), None if i == 4 else i * 0.5))
+        self.assertEqual(len(ring), 3)
+        self.assertEqual([answer['timestamp'] for answer in ring], [2.0, 3.0, 4.0])
+        self.assertEqual(ring[-1], {'correct': True, 'difficulty': 5, 'timestamp': 4.0, 'response_time': None})
+        with self.assertRaises(IndexError):
+            ring[3]
+
+    def test_history_reasons_round_trip(self):
+        history = DifficultyHistory(2)
+        history.extend([(1, 1.0, "hot_streak"), (2, 2.0, "a new reason"), (3, 3.0, "hot_streak")])
+        self.assertEqual(list(history), [(2, 2.0, "a new reason"), (3, 3.0, "hot_streak")])
+
+    def test_dict_style_access(self):
+        state = LearnerState()
+        state['streak_counter'] = 3
+        self.assertEqual(state.streak_counter, 3)
+        with self.assertRaises(KeyError):
+            state['not_a_field'] = 1
+        self.assertFalse(hasattr(state, '__dict__'))
+
+    def test_reads_rows_written_by_the_dict_layout(self):
+        row = {
+            'current_difficulty': 2, 'confidence_scores': [0.5] * 5, 'learning_momentum': 0.1,
+            'recent_performance': [0.75, {'correct': True, 'difficulty': 2, 'timestamp': 5.0, 'response_time': 3.0}],
+            'difficulty_history': [[2, 5.0, "fast_track"]], 'last_update': 5.0,
+            'streak_counter': 1, 'struggle_counter': 0, 'exploration_debt': 0, 'performance_window': None,
+        }
+        state = LearnerState.from_dict(row)
+        self.assertEqual(len(state.recent_performance), 1)
+        self.assertEqual(state.to_dict()['recent_performance'], [[True, 2, 5.0, 3.0]])
+
+
+class TestPostgresStateStore(unittest.TestCase):
+    def setUp(self):
+        self.selector = EnhancedAdaptiveDifficultySelector()
+        self.selector.user_states = MemoryStateStore()
+
+    def test_state_survives_json_round_trip(self):
+        state = self.selector._get_user_state(1, 1)
+        self.selector._update_and_return(state, 3, "test")
+        window = PerformanceWindow(capacity=12)
+        for i in range(15):
+            window.record(i % 3 != 0, 1 + i % 5, answered_at=100.0 + i * 7)
+        window.synced_total = 15
+        state['performance_window'] = window
+        state['recent_performance'].append({'correct': True, 'difficulty': 3, 'timestamp': 1.0, 'response_time': None})
+
+        decoded = self.selector._decode_state(json.loads(json.dumps(self.selector._encode_state(state))))
+        self.assertEqual(decoded['current_difficulty'], 3)
+        self.assertEqual(decoded['difficulty_history'][-1][2], "test")
+        self.assertEqual(decoded['recent_performance'].maxlen, self.selector.long_window)
+        self.assertEqual(decoded['performance_window'].metrics(), window.metrics())
+        self.assertEqual(decoded['performance_window'].synced_total, 15)
+
+    def test_load_locks_the_row_in_the_request_transaction(self):
+        store = PostgresStateStore(dict, dict)
+        cur = MagicMock()
+        cur.fetchone.return_value = ({'current_difficulty': 4},)
+        self.assertEqual(store.load((1, 2), cur), {'current_difficulty': 4})
+        sql, params = cur.execute.call_args[0]
+        self.assertIn("FOR UPDATE", sql)
+        self.assertEqual(params, (1, 2))
+
+    def test_purges_idle_rows_every_n_saves(self):
+        store = PostgresStateStore(dict, dict, ttl=60, purge_every=2)
+        cur = MagicMock(rowcount=5)
+        store.save((1, 1), {}, cur)
+        store.save((1, 1), {}, cur)
+        self.assertTrue(cur.execute.call_args[0][0].startswith("DELETE FROM learner_state"))
+        self.assertEqual(store.stats()['rows_purged'], 5)
+
+    @patch('src.learning_models.get_db_connection')
+    def test_workers_share_one_state(self, mock_get_db_connection):
+        table = FakeLearnerStateTable()
+        workers = []
+        for _ in range(2):
+            selector = EnhancedAdaptiveDifficultySelector()
+            selector.user_states = PostgresStateStore(selector._encode_state, selector._decode_state)
+            workers.append(selector)
+        uow = MagicMock()
+        uow.cursor = table
+
+        for _ in range(2):
+            workers[0].update_bandit_state_enhanced(7, 1, 1, was_correct=True, uow=uow)
+        state = workers[1]._get_user_state(7, 1, uow=uow)
+        self.assertEqual(state['streak_counter'], 2)
+        self.assertGreater(state['confidence_scores'][0], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
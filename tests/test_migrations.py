@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from src.migrations import MIGRATIONS_DIR, discover_migrations, migrate, split_statements
+
+
+def write(directory, filename, sql):
+    with open(os.path.join(directory, filename), 'w') as f:
+        f.write(sql)
+
+
+def make_conn(applied=()):
+    conn = MagicMock()
+    cur = conn.cursor.return_value.__enter__.return_value
+    cur.fetchall.return_value = list(applied)
+    return conn, cur
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        write(self.tmp.name, '0002_add_column.sql', 'ALTER TABLE t ADD COLUMN c INT;')
+        write(self.tmp.name, '0001_create.sql', 'CREATE TABLE t (id INT);')
+        write(self.tmp.name, '0003_index.sql', '-- migrate: no-transaction\nCREATE INDEX CONCURRENTLY i ON t (c);\n')
+        write(self.tmp.name, 'README.txt', 'not a migration')
+
+    def test_discovers_in_version_order(self):
+        migrations = discover_migrations(self.tmp.name)
+        self.assertEqual([(m.version, m.name) for m in migrations], [(1, 'create'), (2, 'add_column'), (3, 'index')])
+        self.assertTrue(migrations[0].transactional)
+        self.assertFalse(migrations[2].transactional)
+
+    def test_duplicate_versions_are_rejected(self):
+        write(self.tmp.name, '0002_other.sql', 'SELECT 1;')
+        with self.assertRaises(ValueError):
+            discover_migrations(self.tmp.name)
+
+    def test_split_statements_skips_comments(self):
+        sql = "-- header\nDROP INDEX IF EXISTS a;\nCREATE INDEX a\n    ON t (c);\n"
+        self.assertEqual(split_statements(sql), ["DROP INDEX IF EXISTS a;", "CREATE INDEX a\n    ON t (c);"])
+
+    def test_only_pending_migrations_are_applied(self):
+        applied_checksum = discover_migrations(self.tmp.name)[0].checksum
+        conn, cur = make_conn(applied=[(1, applied_checksum)])
+        applied = migrate(conn, directory=self.tmp.name)
+        self.assertEqual([m.version for m in applied], [2, 3])
+        executed = [c.args[0] for c in cur.execute.call_args_list]
+        self.assertNotIn('CREATE TABLE t (id INT);', executed)
+        self.assertIn('ALTER TABLE t ADD COLUMN c INT;', executed)
+        self.assertIn('CREATE INDEX CONCURRENTLY i ON t (c);', executed)
+        self.assertIn('SELECT pg_advisory_unlock(%s);', executed)
+        self.assertFalse(conn.autocommit)  # restored after the no-transaction migration
+
+    def test_target_stops_early(self):
+        conn, _ = make_conn()
+        applied = migrate(conn, target=1, directory=self.tmp.name)
+        self.assertEqual([m.version for m in applied], [1])
+
+    def test_failure_rolls_back_and_releases_the_lock(self):
+        conn, cur = make_conn()
+
+        def execute(sql, params=None):
+            if sql.startswith('ALTER'):
+                raise RuntimeError('boom')
+        cur.execute.side_effect = execute
+        with self.assertRaises(RuntimeError):
+            migrate(conn, directory=self.tmp.name)
+        conn.rollback.assert_called()
+        self.assertEqual(cur.execute.call_args_list[-1].args[0], 'SELECT pg_advisory_unlock(%s);')
+
+    def test_repo_migrations_are_valid(self):
+        versions = [m.version for m in discover_migrations(MIGRATIONS_DIR)]
+        self.assertEqual(versions, list(range(1, len(versions) + 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
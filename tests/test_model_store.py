@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src import model_store
+
+
+class TestModelStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo_dir = os.path.join(self.tmp.name, 'models--sentence-transformers--all-MiniLM-L6-v2')
+        os.makedirs(os.path.join(self.repo_dir, 'refs'))
+        os.makedirs(os.path.join(self.repo_dir, 'snapshots', 'abc123'))
+        with open(os.path.join(self.repo_dir, 'refs', 'main'), 'w') as f:
+            f.write('abc123\n')
+
+    def test_snapshot_without_weights_is_ignored(self):
+        self.assertIsNone(model_store.resolve_local_snapshot(self.tmp.name))
+
+    def test_snapshot_with_weights_is_used(self):
+        open(os.path.join(self.repo_dir, 'snapshots', 'abc123', 'model.safetensors'), 'w').close()
+        self.assertEqual(
+            model_store.resolve_local_snapshot(self.tmp.name),
+            os.path.join(self.repo_dir, 'snapshots', 'abc123')
+        )
+
+    def test_missing_cache_dir(self):
+        self.assertIsNone(model_store.resolve_local_snapshot(os.path.join(self.tmp.name, 'nope')))
+
+    def test_memory_usage_reports_this_process(self):
+        usage = model_store.memory_usage()
+        self.assertEqual(usage['pid'], os.getpid())
+        self.assertTrue(usage.get('rss_mb', usage.get('max_rss_mb', 0)) > 0)
+
+    @patch.object(model_store, '_model', None)
+    @patch.object(model_store, 'get_similarity_model')
+    def test_shared_model_loads_on_first_encode(self, mock_get_model):
+        mock_get_model.return_value = MagicMock()
+        shared = model_store.SharedSimilarityModel()
+        mock_get_model.assert_not_called()
+        shared.encode(['4'], convert_to_numpy=True)
+        mock_get_model.return_value.encode.assert_called_once_with(['4'], convert_to_numpy=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
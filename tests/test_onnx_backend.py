@@ -0,0 +1,96 @@
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from src import model_store
+from src.onnx_backend import OnnxSentenceEncoder, l2_normalize, mean_pool
+
+
+class FakeSession:
+    """Returns token embeddings equal to the token ids, so pooling is easy to check."""
+
+    def __init__(self, input_names=("input_ids", "attention_mask")):
+        self.feeds = []
+        self.input_names = input_names
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=n) for n in self.input_names]
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+class FakeTokenizer:
+    def encode_batch(self, texts):
+        longest = max(len(t) for t in texts)
+        return [
+            SimpleNamespace(
+                ids=[ord(c) for c in t] + [0] * (longest - len(t)),
+                attention_mask=[1] * len(t) + [0] * (longest - len(t)),
+                type_ids=[0] * longest,
+            )
+            for t in texts
+        ]
+
+
+def make_encoder(session):
+    encoder = OnnxSentenceEncoder.__new__(OnnxSentenceEncoder)
+    encoder.tokenizer = FakeTokenizer()
+    encoder.session = session
+    encoder.input_names = {i.name for i in session.get_inputs()}
+    encoder.variant = "onnx"
+    return encoder
+
+
+class TestOnnxBackend(unittest.TestCase):
+    def test_mean_pool_ignores_padding(self):
+        tokens = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+        mask = np.array([[1, 1, 0]])
+        np.testing.assert_allclose(mean_pool(tokens, mask), [[2.0, 3.0]])
+
+    def test_l2_normalize(self):
+        np.testing.assert_allclose(l2_normalize(np.array([[3.0, 4.0]])), [[0.6, 0.8]])
+
+    def test_encode_pools_each_text_and_feeds_declared_inputs_only(self):
+        session = FakeSession()
+        encoder = make_encoder(session)
+        embeddings = encoder.encode(["a", "abc"], batch_size=8)
+        self.assertEqual(embeddings.dtype, np.float32)
+        np.testing.assert_allclose(embeddings[0], [ord("a"), 1])
+        np.testing.assert_allclose(embeddings[1], [(ord("a") + ord("b") + ord("c")) / 3, 1])
+        self.assertEqual(set(session.feeds[0]), {"input_ids", "attention_mask"})
+
+    def test_encode_splits_batches_and_normalizes(self):
+        session = FakeSession()
+        embeddings = make_encoder(session).encode(["a", "b", "c"], batch_size=2, normalize_embeddings=True)
+        self.assertEqual(len(session.feeds), 2)
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-6)
+
+    def test_single_string_returns_one_vector(self):
+        self.assertEqual(make_encoder(FakeSession()).encode("a").shape, (2,))
+
+    def test_missing_export_is_reported(self):
+        with self.assertRaises(FileNotFoundError):
+            OnnxSentenceEncoder(os.path.dirname(__file__), "onnx-int8")
+
+
+class TestBackendSelection(unittest.TestCase):
+    @patch.dict(os.environ, {"GRADER_BACKEND": "onnx-int8"})
+    @patch.object(model_store, 'get_onnx_model')
+    def test_onnx_backend_is_selected_from_env(self, mock_get_onnx):
+        model_store.similarity_model.encode(['4'])
+        mock_get_onnx.assert_called_once_with("onnx-int8")
+
+    @patch.dict(os.environ, {"GRADER_BACKEND": "tensorflow"})
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            model_store.get_grader_backend()
+
+
+if __name__ == '__main__':
+    unittest.main()
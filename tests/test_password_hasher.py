@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+from src.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+
+class BlockingPool:
+    """Stands in for the process pool: every submitted hash waits until release() is called."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append((future, fn, args))
+        return future
+
+    def release(self):
+        for future, fn, args in self.futures:
+            if not future.cancelled():
+                future.set_result(fn(*args))
+        self.futures = []
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_inline_hash_and_verify(self):
+        hasher = PasswordHasher(workers=0)
+        hashed = hasher.hash("a_strong_password")
+        self.assertTrue(hasher.verify("a_strong_password", hashed))
+        self.assertFalse(hasher.verify("wrong", hashed))
+        self.assertEqual(hasher.stats()["completed"], 3)
+
+    def test_process_pool_hash_and_verify(self):
+        hasher = PasswordHasher(workers=1)
+        self.addCleanup(hasher.shutdown)
+        hashed = hasher.hash("a_strong_password")
+        self.assertTrue(hasher.verify("a_strong_password", hashed))
+        stats = hasher.stats()
+        self.assertEqual((stats["completed"], stats["in_flight"]), (2, 0))
+        self.assertGreater(stats["avg_hash_ms"], 0)
+
+    def test_rejects_when_the_queue_is_full(self):
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        pool = BlockingPool()
+        hasher._ensure_pool = lambda: pool
+        with patch('src.password_hasher.security.get_password_hash', side_effect=lambda p: f"hashed:{p}"):
+            waiting = [threading.Thread(target=hasher.hash, args=(str(i),)) for i in range(2)]
+            for thread in waiting:
+                thread.start()
+            while len(pool.futures) < 2:
+                time.sleep(0.001)
+            started = time.perf_counter()
+            with self.assertRaises(PasswordHasherBusyError):
+                hasher.hash("third")
+            self.assertLess(time.perf_counter() - started, 0.1)
+            self.assertEqual(hasher.stats()["queue_depth"], 1)
+            pool.release()
+            for thread in waiting:
+                thread.join()
+        stats = hasher.stats()
+        self.assertEqual((stats["rejected"], stats["completed"], stats["in_flight"], stats["max_queue_depth"]), (1, 2, 0, 1))
+
+    def test_times_out_and_frees_the_slot(self):
+        hasher = PasswordHasher(workers=1, max_queue=0, timeout=0.01)
+        pool = BlockingPool()
+        hasher._ensure_pool = lambda: pool
+        with self.assertRaises(PasswordHasherBusyError):
+            hasher.hash("slow")
+        stats = hasher.stats()
+        self.assertEqual((stats["timeouts"], stats["in_flight"]), (1, 0))
+
+    def test_failed_submit_frees_the_slot(self):
+        hasher = PasswordHasher(workers=1, max_queue=0)
+        pool = MagicMock()
+        pool.submit.side_effect = RuntimeError("cannot schedule new futures after shutdown")
+        hasher._ensure_pool = lambda: pool
+        with self.assertRaises(RuntimeError):
+            hasher.hash("x")
+        self.assertEqual(hasher.stats()["in_flight"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from src.learner_state import MemoryStateStore
+from src.learning_models import EnhancedAdaptiveDifficultySelector, PerformanceWindow
+
+
+def expected_metrics(attempts, selector):
+    """The per-request computation the window replaces (attempts newest first)."""
+    n = len(attempts)
+    success_rate = sum(a['is_correct'] for a in attempts) / n
+    consecutive_correct = consecutive_wrong = 0
+    for a in attempts:
+        if a['is_correct']:
+            if consecutive_wrong:
+                break
+            consecutive_correct += 1
+        else:
+            if consecutive_correct:
+                break
+            consecutive_wrong += 1
+    velocity = 0.0
+    if n >= 6:
+        recent, older = attempts[:n // 2], attempts[n // 2:]
+        velocity = sum(a['is_correct'] for a in recent) / len(recent) - sum(a['is_correct'] for a in older) / len(older)
+    times = [a['response_time'] for a in attempts if a['response_time'] is not None]
+    return (success_rate, consecutive_correct, consecutive_wrong, n, np.mean(times) if times else 0.0,
+            velocity, selector._calculate_difficulty_stability(attempts))
+
+
+def as_tuple(m):
+    return (m.success_rate, m.consecutive_correct, m.consecutive_wrong, m.recent_attempts,
+            m.avg_response_time, m.learning_velocity, m.difficulty_stability)
+
+
+class TestPerformanceWindow(unittest.TestCase):
+    def test_matches_the_window_query_computation(self):
+        rng = random.Random(7)
+        selector = EnhancedAdaptiveDifficultySelector()
+        for capacity in (12, 7):
+            window, history, now = PerformanceWindow(capacity), [], 0.0
+            for _ in range(60):
+                now += rng.uniform(1, 30)
+                attempt = {'is_correct': rng.random() < 0.6, 'difficulty_level': rng.randint(1, 5),
+                           'response_time': now - history[-1]['at'] if history else None, 'at': now}
+                history.append(attempt)
+                window.record(attempt['is_correct'], attempt['difficulty_level'], now)
+                expected = expected_metrics(list(reversed(history))[:capacity], selector)
+                np.testing.assert_allclose(as_tuple(window.metrics()), expected, atol=1e-9)
+
+    def test_rebuild_from_rows_keeps_oldest_response_time(self):
+        rows = [
+            {'is_correct': True, 'difficulty_level': 2, 'response_time': 4.0},
+            {'is_correct': False, 'difficulty_level': 2, 'response_time': 6.0},
+        ]
+        window = PerformanceWindow.from_attempts(rows)
+        metrics = window.metrics()
+        self.assertEqual(metrics.avg_response_time, 5.0)
+        self.assertEqual(metrics.consecutive_correct, 1)
+
+    def test_empty_window(self):
+        self.assertEqual(PerformanceWindow().metrics().recent_attempts, 0)
+
+
+class TestWindowedMetrics(unittest.TestCase):
+    def setUp(self):
+        self.selector = EnhancedAdaptiveDifficultySelector()
+        self.selector.user_states = MemoryStateStore()
+        self.selector.validate_windows = True
+        self.conn = MagicMock()
+        self.cur = self.conn.cursor.return_value
+        patcher = patch('src.learning_models.get_db_connection', return_value=self.conn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cold_miss_rebuilds_then_updates_in_place(self):
+        self.cur.fetchall.return_value = [
+            {'is_correct': True, 'difficulty_level': 1, 'response_time': None, 'answers_total': 1},
+        ]
+        self.assertEqual(self.selector.get_enhanced_performance_metrics(1, 1).recent_attempts, 1)
+        self.assertEqual(self.selector.window_rebuilds, 1)
+
+        self.selector.update_bandit_state_enhanced(1, 1, 1, was_correct=False)
+        self.cur.fetchone.return_value = [2]  # bandit_state agrees: nothing missed
+        self.cur.fetchall.reset_mock()
+        metrics = self.selector.get_enhanced_performance_metrics(1, 1)
+        self.assertEqual((metrics.recent_attempts, metrics.consecutive_wrong), (2, 1))
+        self.cur.fetchall.assert_not_called()
+        self.assertEqual(self.selector.window_hits, 1)
+
+    def test_answers_from_another_worker_trigger_a_rebuild(self):
+        self.cur.fetchall.return_value = [
+            {'is_correct': True, 'difficulty_level': 1, 'response_time': None, 'answers_total': 1},
+        ]
+        self.selector.get_enhanced_performance_metrics(1, 1)
+        self.cur.fetchone.return_value = [3]
+        self.cur.fetchall.return_value = [
+            {'is_correct': False, 'difficulty_level': 1, 'response_time': 2.0, 'answers_total': 3},
+            {'is_correct': False, 'difficulty_level': 1, 'response_time': 2.0, 'answers_total': 3},
+            {'is_correct': True, 'difficulty_level': 1, 'response_time': None, 'answers_total': 3},
+        ]
+        metrics = self.selector.get_enhanced_performance_metrics(1, 1)
+        self.assertEqual((metrics.recent_attempts, metrics.consecutive_wrong), (3, 2))
+        self.assertEqual(self.selector.window_stale_rebuilds, 1)
+
+    def test_without_validation_reads_never_touch_the_database(self):
+        self.selector.validate_windows = False
+        self.cur.fetchall.return_value = []
+        self.selector.get_enhanced_performance_metrics(1, 1)
+        self.conn.reset_mock()
+        self.selector.get_enhanced_performance_metrics(1, 1)
+        self.conn.cursor.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from src import question_import
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size, **kwargs):
+        self.calls.append(list(texts))
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def copied_rows(cur):
+    """The CSV rows sent by each COPY, one list per call."""
+    return [list(csv.reader(io.StringIO(call.args[1].getvalue()))) for call in cur.copy_expert.call_args_list]
+
+
+def jsonl(*records):
+    return io.StringIO("".join(r if isinstance(r, str) else json.dumps(r) + "\n" for r in records))
+
+
+def question(i, **overrides):
+    return {"lesson_id": 1, "question_text": f"Q{i}?", "difficulty_level": 2, "correct_answer_text": f"a{i}", **overrides}
+
+
+class TestValidateRecord(unittest.TestCase):
+    def test_accepts_either_text_column(self):
+        row, error = question_import.validate_record({"lesson_id": "3", "content": " What? ", "difficulty_level": "5", "correct_answer_text": "x"})
+        self.assertIsNone(error)
+        self.assertEqual(row, (3, "What?", 5, "x"))
+
+    def test_integers_as_the_admin_api_accepts_them(self):
+        row, error = question_import.validate_record(question(0, lesson_id=2.0, difficulty_level=" 4 "))
+        self.assertIsNone(error)
+        self.assertEqual(row[0::2], (2, 4))
+
+    def test_rejects_what_copy_would(self):
+        for overrides in ({"difficulty_level": 6}, {"lesson_id": "one"}, {"lesson_id": 2 ** 31},
+                          {"question_text": ""}, {"correct_answer_text": "x" * 256}, {"question_text": "a\x00b"},
+                          {"lesson_id": 1.7}, {"difficulty_level": True}, {"lesson_id": "1.0"}, {"lesson_id": "²"}):
+            row, error = question_import.validate_record(question(0, **overrides))
+            self.assertIsNone(row)
+            self.assertTrue(error)
+
+
+class TestDetectFormat(unittest.TestCase):
+    def test_from_name_or_explicit(self):
+        self.assertEqual(question_import.detect_format("Questions.CSV"), "csv")
+        self.assertEqual(question_import.detect_format("q.ndjson"), "jsonl")
+        self.assertEqual(question_import.detect_format("upload", "jsonl"), "jsonl")
+        with self.assertRaises(question_import.ImportFormatError):
+            question_import.detect_format("q.xlsx")
+
+
+class TestImportQuestions(unittest.TestCase):
+    def setUp(self):
+        self.conn = MagicMock()
+        self.cur = self.conn.cursor.return_value
+
+    def test_copies_valid_rows_in_chunks_and_reports_failures(self):
+        stream = jsonl(question(1), "{oops\n", question(2), "\n", question(3, difficulty_level=0), question(4))
+        report = question_import.import_questions(stream, "jsonl", self.conn, chunk_size=2)
+        self.assertEqual(
+            (report["rows_read"], report["rows_imported"], report["rows_failed"]), (5, 3, 2))
+        self.assertEqual([e["line"] for e in report["errors"]], [2, 5])
+        self.assertEqual([len(rows) for rows in copied_rows(self.cur)], [2, 1])
+        # No encoder: the embedding column is NULL (an unquoted empty field)
+        self.assertEqual(copied_rows(self.cur)[0][0], ["1", "Q1?", "2", "a1", ""])
+        self.conn.commit.assert_called_once()
+        self.assertTrue(report["committed"])
+
+    def test_embeddings_are_encoded_once_per_distinct_answer_per_chunk(self):
+        encoder = FakeEncoder()
+        stream = jsonl(*[question(i, correct_answer_text="same" if i % 2 else "other") for i in range(6)])
+        report = question_import.import_questions(stream, "jsonl", self.conn, encoder=encoder, chunk_size=3)
+        self.assertEqual(encoder.calls, [["other", "same"], ["same", "other"]])
+        self.assertEqual(report["embeddings_computed"], 4)
+        blob = copied_rows(self.cur)[0][0][4]
+        self.assertEqual(bytes.fromhex(blob[2:]), np.ones(4, dtype=np.float32).tobytes())
+
+    def test_encoding_failure_loads_the_chunk_without_embeddings(self):
+        encoder = MagicMock()
+        encoder.encode.side_effect = RuntimeError("model unavailable")
+        report = question_import.import_questions(jsonl(question(1)), "jsonl", self.conn, encoder=encoder)
+        self.assertEqual((report["rows_imported"], report["embeddings_computed"]), (1, 0))
+        self.assertEqual(copied_rows(self.cur)[0][0][4], "")
+
+    def test_csv_with_quoted_fields(self):
+        stream = io.StringIO('lesson_id,question_text,difficulty_level,correct_answer_text\n'
+                             '4,"Two\nlines, with a comma",1,"a,b"\n')
+        report = question_import.import_questions(stream, "csv", self.conn)
+        self.assertEqual(report["rows_imported"], 1)
+        self.assertEqual(copied_rows(self.cur)[0], [["4", "Two\nlines, with a comma", "1", "a,b", ""]])
+
+    def test_strict_rolls_back_on_any_invalid_row(self):
+        report = question_import.import_questions(jsonl(question(1), question(2, lesson_id=None)), "jsonl", self.conn, strict=True)
+        self.assertFalse(report["committed"])
+        self.assertEqual(report["rows_imported"], 0)
+        self.conn.rollback.assert_called_once()
+        self.conn.commit.assert_not_called()
+
+    def test_database_error_rolls_back(self):
+        self.cur.copy_expert.side_effect = RuntimeError("copy failed")
+        with self.assertRaises(RuntimeError):
+            question_import.import_questions(jsonl(question(1)), "jsonl", self.conn)
+        self.conn.rollback.assert_called_once()
+        self.cur.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.question_index import QuestionIndex, VERSION_SQL
+
+
+def make_index(rows):
+    cur = MagicMock()
+    cur.fetchall.return_value = rows
+    index = QuestionIndex(refresh_seconds=0)
+    index.load(cur)
+    return index
+
+
+class TestQuestionIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = make_index([
+            (1, 1, 1, 'q1'), (2, 1, 1, 'q2'), (3, 1, 3, 'q3'), (4, 2, 5, 'q4'),
+        ])
+
+    def test_picks_at_target_difficulty(self):
+        self.assertEqual(self.index.pick(1, 3), (3, 'q3', 3))
+
+    def test_falls_back_to_highest_difficulty_below_target(self):
+        self.assertEqual(self.index.pick(1, 5), (3, 'q3', 3))
+        self.assertIn(self.index.pick(1, 2), [(1, 'q1', 1), (2, 'q2', 1)])
+
+    def test_nothing_at_or_below_target(self):
+        self.assertIsNone(self.index.pick(2, 4))
+        self.assertIsNone(self.index.pick(99, 5))
+
+    def test_pick_avoids_excluded_questions(self):
+        for _ in range(20):
+            self.assertEqual(self.index.pick(1, 1, exclude={1}), (2, 'q2', 1))
+        # Repeating a question beats dropping a level
+        self.assertEqual(self.index.pick(1, 3, exclude={3}), (3, 'q3', 3))
+
+    def test_exclude_draws_before_copying_the_bucket(self):
+        index = make_index([(i, 1, 1, f'q{i}') for i in range(1, 101)])
+        # The second draw is not excluded, so the bucket is never filtered
+        with patch('src.question_index.random.choice', side_effect=[(1, 'q1'), (7, 'q7')]) as choice:
+            self.assertEqual(index.pick(1, 1, exclude={1, 2}), (7, 'q7', 1))
+        self.assertEqual(choice.call_count, 2)
+        # Every draw excluded: falls back to the filtered bucket
+        with patch('src.question_index.random.choice', side_effect=[(1, 'q1')] * 4 + [(3, 'q3')]) as choice:
+            self.assertEqual(index.pick(1, 1, exclude={1}), (3, 'q3', 1))
+        self.assertEqual(len(choice.call_args_list[-1].args[0]), 99)
+
+    def test_upsert_moves_a_question(self):
+        self.index.upsert(3, 1, 2, 'q3 edited')
+        self.assertEqual(self.index.pick(1, 5), (3, 'q3 edited', 2))
+        self.index.upsert(5, 1, 4, 'q5')
+        self.assertEqual(self.index.pick(1, 4), (5, 'q5', 4))
+
+    def test_remove_keeps_positions_consistent(self):
+        self.index.remove(1)
+        self.assertEqual(self.index.pick(1, 1), (2, 'q2', 1))
+        self.index.remove(2)
+        self.assertIsNone(self.index.pick(1, 2))
+        self.index.remove(2)  # already gone
+        self.assertEqual(self.index.stats()['questions'], 2)
+
+    @patch('src.question_index.get_db_connection')
+    def test_load_checks_out_its_own_connection(self, mock_get_db_connection):
+        mock_conn = MagicMock()
+        mock_get_db_connection.return_value = mock_conn
+        mock_conn.cursor.return_value.fetchall.return_value = [(7, 1, 2, 'q7')]
+        index = QuestionIndex(refresh_seconds=0)
+        self.assertFalse(index.loaded)
+        self.assertEqual(index.load(), 1)
+        self.assertTrue(index.loaded)
+        mock_conn.close.assert_called_once()
+
+
+
+class FakeCursor:
+    """Serves the version row and the questions rows; a set `gate` holds the questions query."""
+
+    def __init__(self, version, rows, gate=None):
+        self.version, self.rows, self.gate = version, rows, gate
+        self.queries = []
+        self.querying = threading.Event()
+
+    def execute(self, sql, params=None):
+        self.queries.append(sql)
+        if sql != VERSION_SQL and self.gate is not None:
+            self.querying.set()
+            self.gate.wait(5)
+
+    def fetchone(self):
+        return (self.version,)
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+class TestQuestionIndexRefresh(unittest.TestCase):
+    def test_reloads_only_when_the_version_changed(self):
+        index = QuestionIndex(refresh_seconds=0)
+        cur = FakeCursor(1, [(1, 1, 1, 'q1')])
+        self.assertTrue(index.refresh(cur))
+        self.assertFalse(index.refresh(cur))
+        self.assertEqual(cur.queries.count(VERSION_SQL), 3)
+        cur.version, cur.rows = 2, []
+        self.assertTrue(index.refresh(cur))
+        self.assertIsNone(index.pick(1, 1))
+        self.assertEqual(index.stats()['version'], 2)
+
+    def test_upsert_during_a_load_is_not_lost(self):
+        index = QuestionIndex(refresh_seconds=0)
+        index.load(FakeCursor(1, []))
+        # The reload's snapshot predates question 9's commit
+        gate = threading.Event()
+        cur = FakeCursor(1, [(1, 1, 1, 'q1')], gate=gate)
+        loader = threading.Thread(target=index.load, args=(cur,))
+        loader.start()
+        cur.querying.wait(5)
+        writer = threading.Thread(target=index.upsert, args=(9, 1, 2, 'q9'))
+        writer.start()
+        writer.join(0.1)  # give the upsert the chance to run before the swap
+        gate.set()
+        loader.join(5)
+        writer.join(5)
+        self.assertEqual(index.pick(1, 2), (9, 'q9', 2))
+        self.assertEqual(index.stats()['questions'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from jose import jwt
+
+from src import question_prefetch, security
+from src.learner_state import MemoryStateStore
+from src.learning_models import EnhancedAdaptiveDifficultySelector
+from src.question_prefetch import InvalidCursorError, QuestionPlan, follow_plan, plan_questions, replan
+from tests.test_batch_selection import FakeProgressCursor
+
+
+class FakeAnswerCursor(FakeProgressCursor):
+    """The window query as in FakeProgressCursor; the bandit upsert is ignored."""
+
+    def execute(self, sql, params=None):
+        if "INSERT" in sql:
+            return
+        super().execute(sql, params)
+
+
+def pick_from(levels):
+    """A pick function over {difficulty: [question_id, ...]} with the index's fallback rules."""
+    def pick(difficulty, exclude):
+        for level in range(difficulty, 0, -1):
+            bucket = levels.get(level)
+            if bucket:
+                question_id = ([q for q in bucket if q not in exclude] or bucket)[0]
+                return question_id, f"q{question_id}", level
+        return None
+    return pick
+
+
+LEVELS = {level: [level * 100 + n for n in range(1, 6)] for level in range(1, 6)}
+
+
+class TestProjection(unittest.TestCase):
+    def setUp(self):
+        self.history = {(1, 1): []}
+        self.uow = MagicMock()
+        self.uow.cursor = FakeAnswerCursor(self.history)
+        self.selector = EnhancedAdaptiveDifficultySelector()
+        self.selector.user_states = MemoryStateStore()
+        self.selector.validate_windows = False
+        # No exploration: projections leave it out
+        patcher = patch('src.learning_models.random.random', return_value=0.99)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_projection_matches_the_real_decision(self):
+        rng = random.Random(5)
+        level = self.selector.select_difficulty_ultra_responsive(1, 1, uow=self.uow)
+        for _ in range(40):
+            outcomes = self.selector.project_outcomes(self.selector.get_learner_state(1, 1, uow=self.uow), level)
+            self.assertIsNotNone(outcomes)
+            was_correct = rng.random() < 0.6
+            self.history[(1, 1)].append((was_correct, level))
+            self.selector.update_bandit_state_enhanced(1, 1, level, was_correct, uow=self.uow)
+            level = self.selector.select_difficulty_ultra_responsive(1, 1, uow=self.uow)
+            self.assertEqual(level, outcomes[was_correct][1])
+
+    def test_projection_leaves_the_stored_state_alone(self):
+        self.selector.select_difficulty_ultra_responsive(1, 1, uow=self.uow)
+        before = self.selector.user_states[(1, 1)].to_dict()
+        self.selector.project_outcomes(self.selector.get_learner_state(1, 1, uow=self.uow), 3)
+        self.assertEqual(self.selector.user_states[(1, 1)].to_dict(), before)
+
+    def test_plan_covers_both_outcomes_without_repeating_on_a_path(self):
+        level = self.selector.select_difficulty_ultra_responsive(1, 1, uow=self.uow)
+        root = (LEVELS[level][0], level, level)
+        with patch.object(question_prefetch, 'enhanced_difficulty_selector', self.selector):
+            plan, texts = plan_questions(1, 1, root, 3, pick_from(LEVELS), self.selector.get_learner_state(1, 1))
+        self.assertEqual(sorted(plan.entries, key=lambda p: (len(p), p)),
+                         ["", "c", "i", "cc", "ci", "ic", "ii", "ccc", "cci", "cic", "cii", "icc", "ici", "iic", "iii"])
+        for path in plan.entries:
+            on_path = [plan.entries[path[:length]][0] for length in range(len(path) + 1)]
+            self.assertEqual(len(on_path), len(set(on_path)))
+        queue = plan.queue(texts)
+        self.assertEqual([entry["path"] for entry in queue[:2]], ["c", "i"])
+        self.assertEqual(len(queue), 14)
+        self.assertTrue(all(entry["question_text"] == f"q{entry['question_id']}" for entry in queue))
+        self.assertEqual([entry["path"] for entry in plan.advanced(False).queue(texts)],
+                         ["ic", "ii", "icc", "ici", "iic", "iii"])
+
+
+class TestCursor(unittest.TestCase):
+    def setUp(self):
+        self.plan = QuestionPlan(1, 2, 2, {"": (10, 3, 3), "c": (11, 4, 4), "i": (12, 2, 2)})
+
+    def test_round_trip(self):
+        plan = QuestionPlan.from_cursor(self.plan.advanced(True).to_cursor(), 1, 2)
+        self.assertEqual(plan.path, "c")
+        self.assertEqual(plan.entries, self.plan.entries)
+        self.assertEqual(plan.depth, 2)
+
+    def test_rejects_another_learner_or_lesson(self):
+        cursor = self.plan.to_cursor()
+        with self.assertRaises(InvalidCursorError):
+            QuestionPlan.from_cursor(cursor, 99, 2)
+        with self.assertRaises(InvalidCursorError):
+            QuestionPlan.from_cursor(cursor, 1, 99)
+
+    def test_rejects_tampered_and_expired_cursors(self):
+        payload = jwt.get_unverified_claims(self.plan.to_cursor())
+        payload["e"]["c"] = [11, 5, 5]
+        forged = jwt.encode(payload, "not-the-secret", algorithm=security.ALGORITHM)
+        with self.assertRaises(InvalidCursorError):
+            QuestionPlan.from_cursor(forged, 1, 2)
+        with patch.object(question_prefetch, 'CURSOR_TTL_MINUTES', -1):
+            expired = self.plan.to_cursor()
+        with self.assertRaises(InvalidCursorError):
+            QuestionPlan.from_cursor(expired, 1, 2)
+
+    def test_is_not_an_access_token(self):
+        # get_current_user reads the subject from "sub"; a cursor must not carry one
+        self.assertNotIn("sub", jwt.get_unverified_claims(self.plan.to_cursor()))
+
+
+class TestFollowPlan(unittest.TestCase):
+    def setUp(self):
+        self.plan = QuestionPlan(1, 2, 1, {"": (10, 3, 3), "c": (11, 4, 4), "i": (12, 2, 2)})
+
+    def test_keeps_the_plan_when_the_decision_matches(self):
+        result = follow_plan(self.plan, 10, False, 2)
+        self.assertTrue(result["valid"])
+        self.assertEqual(QuestionPlan.from_cursor(result["cursor"], 1, 2).path, "i")
+
+    def test_stale_when_the_decision_changed(self):
+        before = question_prefetch.prefetch_stats.stats()["replanned_stale"]
+        self.assertIsNone(follow_plan(self.plan, 10, True, 5))
+        self.assertEqual(question_prefetch.prefetch_stats.stats()["replanned_stale"], before + 1)
+
+    def test_stale_when_the_plan_ran_out(self):
+        before = question_prefetch.prefetch_stats.stats()["replanned_exhausted"]
+        self.assertIsNone(follow_plan(self.plan.advanced(True), 11, True, 4))
+        self.assertEqual(question_prefetch.prefetch_stats.stats()["replanned_exhausted"], before + 1)
+
+    @patch('src.question_prefetch.enhanced_difficulty_selector')
+    def test_replan_starts_from_the_real_next_question(self, mock_selector):
+        mock_selector.project_outcomes.return_value = None
+        result = replan(self.plan, (501, "q501", 5), 5, pick_from(LEVELS), MagicMock())
+        self.assertFalse(result["valid"])
+        self.assertEqual((result["question_id"], result["difficulty_level"]), (501, 5))
+        plan = QuestionPlan.from_cursor(result["cursor"], 1, 2)
+        self.assertEqual((plan.path, plan.current), ("", (501, 5, 5)))
+        self.assertEqual(replan(self.plan, None, 5, pick_from(LEVELS), MagicMock())["cursor"], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+
+from src import main
+from src.learner_state import MemoryStateStore
+from src.learning_models import BANDIT_UPSERT_SQL, EnhancedAdaptiveDifficultySelector
+
+
+class CountingUnitOfWork:
+    """Stands in for AsyncUnitOfWork and records every statement sent to the database."""
+
+    def __init__(self, recorded):
+        self.statements = []
+        self.params = []
+        self.recorded = recorded
+        self.commits = 0
+
+    async def _run(self, sql, params):
+        self.statements.append(sql)
+        self.params.append(params)
+        if sql == main.RECORD_ANSWER_SQL:
+            return self.recorded
+        return {'correct_answer_text': '4', 'answer_embedding': None, 'difficulty_level': 3,
+                'cached_is_correct': None, 'cached_similarity_score': None}
+
+    async def fetchrow(self, sql, params=()):
+        return await self._run(sql, params)
+
+    async def execute(self, sql, params=()):
+        await self._run(sql, params)
+        return "OK"
+
+    async def fetch(self, sql, params=()):
+        await self._run(sql, params)
+        return []
+
+    async def fetchval(self, sql, params=()):
+        await self._run(sql, params)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class TestSubmitAnswerRoundTrips(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        selector = EnhancedAdaptiveDifficultySelector()
+        selector.user_states = MemoryStateStore()
+        patcher = patch('src.main.enhanced_difficulty_selector', selector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = main.UserInDB(id=1, username='ana', email='ana@example.com', xp=0)
+
+    async def submit(self, recorded):
+        uow = CountingUnitOfWork(recorded)
+        submission = main.AnswerSubmission(lesson_id=1, question_id=1, difficulty_answered=1, user_answer='4')
+        response = await main.submit_answer(submission, self.user, uow)
+        return response, uow
+
+    async def test_bookkeeping_is_one_statement(self):
+        response, uow = await self.submit({'xp_gain': 45, 'quest_completed': True, 'unlocked': ['First Correct Answer']})
+        self.assertEqual(response['quest_completed'], True)
+        self.assertTrue(response['is_correct'])
+        # Question lookup, bandit counters, then everything else in RECORD_ANSWER_SQL
+        self.assertEqual(uow.statements, [main.grading_results.question_query(1, '4')[0], BANDIT_UPSERT_SQL, main.RECORD_ANSWER_SQL])
+        self.assertEqual(uow.commits, 1)
+
+    async def test_cached_user_gets_the_xp_delta(self):
+        with patch.object(main.auth_cache, 'add_xp') as add_xp:
+            await self.submit({'xp_gain': 35, 'quest_completed': False, 'unlocked': []})
+        add_xp.assert_called_once_with('ana', 35)
+
+    async def test_bandit_records_the_stored_difficulty(self):
+        # The client claimed difficulty 1; the question is stored at 3
+        _, uow = await self.submit({'xp_gain': 10, 'quest_completed': False, 'unlocked': []})
+        self.assertEqual(uow.params[uow.statements.index(BANDIT_UPSERT_SQL)], (1, 1, 3, 1, 1))
+        state = main.enhanced_difficulty_selector.user_states[(1, 1)]
+        self.assertEqual(state.recent_performance[-1]['difficulty'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
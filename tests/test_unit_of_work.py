@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.unit_of_work import UnitOfWork, get_unit_of_work
+from src.learning_models import EnhancedAdaptiveDifficultySelector
+
+
+class TestUnitOfWork(unittest.TestCase):
+    @patch('src.unit_of_work.get_db_connection')
+    def test_connection_is_checked_out_lazily(self, mock_get_db_connection):
+        uow = UnitOfWork()
+        uow.close()
+        mock_get_db_connection.assert_not_called()
+
+    @patch('src.unit_of_work.get_db_connection')
+    def test_cursor_is_shared_and_released(self, mock_get_db_connection):
+        mock_conn = MagicMock()
+        mock_get_db_connection.return_value = mock_conn
+        with UnitOfWork() as uow:
+            self.assertIs(uow.cursor, uow.cursor)
+            uow.commit()
+        mock_get_db_connection.assert_called_once()
+        mock_conn.commit.assert_called_once()
+        mock_conn.cursor.return_value.close.assert_called_once()
+        mock_conn.close.assert_called_once()
+
+    @patch('src.unit_of_work.get_db_connection')
+    def test_dependency_closes_on_error(self, mock_get_db_connection):
+        mock_conn = MagicMock()
+        mock_get_db_connection.return_value = mock_conn
+        dependency = get_unit_of_work()
+        uow = next(dependency)
+        uow.cursor.execute("SELECT 1")
+        with self.assertRaises(RuntimeError):
+            dependency.throw(RuntimeError("endpoint failed"))
+        mock_conn.commit.assert_not_called()
+        mock_conn.rollback.assert_called()
+        mock_conn.close.assert_called_once()
+
+
+class TestHelpersJoinUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        self.selector = EnhancedAdaptiveDifficultySelector()
+        self.uow = MagicMock()
+
+    @patch('src.learning_models.get_db_connection')
+    def test_bandit_update_uses_callers_transaction(self, mock_get_db_connection):
+        self.selector.update_bandit_state_enhanced(
+            user_id=1, lesson_id=1, difficulty=2, was_correct=True, uow=self.uow
+        )
+        mock_get_db_connection.assert_not_called()
+        self.uow.cursor.execute.assert_called_once()
+        self.uow.commit.assert_not_called()
+
+    @patch('src.learning_models.get_db_connection')
+    def test_metrics_use_callers_connection(self, mock_get_db_connection):
+        self.uow.cursor.fetchall.return_value = []
+        metrics = self.selector.get_enhanced_performance_metrics(user_id=1, lesson_id=1, uow=self.uow)
+        mock_get_db_connection.assert_not_called()
+        self.assertEqual(metrics.recent_attempts, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()